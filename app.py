@@ -2,24 +2,40 @@
 Metabolic Report Generator - Flask Web Application
 Minimal MVP for uploading metabolic test PDFs and generating custom reports
 """
-from flask import Flask, render_template, request, send_file, jsonify, redirect, url_for, session, flash
+from flask import Flask, Response, render_template, request, send_file, jsonify, redirect, url_for, session, flash
+import io
+import math
 import os
 import json
 import secrets
 import uuid
+import zipfile
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-import pdfplumber
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 import re
 from functools import wraps
 from dotenv import load_dotenv
 import requests
 import stripe
-from weasyprint import HTML
 from utils.beautiful_report import generate_beautiful_report
 from utils.calculate_scores import calculate_biological_age as calculate_bio_age_proper
-from utils.ergometry_calculator import detect_pdf_type, process_pnoe_pdf, calculate_all_scores
+from utils.ergometry_calculator import process_pnoe_pdf
+from utils.asset_cache import AssetCache, ReportURLFetcher
+from utils.batch_checkpoint import pipeline_version
+from utils.extraction_cache import ExtractionCache
+from utils.pdf_cache import PdfCache, pdf_cache_key
+from utils.pdf_jobs import DONE as PDF_DONE, FAILED as PDF_FAILED, PdfQueueFull, PdfRenderQueue
+from utils.pdf_render import PdfRenderer, render_version
+from utils.pdf_sections import SectionRenderer
+from utils.extraction_jobs import ExtractionJobs
+from utils.upload_stream import PDFUploadRequest, PDFUploadStream
+from utils.pnoe_extraction import extract_breath_data
+from utils.breath_ingest import is_breath_table
+from utils.report_log import get_logger, lazy
+from utils.report_styles import STYLES_URL, CACHE_CONTROL, inline_stylesheets, publish_all_stylesheets
+from utils.report_view import body_offset, iter_report_file_view, iter_report_view, nav_buttons
 from ai_recommendations import UniversalRecommendationAI
 from blog_posts import get_all_posts, get_post_by_slug, get_recent_posts
 import db  # Database module for RDS PostgreSQL
@@ -27,11 +43,39 @@ import db  # Database module for RDS PostgreSQL
 # Load environment variables (override=True ensures .env file takes precedence over shell variables)
 load_dotenv(override=True)
 
+auth_log = get_logger('app.auth', 'LOGIN_CHECK')
+generate_log = get_logger('app.generate', 'GENERATE')
+save_log = get_logger('app.generate.save', 'SAVE REPORT')
+view_log = get_logger('app.view', 'VIEW')
+pdf_log = get_logger('app.download.pdf', 'PDF')
+upload_log = get_logger('app.upload', 'UPLOAD')
+
 app = Flask(__name__)
+app.request_class = PDFUploadRequest  # /upload streams the PDF straight to disk
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(16))
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['REPORTS_FOLDER'] = 'reports'
+app.config['EXTRACTION_CACHE_FOLDER'] = os.path.join('uploads', 'extraction_cache')
+app.config['EXTRACTION_JOBS_FOLDER'] = os.path.join('uploads', 'jobs')
+app.config['REPORT_ASSETS_FOLDER'] = 'report_assets'  # seeded by seed_report_assets.py
+app.config['PDF_CACHE_FOLDER'] = os.path.join('reports', 'pdf_cache')
+app.config['PDF_CACHE_MAX_BYTES'] = int(os.getenv('PDF_CACHE_MAX_MB', '512')) * 1024 * 1024
+app.config['PDF_JOBS_FOLDER'] = os.path.join('reports', 'pdf_jobs')
+app.config['PDF_RENDER_SLOTS'] = int(os.getenv('PDF_RENDER_SLOTS', '2'))  # WeasyPrint renders at once per host
+app.config['PDF_QUEUE_MAX'] = int(os.getenv('PDF_QUEUE_MAX', '16'))  # queued renders per web worker
+app.config['PDF_SYNC_WAIT'] = float(os.getenv('PDF_SYNC_WAIT', '5'))  # seconds a download waits before 202
+app.config['PDF_MAX_WAIT'] = 30  # upper bound for ?wait=
+# Processes per split render; 0 = off. Each web worker keeps a pool of this many
+# spawned processes with WeasyPrint loaded - budget roughly a web worker's memory
+# apiece (workers x PDF_SECTION_WORKERS extra processes per host). The pool is shut
+# down after two idle minutes, and a split render only uses as many processes as
+# it can take free PDF_RENDER_SLOTS.
+app.config['PDF_SECTION_WORKERS'] = int(os.getenv('PDF_SECTION_WORKERS', '0'))
+app.config['PDF_PRERENDER'] = os.getenv('PDF_PRERENDER', '1').lower() in ('1', 'true', 'yes')  # after /generate
+app.config['EXTRACTION_WORKERS'] = int(os.getenv('EXTRACTION_WORKERS', '2'))  # pool size per web worker
+app.config['EXTRACTION_JOB_TIMEOUT'] = int(os.getenv('EXTRACTION_JOB_TIMEOUT', '90'))  # seconds per PDF
 app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # 200MB max file size
+app.config['MAX_PDF_UPLOAD_BYTES'] = int(os.getenv('MAX_PDF_UPLOAD_MB', '200')) * 1024 * 1024
 
 # HIPAA-Compliant Session Configuration
 app.config['SESSION_COOKIE_SECURE'] = True  # Always use HTTPS
@@ -51,6 +95,9 @@ def add_security_headers(response):
     response.headers['Content-Security-Policy'] = "default-src 'self' https:; script-src 'self' 'unsafe-inline' https://js.stripe.com https://cdn.tailwindcss.com https://cdnjs.cloudflare.com; style-src 'self' 'unsafe-inline' https://fonts.googleapis.com https://cdnjs.cloudflare.com; font-src 'self' https://fonts.gstatic.com https://cdnjs.cloudflare.com; img-src 'self' data: https:; frame-src https://js.stripe.com;"
     response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
     response.headers['Permissions-Policy'] = 'geolocation=(), microphone=(), camera=()'
+    # Report stylesheets are content-hashed: a changed file gets a new URL
+    if request.path.startswith(STYLES_URL + '/'):
+        response.headers['Cache-Control'] = CACHE_CONTROL
     return response
 
 ALLOWED_EXTENSIONS = {'pdf'}
@@ -135,6 +182,10 @@ stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['REPORTS_FOLDER'], exist_ok=True)
 
+# Write every template's fingerprinted stylesheet now, so any instance can
+# serve them for reports generated elsewhere (older ones are committed)
+publish_all_stylesheets()
+
 # Startup logging
 print("=" * 60)
 print("🚀 METABOMAX PRO STARTING UP")
@@ -155,22 +206,19 @@ def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Debug session
-        print(f"[LOGIN_CHECK] Route: {request.endpoint}")
-        print(f"[LOGIN_CHECK] Session keys: {list(session.keys())}")
-        print(f"[LOGIN_CHECK] Has user: {'user' in session}")
-
         if 'user' not in session:
             # If this is an AJAX/JSON request, return JSON error instead of redirect
             if request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                print(f"[LOGIN_CHECK] Returning 401 - not logged in (AJAX request)")
+                auth_log.info("Returning 401 - not logged in (AJAX request)", route=request.endpoint)
                 return jsonify({'error': 'Please log in to access this feature', 'login_required': True}), 401
             # Otherwise, redirect to login page
-            print(f"[LOGIN_CHECK] Redirecting to login - not logged in")
+            auth_log.info("Redirecting to login - not logged in", route=request.endpoint)
             flash('Please log in to access this page.', 'warning')
             return redirect(url_for('login'))
 
-        print(f"[LOGIN_CHECK] User authenticated: {session['user'].get('id', 'unknown')}")
+        # Every authenticated request passes here: DEBUG, and sampled (DEFAULT_SAMPLE_RATES)
+        auth_log.debug("User authenticated", route=request.endpoint, user_id=session['user'].get('id', 'unknown'),
+                       session_keys=lazy(lambda: list(session.keys())))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -253,188 +301,51 @@ def use_ai_credit(user_id):
 
     return False
 
-def extract_pnoe_data(pdf_path):
-    """Extract data from metabolic test PDF - handles both raw ergometry and performance reports"""
-    data = {
-        'patient_info': {},
-        'core_scores': {},
-        'caloric_data': {},
-        'metabolic_data': {},
-        'heart_rate_data': {},
-        'all_text': []
-    }
-
-    # First, detect PDF type and use appropriate extraction method
-    try:
-        pdf_type = detect_pdf_type(pdf_path)
-
-        if pdf_type == 'raw_ergometry':
-            # Use the calculation engine for raw ergometry data
-            calc_result = calculate_all_scores(pdf_path)
-
-            # Map calculated results to expected data structure
-            data['patient_info'] = calc_result.get('patient_info', {})
-            data['core_scores'] = calc_result.get('core_scores', {})
-            data['patient_info']['test_source'] = 'PNOE'
-            data['patient_info']['data_quality'] = calc_result.get('data_quality', 'estimated')
-
-            # Copy raw metrics to appropriate sections
-            raw_metrics = calc_result.get('raw_metrics', {})
-            if 'measured_rmr_kcal' in raw_metrics:
-                data['caloric_data']['rmr'] = raw_metrics['measured_rmr_kcal']
-                data['metabolic_data']['rmr'] = raw_metrics['measured_rmr_kcal']
-            if 'rer' in raw_metrics:
-                data['metabolic_data']['rer'] = raw_metrics['rer']
-            if 'mean_hr' in raw_metrics:
-                data['heart_rate_data']['resting_hr'] = raw_metrics['mean_hr']
-
-            # Add a note that this was calculated from raw data
-            data['calculation_details'] = calc_result.get('calculation_details', {})
-            data['all_text'] = ['Raw PNOE Ergometry data - scores calculated from measurements']
-
-            return data
-    except Exception as e:
-        # If ergometry calculation fails, fall back to standard extraction
-        print(f"Ergometry calculation failed, using standard extraction: {e}")
-
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, 1):
-                text = page.extract_text()
-                if text:
-                    data['all_text'].append(text[:2000])  # First 2000 chars per page
-
-                    # Try to extract tables
-                    tables = page.extract_tables()
-                    if tables:
-                        for table in tables:
-                            # Process table data
-                            for row in table:
-                                if row and len(row) >= 2:
-                                    # Look for key-value pairs in tables
-                                    key = str(row[0]).strip() if row[0] else ""
-                                    value = str(row[1]).strip() if row[1] else ""
-
-                                    # Extract VO2 values from tables
-                                    if 'VO2' in key and 'ml/kg/min' in key:
-                                        try:
-                                            vo2_val = float(re.search(r'([0-9.]+)', value).group(1))
-                                            data['metabolic_data']['vo2max_rel'] = vo2_val
-                                        except:
-                                            pass
-
-                                    # Extract RMR from tables
-                                    if 'RMR' in key or 'Resting Metabolic Rate' in key:
-                                        try:
-                                            rmr_val = int(re.search(r'(\d{3,4})', value).group(1))
-                                            if 1000 <= rmr_val <= 3000:  # Sanity check
-                                                data['caloric_data']['rmr'] = rmr_val
-                                                data['metabolic_data']['rmr'] = rmr_val
-                                        except:
-                                            pass
-
-                    # Extract patient name
-                    if page_num == 1:
-                        name_match = re.search(r'(?:Name|Subject)[:\s]+([A-Za-z\s]+?)(?:Status|Gender)', text)
-                        if name_match:
-                            data['patient_info']['name'] = name_match.group(1).strip()
-
-                        date_match = re.search(r'(?:Date)[:\s]+(\d{1,2}/\d{1,2}/\d{2,4})', text)
-                        if date_match:
-                            data['patient_info']['test_date'] = date_match.group(1)
-
-                        # Extract gender and age (format: "Gender Male (63)")
-                        gender_age_match = re.search(r'Gender[:\s]+(Male|Female)\s*\((\d+)\)', text)
-                        if gender_age_match:
-                            data['patient_info']['gender'] = gender_age_match.group(1)
-                            data['patient_info']['age'] = int(gender_age_match.group(2))
-                        else:
-                            gender_match = re.search(r'Gender[:\s]+(Male|Female)', text)
-                            if gender_match:
-                                data['patient_info']['gender'] = gender_match.group(1)
-
-                        weight_match = re.search(r'Weight[:\s]+(\d+)\s*kg', text)
-                        if weight_match:
-                            data['patient_info']['weight_kg'] = int(weight_match.group(1))
-
-                        height_match = re.search(r'Height[:\s]+(\d+)\s*cm', text)
-                        if height_match:
-                            data['patient_info']['height_cm'] = int(height_match.group(1))
-
-                    # Extract core scores (look for percentages)
-                    # More specific patterns to avoid mis-matches
-                    score_patterns = [
-                        (r'Sympathetic/Parasympathetic.*?-\s*(\d+)%', 'symp_parasym'),
-                        (r'Ventilation efficiency.*?-\s*(\d+)%', 'ventilation_eff'),
-                        (r'Breathing coordination.*?-\s*(\d+)%', 'breathing_coord'),
-                        (r'Lung utilization.*?-\s*(\d+)%', 'lung_util'),
-                        (r'Heart Rate Variability.*?-\s*(\d+)%', 'hrv'),
-                        (r'Metabolic rate.*?-\s*(\d+)%', 'metabolic_rate'),
-                        (r'Fat-burning Efficiency.*?-\s*(\d+)%', 'fat_burning')
-                    ]
-
-                    for pattern, key in score_patterns:
-                        match = re.search(pattern, text, re.IGNORECASE)
-                        if match and key not in data['core_scores']:
-                            data['core_scores'][key] = int(match.group(1))
-
-                    # Extract caloric data
-                    rmr_match = re.search(r'RMR[:\s]+(\d+)', text)
-                    if rmr_match:
-                        data['caloric_data']['rmr'] = int(rmr_match.group(1))
-                        data['metabolic_data']['rmr'] = int(rmr_match.group(1))  # Also store in metabolic_data
-
-                    # Extract daily caloric burn
-                    burn_match = re.search(r'(?:Total.*?Burn|Daily.*?Expenditure)[:\s]+(\d+)', text, re.IGNORECASE)
-                    if burn_match:
-                        data['caloric_data']['total_burn'] = int(burn_match.group(1))
-
-                    # Extract fuel utilization percentages
-                    fat_percent_match = re.search(r'Fat.*?(\d+)\s*%', text, re.IGNORECASE)
-                    if fat_percent_match:
-                        data['caloric_data']['fat_percent'] = int(fat_percent_match.group(1))
-
-                    cho_percent_match = re.search(r'(?:Carb|CHO).*?(\d+)\s*%', text, re.IGNORECASE)
-                    if cho_percent_match:
-                        data['caloric_data']['cho_percent'] = int(cho_percent_match.group(1))
-
-                    # Extract HR max
-                    max_hr_match = re.search(r'(?:Max|Maximum).*?(?:HR|Heart Rate)[:\s]+(\d+)', text)
-                    if max_hr_match:
-                        data['heart_rate_data']['max_hr'] = int(max_hr_match.group(1))
-
-                    # Extract RER
-                    rer_match = re.search(r'RER[:\s]+([0-9.]+)', text)
-                    if rer_match:
-                        data['metabolic_data']['rer'] = float(rer_match.group(1))
-
-                    # Extract VO2 max
-                    vo2_abs_match = re.search(r'VO2.*?max[:\s]+([0-9.]+).*?L/min', text, re.IGNORECASE)
-                    if vo2_abs_match:
-                        data['metabolic_data']['vo2max_abs'] = float(vo2_abs_match.group(1))
-
-                    vo2_rel_match = re.search(r'VO2.*?max[:\s]+([0-9.]+).*?ml.*?kg.*?min', text, re.IGNORECASE)
-                    if vo2_rel_match:
-                        data['metabolic_data']['vo2max_rel'] = float(vo2_rel_match.group(1))
-
-                    # Extract resting heart rate
-                    rhr_match = re.search(r'(?:Resting|Rest).*?(?:HR|Heart Rate)[:\s]+(\d+)', text, re.IGNORECASE)
-                    if rhr_match and 'max_hr' not in data['heart_rate_data']:
-                        data['heart_rate_data']['resting_hr'] = int(rhr_match.group(1))
-
-    except Exception as e:
-        data['error'] = str(e)
-
-    # Detect test source/type (PNOE, CorSense, etc.)
-    all_text_combined = ' '.join(data.get('all_text', [])).lower()
-    if 'pnoe' in all_text_combined or 'p n o e' in all_text_combined:
-        data['patient_info']['test_source'] = 'PNOE'
-    elif 'corsense' in all_text_combined:
-        data['patient_info']['test_source'] = 'CorSense'
-    else:
-        data['patient_info']['test_source'] = 'Generic'
-
-    return data
+# Persistent extraction cache keyed by PDF SHA-256 + extractor version.
+# The version hashes the extraction code and every utils module it imports
+# (scoring tables included), so editing any of them invalidates old entries.
+extraction_cache = ExtractionCache(
+    app.config['EXTRACTION_CACHE_FOLDER'],
+    pipeline_version('pnoe_extraction', 'calculate_scores')
+)
+
+# Template images and fonts for WeasyPrint, served from disk instead of the network
+report_asset_fetcher = ReportURLFetcher(AssetCache(app.config['REPORT_ASSETS_FOLDER']))
+
+# WeasyPrint fonts and print stylesheets, set up once per worker thread;
+# rendered PDFs cached by report HTML + render version
+pdf_renderer = PdfRenderer(url_fetcher=report_asset_fetcher)
+pdf_cache = PdfCache(app.config['PDF_CACHE_FOLDER'], app.config['PDF_CACHE_MAX_BYTES'])
+
+# Renders are queued and run a few at a time per host; downloads that
+# outlast PDF_SYNC_WAIT get 202 and poll /api/pdf-jobs/<id>. Saved reports
+# are pre-rendered at low priority so the download is usually a cache hit.
+pdf_queue = PdfRenderQueue(
+    app.config['PDF_JOBS_FOLDER'],
+    pdf_cache,
+    slots=app.config['PDF_RENDER_SLOTS'],
+    max_queued=app.config['PDF_QUEUE_MAX']
+)
+
+# Opt-in: reports with forced page breaks between sections are split there
+# and rendered a section per process, one process per render slot held;
+# everything else renders serially
+pdf_sections = SectionRenderer(pdf_renderer, workers=app.config['PDF_SECTION_WORKERS'],
+                               asset_dir=app.config['REPORT_ASSETS_FOLDER'], slots=pdf_queue.slots)
+
+# Load pango, the system font cache and the print stylesheets now rather
+# than on the first PDF download
+try:
+    pdf_log.info("PDF renderer warmed up", seconds=round(pdf_renderer.warm_up(), 3))
+except Exception as e:
+    pdf_log.warning("PDF renderer warm-up failed: %s", e)
+
+# Uploads are extracted on a background process pool; clients poll /api/jobs/<id>
+extraction_jobs = ExtractionJobs(
+    app.config['EXTRACTION_JOBS_FOLDER'],
+    max_workers=app.config['EXTRACTION_WORKERS'],
+    timeout=app.config['EXTRACTION_JOB_TIMEOUT']
+)
 
 # ============= Authentication Routes =============
 
@@ -448,7 +359,20 @@ def landing():
 @app.route('/health')
 def health():
     """Health check endpoint for Render"""
-    return jsonify({'status': 'ok', 'message': 'App is running'}), 200
+    return jsonify({
+        'status': 'ok',
+        'message': 'App is running',
+        'extraction_cache': extraction_cache.stats(),
+        'report_assets': report_asset_fetcher.stats(),
+        'pdf_cache': pdf_cache.stats(),
+        'pdf_renderer': pdf_renderer.stats(),
+        'pdf_sections': pdf_sections.stats(),
+        'pdf_queue': pdf_queue.stats(),
+        'extraction_pool': {
+            'workers': app.config['EXTRACTION_WORKERS'],
+            'job_timeout': app.config['EXTRACTION_JOB_TIMEOUT']
+        }
+    }), 200
 
 @app.route('/version')
 def version():
@@ -934,30 +858,76 @@ def submit_manual():
 @app.route('/upload', methods=['POST'])
 @login_required
 def upload_file():
-    """Handle PDF upload and extract data"""
-    if 'pdf_file' not in request.files:
+    """Handle PDF upload and queue extraction (poll /api/jobs/<job_id> for the result)"""
+    # Declared oversized bodies are refused before a single byte is read
+    max_bytes = app.config['MAX_PDF_UPLOAD_BYTES']
+    if request.content_length and request.content_length > max_bytes + 64 * 1024:
+        return jsonify({'error': f'PDF exceeds {max_bytes // (1024 * 1024)} MB'}), 413
+
+    # Parsing the form streams the PDF to uploads/ via PDFUploadStream, hashing
+    # it and aborting on a non-PDF or oversized body at the offending chunk
+    try:
+        files = request.files
+    except (UnsupportedMediaType, RequestEntityTooLarge) as e:
+        return jsonify({'error': e.description}), e.code
+
+    for field, part in files.items(multi=True):
+        if field != 'pdf_file' and isinstance(part.stream, PDFUploadStream):
+            part.stream.discard()
+
+    if 'pdf_file' not in files:
         return jsonify({'error': 'No file uploaded'}), 400
 
-    file = request.files['pdf_file']
+    file = files['pdf_file']
+    upload = file.stream
+    upload.close()
 
     if file.filename == '':
+        upload.discard()
         return jsonify({'error': 'No file selected'}), 400
 
-    if not allowed_file(file.filename):
+    if not allowed_file(file.filename) or not upload.is_pdf:
+        upload.discard()
         return jsonify({'error': 'Only PDF files allowed'}), 400
 
     user_id = session['user']['id']
 
-    # Save file with unique name
-    filename = secure_filename(file.filename)
-    unique_id = secrets.token_hex(8)
-    saved_filename = f"{unique_id}_{filename}"
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], saved_filename)
-    file.save(filepath)
+    # Already saved under a unique name while the body was parsed
+    filename = upload.filename
+    unique_id = upload.unique_id
+    filepath = upload.path
+    content_hash = upload.sha256
+
+    # Re-uploads of the same PDF are served from the cache without queuing a job
+    cached = extraction_cache.get(content_hash)
+    if cached is not None:
+        upload_log.info("Extraction cache hit", sha256=content_hash[:12])
+        result = save_extraction_result(unique_id, cached, user_id, filename, filepath)
+        job = extraction_jobs.record_done(unique_id, user_id=user_id, file_id=unique_id, **result)
+        return jsonify({'success': True, 'job_id': unique_id, 'file_id': unique_id,
+                        'status': job['status'], 'test_id': result['test_id'],
+                        'extracted_data': cached})
+
+    def on_extracted(job_id, extracted_data):
+        try:
+            extraction_cache.put(content_hash, extracted_data)
+        except Exception as e:
+            upload_log.warning("Could not cache extraction: %s", e, sha256=content_hash[:12])
+        return save_extraction_result(job_id, extracted_data, user_id, filename, filepath)
 
-    # Extract data from PDF
-    extracted_data = extract_pnoe_data(filepath)
+    upload_log.info("Extraction cache miss, queuing job", sha256=content_hash[:12], job_id=unique_id)
+    job = extraction_jobs.submit(unique_id, filepath, on_extracted, user_id=user_id, file_id=unique_id)
 
+    return jsonify({
+        'success': True,
+        'job_id': unique_id,
+        'file_id': unique_id,
+        'status': job['status'],
+        'status_url': url_for('job_status', job_id=unique_id)
+    }), 202
+
+def save_extraction_result(unique_id, extracted_data, user_id, filename, filepath):
+    """Persist extracted_data for /generate and record the test in the database"""
     # Save extracted data for later use
     data_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_data.json")
     with open(data_path, 'w') as f:
@@ -988,13 +958,87 @@ def upload_file():
         print(f"Error saving to database: {str(e)}")
         test_id = None
 
+    return {'test_id': test_id}
+
+@app.route('/upload_breath', methods=['POST'])
+@login_required
+def upload_breath():
+    """Handle a breath-by-breath CSV/XLSX export (scored inline - no PDF parsing)"""
+    if 'data_file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    file = request.files['data_file']
+
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    if not is_breath_table(file.filename):
+        return jsonify({'error': 'Only CSV or XLSX breath-by-breath files allowed'}), 400
+
+    user_id = session['user']['id']
+
+    # Save file with unique name
+    filename = secure_filename(file.filename)
+    unique_id = secrets.token_hex(8)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{unique_id}_{filename}")
+    file.save(filepath)
+
+    # Demographics typed into the form fill gaps in the file's own metadata
+    patient_info = {}
+    for field, cast in (('name', str), ('gender', str), ('age', int),
+                        ('weight_kg', float), ('height_cm', float)):
+        value = request.form.get(field, '').strip()
+        if value:
+            try:
+                patient_info[field] = cast(value)
+            except ValueError:
+                return jsonify({'error': f'Invalid {field}'}), 400
+
+    try:
+        extracted_data = extract_breath_data(filepath, filename, patient_info)
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'Not a valid XLSX file'}), 400
+    except UnicodeDecodeError:
+        return jsonify({'error': 'CSV file is not UTF-8 text'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    upload_log.info("Breath table scored", file_id=unique_id,
+                    breaths=extracted_data['metabolic_data'].get('breath_count', 0))
+
+    result = save_extraction_result(unique_id, extracted_data, user_id, filename, filepath)
+
     return jsonify({
         'success': True,
         'file_id': unique_id,
-        'test_id': test_id,
+        'test_id': result['test_id'],
         'extracted_data': extracted_data
     })
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    """Poll a background extraction job: queued, running, done or failed"""
+    job = extraction_jobs.get(secure_filename(job_id))
+    if not job or job.get('user_id') != session['user']['id']:
+        return jsonify({'error': 'Job not found'}), 404
+
+    response = {
+        'job_id': job_id,
+        'file_id': job.get('file_id'),
+        'status': job['status'],
+        'test_id': job.get('test_id'),
+        'error': job.get('error')
+    }
+    if job['status'] == 'done':
+        data_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{job['file_id']}_data.json")
+        try:
+            with open(data_path, 'r') as f:
+                response['extracted_data'] = json.load(f)
+        except (OSError, ValueError):
+            response['status'] = 'failed'
+            response['error'] = 'Extracted data is no longer available'
+    return jsonify(response)
+
 def calculate_biological_age(core_scores, chronological_age, metabolic_data, hr_data, patient_info):
     """
     WRAPPER: Call the proper calculate_biological_age from utils/calculate_scores.py
@@ -1004,9 +1048,6 @@ def calculate_biological_age(core_scores, chronological_age, metabolic_data, hr_
     # Old: calculate_biological_age(core_scores, chronological_age, metabolic_data, hr_data, patient_info)
     # New: calculate_biological_age(patient_info, core_scores, metabolic_data)
 
-    print(f"\n[APP.PY WRAPPER] Converting old bio age call to new proper function...")
-    print(f"[APP.PY WRAPPER] Chronological age: {chronological_age}")
-
     # Ensure patient_info has age
     if patient_info and 'age' not in patient_info:
         patient_info['age'] = chronological_age
@@ -1014,8 +1055,6 @@ def calculate_biological_age(core_scores, chronological_age, metabolic_data, hr_
     # Call the PROPER function from utils/calculate_scores.py (NO DEFAULTS!)
     biological_age = calculate_bio_age_proper(patient_info, core_scores, metabolic_data)
 
-    print(f"[APP.PY WRAPPER] Proper function returned: {biological_age}")
-
     return biological_age
 
 @app.route('/generate', methods=['POST'])
@@ -1055,7 +1094,6 @@ def generate_report():
     # Use override if provided, otherwise calculate
     if biological_age_override:
         biological_age = biological_age_override
-        print(f"DEBUG: Using manual biological age override: {biological_age}")
     else:
         core_scores = extracted_data.get('core_scores', {})
         metabolic_data = extracted_data.get('metabolic_data', {})
@@ -1070,13 +1108,9 @@ def generate_report():
             patient_info
         )
 
-    # Debug logging
-    print(f"DEBUG: Chronological age: {chronological_age}")
-    if not biological_age_override:
-        print(f"DEBUG: Core scores: {extracted_data.get('core_scores', {})}")
-        print(f"DEBUG: Metabolic data: {extracted_data.get('metabolic_data', {})}")
-        print(f"DEBUG: HR data: {extracted_data.get('heart_rate_data', {})}")
-    print(f"DEBUG: Final biological age: {biological_age}")
+    generate_log.debug("Biological age %s", biological_age, chronological_age=chronological_age,
+                       override=bool(biological_age_override), core_scores=extracted_data.get('core_scores', {}),
+                       metabolic_data=extracted_data.get('metabolic_data', {}))
 
     # Merge with custom user data
     custom_data = {
@@ -1088,14 +1122,15 @@ def generate_report():
         'additional_metrics': data.get('additional_metrics', {})
     }
 
-    # Generate HTML report
-    report_html = generate_beautiful_report(extracted_data, custom_data)
+    # Generate HTML report (linking the shared stylesheet - downloads and PDFs inline it)
+    report_html = generate_beautiful_report(extracted_data, custom_data, inline_css=False)
 
     # Save report
     report_filename = f"{file_id}_report.html"
     report_path = os.path.join(app.config['REPORTS_FOLDER'], report_filename)
     with open(report_path, 'w') as f:
         f.write(report_html)
+    _prerender_pdf(report_path, 'report', f'/download/{file_id}/pdf', user_id)
 
     # Save report to database
     try:
@@ -1110,23 +1145,32 @@ def generate_report():
             'goals': custom_data.get('goals'),
             'additional_metrics': custom_data.get('additional_metrics'),
             'html_content': report_html,
+            'body_offset': body_offset(report_html),  # where /view splices in the nav buttons
             'html_storage_path': report_path
         }
 
-        print(f"[SAVE REPORT] Saving report with data: {report_data.keys()}")
-        print(f"[SAVE REPORT] file_id={file_id}, user_id={user_id}")
-
         report_response = http_session.post(
             f"{SUPABASE_REST_URL}/reports",
             headers=get_supabase_headers(),
             json=report_data
         )
-
-        print(f"[SAVE REPORT] Response status: {report_response.status_code}")
-        print(f"[SAVE REPORT] Response: {report_response.text[:500]}")
+        if not report_response.ok and 'body_offset' in report_response.text:
+            # migrations/report_body_offset.sql not applied yet - /view finds <body> itself
+            save_log.warning("reports.body_offset missing, saving without it "
+                             "(run migrations/report_body_offset.sql)", file_id=file_id)
+            report_data.pop('body_offset')
+            report_response = http_session.post(
+                f"{SUPABASE_REST_URL}/reports",
+                headers=get_supabase_headers(),
+                json=report_data
+            )
 
         db_report_id = report_response.json()[0]['id'] if report_response.ok and report_response.json() else None
-        print(f"[SAVE REPORT] Saved report with DB ID: {db_report_id}")
+        if report_response.ok:
+            save_log.info("Saved report", file_id=file_id, user_id=user_id, db_report_id=db_report_id)
+        else:
+            save_log.warning("Save failed with status %s", report_response.status_code, file_id=file_id,
+                             response=lazy(lambda: report_response.text[:500]))
 
         # Update subscription reports_used counter
         subscription_response = http_session.get(
@@ -1142,7 +1186,7 @@ def generate_report():
                 json={'reports_used': new_count}
             )
     except Exception as e:
-        print(f"Error saving report to database: {str(e)}")
+        save_log.error("Error saving report to database: %s", e, file_id=file_id)
         db_report_id = None
 
     return jsonify({
@@ -1160,12 +1204,11 @@ def generate_report_with_ai():
     file_id = data.get('file_id')
     ai_recommendations = data.get('ai_recommendations', {})  # {subject: recommendation_text}
 
-    print(f"[DEBUG /generate-with-ai] Received request")
-    print(f"[DEBUG] file_id: {file_id}")
-    print(f"[DEBUG] ai_recommendations keys: {list(ai_recommendations.keys())}")
+    generate_log.debug("/generate-with-ai request", file_id=file_id,
+                       subjects=lazy(lambda: list(ai_recommendations.keys())))
 
     if not file_id:
-        print("[ERROR] No file_id provided")
+        generate_log.warning("/generate-with-ai: no file_id provided")
         return jsonify({'error': 'No file ID provided'}), 400
 
     # Check if user has AI access
@@ -1173,22 +1216,18 @@ def generate_report_with_ai():
     has_access, message = can_use_ai_recommendations(user_id)
 
     if not has_access:
-        print(f"[ERROR] User {user_id} does not have AI access: {message}")
+        generate_log.warning("User has no AI access: %s", message, user_id=user_id)
         return jsonify({
             'error': message,
             'upgrade_required': True,
             'upgrade_url': '/pricing'
         }), 403
 
-    print(f"[DEBUG] User has AI access: {message}")
-
     # Get the basic report first
     basic_report_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report.html")
-    print(f"[DEBUG] Looking for basic report at: {basic_report_path}")
-    print(f"[DEBUG] Basic report exists: {os.path.exists(basic_report_path)}")
 
     if not os.path.exists(basic_report_path):
-        print("[ERROR] Basic report not found")
+        generate_log.warning("Basic report not found", path=basic_report_path)
         return jsonify({'error': 'Basic report not found. Please generate basic report first.'}), 404
 
     # Read the basic report
@@ -1266,20 +1305,112 @@ def generate_report_with_ai():
     ai_report_path = os.path.join(app.config['REPORTS_FOLDER'], ai_report_filename)
     with open(ai_report_path, 'w') as f:
         f.write(report_with_ai)
-
-    print(f"[SUCCESS] AI report saved to: {ai_report_path}")
+    _prerender_pdf(ai_report_path, 'report_with_ai', f'/download-ai/{file_id}/pdf', user_id)
 
     # Decrement AI credit if user has limited credits
     use_ai_credit(user_id)
-    print(f"[DEBUG] AI credit decremented for user {user_id}")
-
-    print(f"[SUCCESS] Returning download URL: /download-ai/{file_id}")
+    generate_log.info("AI report saved", path=ai_report_path, user_id=user_id)
 
     return jsonify({
         'success': True,
         'download_url': f'/download-ai/{file_id}'
     })
 
+def _pdf_pending(job):
+    """202 for a PDF still rendering: JSON with the poll URL, or a page that retries the download"""
+    poll_url = url_for('pdf_job_status', job_id=job['job_id'])
+    headers = {'Location': poll_url, 'Retry-After': '2'}
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'poll_url': poll_url,
+            'download_url': job.get('download_url')
+        }), 202, headers
+    return render_template('pdf_rendering.html', retry_seconds=2), 202, headers
+
+def _pdf_job(report_path, variant):
+    """(cache key, render function) for a stored report's PDF"""
+    with open(report_path, 'rb') as f:
+        html_bytes = f.read()
+    # Stylesheet links are content-hashed, so the stored HTML identifies the
+    # PDF without inlining the CSS first
+    key = pdf_cache_key(html_bytes, render_version(variant))
+
+    def render(pdf_path):
+        # Self-contained HTML: fingerprinted stylesheets inlined; relative
+        # resources resolve against the reports folder
+        pdf_sections.render_pdf(inline_stylesheets(html_bytes.decode('utf-8')), variant,
+                                target=pdf_path, base_url=os.path.dirname(report_path))
+
+    return key, render
+
+def _prerender_pdf(report_path, variant, download_url, user_id):
+    """Queue a low-priority PDF render of a report that was just saved; never fails the request"""
+    if not app.config['PDF_PRERENDER']:
+        return
+    try:
+        key, render = _pdf_job(report_path, variant)
+        if pdf_cache.get(key) is None:
+            pdf_queue.submit(key, render, speculative=True, owner=user_id, download_url=download_url)
+    except Exception as e:
+        pdf_log.warning("Could not queue PDF pre-render: %s", e, report=os.path.basename(report_path))
+
+def _cancel_prerender(report_path, variant):
+    """Withdraw a report's pending PDF pre-render (the report is being deleted)"""
+    try:
+        key, _ = _pdf_job(report_path, variant)
+    except OSError:
+        return
+    if pdf_queue.cancel(key):
+        pdf_log.debug("Cancelled PDF pre-render", report=os.path.basename(report_path))
+
+def _pdf_download(report_path, download_name, variant):
+    """
+    Send a stored report as a PDF. Served from the PDF cache when this exact
+    HTML has been rendered before (usually by the pre-render queued when the
+    report was saved). Otherwise the render is queued and the request waits
+    up to PDF_SYNC_WAIT seconds (or ?wait=N) for it; a render still running
+    then gets 202 with a poll URL. Concurrent requests for the same report
+    join one render.
+    """
+    key, render = _pdf_job(report_path, variant)
+
+    pdf_file = pdf_cache.get(key)
+    if pdf_file is not None:
+        pdf_queue.record_hit(key)
+    else:
+        try:
+            job = pdf_queue.submit(key, render, owner=session.get('user', {}).get('id'),
+                                   download_url=request.path)
+        except PdfQueueFull as e:
+            pdf_log.warning("Render queue full: %s", e, depth=pdf_queue.depth())
+            return jsonify({'error': 'PDF rendering is busy, please retry shortly'}), 503, {'Retry-After': '5'}
+
+        try:
+            wait = float(request.args.get('wait', app.config['PDF_SYNC_WAIT']))
+        except ValueError:
+            wait = app.config['PDF_SYNC_WAIT']
+        if not math.isfinite(wait):   # nan would never time out
+            wait = app.config['PDF_SYNC_WAIT']
+        wait = min(max(wait, 0), app.config['PDF_MAX_WAIT'])
+        job = pdf_queue.wait(key, wait) or job
+        if job['status'] == PDF_FAILED:
+            raise RuntimeError(job.get('error') or 'PDF render failed')
+        if job['status'] == PDF_DONE:
+            pdf_file = pdf_cache.get(key)
+        if pdf_file is None:
+            pdf_log.debug("PDF still rendering", job_id=key[:12], status=job['status'])
+            return _pdf_pending(job)
+
+    return send_file(
+        pdf_file,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype='application/pdf',
+        etag=key
+    )
+
 @app.route('/download/<file_id>')
 @app.route('/download/<file_id>/<format>')
 def download_report(file_id, format='html'):
@@ -1292,80 +1423,18 @@ def download_report(file_id, format='html'):
     # If PDF format requested, convert HTML to PDF
     if format.lower() == 'pdf':
         try:
-            pdf_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report.pdf")
-
-            # Read HTML and ensure styles are embedded
-            with open(report_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-
-            # Convert HTML to PDF using WeasyPrint with better settings
-            from weasyprint import CSS
-            from weasyprint.text.fonts import FontConfiguration
-
-            font_config = FontConfiguration()
-
-            # Create HTML object with base URL for resolving relative resources
-            html_doc = HTML(string=html_content, base_url=os.path.dirname(report_path))
-
-            # Professional PNOE-style PDF formatting
-            pdf_css = CSS(string='''
-                @page {
-                    size: letter;
-                    margin: 0.5in 0.5in;
-                }
-                body {
-                    -webkit-print-color-adjust: exact;
-                    print-color-adjust: exact;
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    font-size: 10pt;
-                    line-height: 1.4;
-                    color: #1F2937;
-                }
-                /* Ensure all styles from HTML are preserved */
-                * {
-                    -webkit-print-color-adjust: exact;
-                    print-color-adjust: exact;
-                }
-                /* Page break control */
-                .page-break {
-                    page-break-before: always;
-                }
-                .executive-summary,
-                .bio-age-section,
-                .patient-info,
-                .metrics-list,
-                .zones-list,
-                .action-list,
-                .protocol-list,
-                .interventions-grid {
-                    page-break-inside: avoid;
-                }
-            ''', font_config=font_config)
-
-            # Write PDF with optimized settings
-            html_doc.write_pdf(
-                pdf_path,
-                stylesheets=[pdf_css],
-                font_config=font_config,
-                presentational_hints=True,
-                optimize_size=('fonts', 'images')
-            )
-
-            return send_file(
-                pdf_path,
-                as_attachment=True,
-                download_name='pnoe_report.pdf',
-                mimetype='application/pdf'
-            )
+            return _pdf_download(report_path, 'pnoe_report.pdf', 'report')
         except Exception as e:
             print(f"PDF generation error: {e}")
             import traceback
             traceback.print_exc()
             return f"Error generating PDF: {str(e)}", 500
 
-    # Default: return HTML
+    # Default: return HTML (self-contained, with the stylesheet inlined)
+    with open(report_path, 'r', encoding='utf-8') as f:
+        html_content = inline_stylesheets(f.read())
     return send_file(
-        report_path,
+        io.BytesIO(html_content.encode('utf-8')),
         as_attachment=True,
         download_name='pnoe_report.html',
         mimetype='text/html'
@@ -1383,208 +1452,88 @@ def download_ai_report(file_id, format='html'):
     # If PDF format requested, convert HTML to PDF
     if format.lower() == 'pdf':
         try:
-            pdf_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report_with_ai.pdf")
-
-            # Read HTML and ensure styles are embedded
-            with open(report_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-
-            # Convert HTML to PDF using WeasyPrint with better settings
-            from weasyprint import CSS
-            from weasyprint.text.fonts import FontConfiguration
-
-            font_config = FontConfiguration()
-
-            # Create HTML object with base URL for resolving relative resources
-            html_doc = HTML(string=html_content, base_url=os.path.dirname(report_path))
-
-            # Professional PNOE-style PDF formatting
-            pdf_css = CSS(string='''
-                @page {
-                    size: letter;
-                    margin: 0.5in 0.5in;
-                }
-                body {
-                    -webkit-print-color-adjust: exact;
-                    print-color-adjust: exact;
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    font-size: 10pt;
-                    line-height: 1.4;
-                    color: #1F2937;
-                }
-                /* Ensure all styles from HTML are preserved */
-                * {
-                    -webkit-print-color-adjust: exact;
-                    print-color-adjust: exact;
-                }
-                /* Page break control */
-                .page-break {
-                    page-break-before: always;
-                }
-                .executive-summary,
-                .bio-age-section,
-                .patient-info,
-                .metrics-list,
-                .zones-list,
-                .action-list,
-                .protocol-list,
-                .interventions-grid {
-                    page-break-inside: avoid;
-                }
-            ''', font_config=font_config)
-
-            # Write PDF with optimized settings
-            html_doc.write_pdf(
-                pdf_path,
-                stylesheets=[pdf_css],
-                font_config=font_config,
-                presentational_hints=True,
-                optimize_size=('fonts', 'images')
-            )
-
-            return send_file(
-                pdf_path,
-                as_attachment=True,
-                download_name='pnoe_report_with_ai.pdf',
-                mimetype='application/pdf'
-            )
+            return _pdf_download(report_path, 'pnoe_report_with_ai.pdf', 'report_with_ai')
         except Exception as e:
             print(f"PDF generation error: {e}")
             import traceback
             traceback.print_exc()
             return f"Error generating PDF: {str(e)}", 500
 
-    # Default: return HTML
+    # Default: return HTML (self-contained, with the stylesheet inlined)
     try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            html_content = inline_stylesheets(f.read())
         return send_file(
-            report_path,
+            io.BytesIO(html_content.encode('utf-8')),
             as_attachment=True,
             download_name='pnoe_report_with_ai.html',
             mimetype='text/html',
-            max_age=0,
-            conditional=True
+            max_age=0
         )
     except Exception as e:
         print(f"[DOWNLOAD ERROR] Failed to send file: {e}")
         return f"Download error: {str(e)}", 500
 
-@app.route('/view/<file_id>')
-def view_report(file_id):
-    """View generated report in browser with download button"""
+def _stream_report_view(file_id, report_path, download_route, not_found):
+    """
+    Stream a stored report with the nav buttons spliced in after <body>:
+    from the database row when there is one, else from report_path on disk
+    """
+    nav = nav_buttons(file_id, download_route)
 
     # First try to get from database
     try:
-        response = supabase.table('reports').select('html_content').eq('file_id', file_id).execute()
+        try:
+            response = supabase.table('reports').select('html_content, body_offset').eq('file_id', file_id).execute()
+        except Exception as e:
+            if 'body_offset' not in str(e):
+                raise
+            # migrations/report_body_offset.sql not applied yet - iter_report_view finds <body> itself
+            view_log.warning("reports.body_offset missing (run migrations/report_body_offset.sql)", file_id=file_id)
+            response = supabase.table('reports').select('html_content').eq('file_id', file_id).execute()
         if response.data and len(response.data) > 0:
-            report_html = response.data[0]['html_content']
-            print(f"[VIEW] Fetched report {file_id} from database")
-        else:
-            # Fallback to file system
-            report_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report.html")
-            if not os.path.exists(report_path):
-                return "Report not found", 404
-            with open(report_path, 'r') as f:
-                report_html = f.read()
-            print(f"[VIEW] Fetched report {file_id} from file system")
+            row = response.data[0]
+            view_log.debug("Fetched report from database", file_id=file_id, route=download_route)
+            return Response(iter_report_view(row['html_content'], nav, row.get('body_offset')),
+                            mimetype='text/html')
     except Exception as e:
         # Fallback to file system if database fails
-        print(f"[VIEW] Database error: {e}, falling back to file system")
-        report_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report.html")
-        if not os.path.exists(report_path):
-            return "Report not found", 404
-        with open(report_path, 'r') as f:
-            report_html = f.read()
-
-    # Add navigation buttons at the top of the report
-    nav_buttons = f'''
-    <div style="position: fixed; top: 20px; right: 20px; z-index: 10000; display: flex; gap: 10px; flex-wrap: wrap;">
-        <a href="/dashboard"
-           style="display: inline-block; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
-                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
-                  transition: all 0.3s ease;">
-            ← Back to Dashboard
-        </a>
-        <a href="/download/{file_id}/html"
-           style="display: inline-block; background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
-                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(16, 185, 129, 0.4);
-                  transition: all 0.3s ease;">
-            📥 Download HTML
-        </a>
-        <a href="/download/{file_id}/pdf"
-           style="display: inline-block; background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%);
-                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
-                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(239, 68, 68, 0.4);
-                  transition: all 0.3s ease;">
-            📄 Download PDF
-        </a>
-    </div>
-    '''
+        view_log.warning("Database error: %s, falling back to file system", e, file_id=file_id)
+
+    if not os.path.exists(report_path):
+        return not_found, 404
+    view_log.debug("Streaming report from file system", file_id=file_id, route=download_route)
+    return Response(iter_report_file_view(report_path, nav), mimetype='text/html')
 
-    # Insert navigation buttons after body tag
-    report_with_nav = report_html.replace('<body>', f'<body>{nav_buttons}')
+@app.route('/api/pdf-jobs/<job_id>', methods=['GET'])
+@login_required
+def pdf_job_status(job_id):
+    """Poll a queued PDF render: queued, running, done or failed"""
+    job = pdf_queue.get(secure_filename(job_id))
+    if not job or session['user']['id'] not in job.get('owners', []):
+        return jsonify({'error': 'PDF job not found'}), 404
+
+    response = {
+        'job_id': job_id,
+        'status': job['status'],
+        'error': job.get('error'),
+        'queue_depth': pdf_queue.depth()
+    }
+    if job['status'] == PDF_DONE:
+        response['download_url'] = job.get('download_url')
+    return jsonify(response)
 
-    return report_with_nav
+@app.route('/view/<file_id>')
+def view_report(file_id):
+    """View generated report in browser with download button"""
+    report_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report.html")
+    return _stream_report_view(file_id, report_path, '/download', "Report not found")
 
 @app.route('/view-ai/<file_id>')
 def view_ai_report(file_id):
     """View report with AI recommendations in browser with download button"""
-
-    # First try to get from database
-    try:
-        response = supabase.table('reports').select('html_content').eq('file_id', file_id).execute()
-        if response.data and len(response.data) > 0:
-            report_html = response.data[0]['html_content']
-            print(f"[VIEW-AI] Fetched report {file_id} from database")
-        else:
-            # Fallback to file system
-            report_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report_with_ai.html")
-            if not os.path.exists(report_path):
-                return "Report with AI not found", 404
-            with open(report_path, 'r') as f:
-                report_html = f.read()
-            print(f"[VIEW-AI] Fetched report {file_id} from file system")
-    except Exception as e:
-        # Fallback to file system if database fails
-        print(f"[VIEW-AI] Database error: {e}, falling back to file system")
-        report_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report_with_ai.html")
-        if not os.path.exists(report_path):
-            return "Report with AI not found", 404
-        with open(report_path, 'r') as f:
-            report_html = f.read()
-
-    # Add navigation buttons at the top of the report
-    nav_buttons = f'''
-    <div style="position: fixed; top: 20px; right: 20px; z-index: 10000; display: flex; gap: 10px; flex-wrap: wrap;">
-        <a href="/dashboard"
-           style="display: inline-block; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
-                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
-                  transition: all 0.3s ease;">
-            ← Back to Dashboard
-        </a>
-        <a href="/download-ai/{file_id}/html"
-           style="display: inline-block; background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
-                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(16, 185, 129, 0.4);
-                  transition: all 0.3s ease;">
-            📥 Download HTML
-        </a>
-        <a href="/download-ai/{file_id}/pdf"
-           style="display: inline-block; background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%);
-                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
-                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(239, 68, 68, 0.4);
-                  transition: all 0.3s ease;">
-            📄 Download PDF
-        </a>
-    </div>
-    '''
-
-    # Insert navigation buttons after body tag
-    report_with_nav = report_html.replace('<body>', f'<body>{nav_buttons}')
-
-    return report_with_nav
+    report_path = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report_with_ai.html")
+    return _stream_report_view(file_id, report_path, '/download-ai', "Report with AI not found")
 
 @app.route('/api/my-reports', methods=['GET'])
 @login_required
@@ -1712,6 +1661,10 @@ def delete_report(report_id):
             basic_report = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report.html")
             ai_report = os.path.join(app.config['REPORTS_FOLDER'], f"{file_id}_report_with_ai.html")
 
+            # Nothing left to download: drop any queued PDF pre-renders
+            _cancel_prerender(basic_report, 'report')
+            _cancel_prerender(ai_report, 'report_with_ai')
+
             # Delete files if they exist
             if os.path.exists(basic_report):
                 print(f"[DELETE REPORT] Deleting {basic_report}")
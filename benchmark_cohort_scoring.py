@@ -0,0 +1,159 @@
+"""
+Cohort Scoring Benchmark
+
+Scores a synthetic cohort with the per-patient functions and with the
+vectorized utils/cohort_scoring.py and reports the time for both. Parity
+between the two paths is checked by tests/test_cohort_scoring.py, which
+reuses the synthetic cohorts below.
+
+Usage:
+    python benchmark_cohort_scoring.py [--patients N] [--seed S]
+"""
+import argparse
+import contextlib
+import copy
+import io
+import sys
+import os
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+
+from calculate_scores import (
+    enhance_extracted_data_with_calculated_scores, calculate_biological_age
+)
+from cohort_scoring import (
+    cohort_from_extracted, cohort_from_ergometry, score_cohort, ergometry_core_scores
+)
+from ergometry_calculator import score_ergometry_data
+from field_specs import CORE_SCORE_KEYS
+from time_series import SeriesColumn, new_time_series, summarize
+
+
+def _maybe(rng, probability, value):
+    return value if rng.random() < probability else None
+
+
+def synthetic_extracted(rng, n):
+    """extracted_data dicts without PDF core scores, with realistic gaps and bad values"""
+    records = []
+    for _ in range(n):
+        gender = rng.choice(['Male', 'Female'])
+        weight = round(float(rng.uniform(45, 130)), 1)
+        height = int(rng.integers(150, 200))
+        age = int(rng.integers(18, 85))
+        patient = {'name': 'synthetic', 'gender': gender, 'age': age, 'weight_kg': weight, 'height_cm': height}
+
+        metabolic, caloric = {}, {}
+        rmr = _maybe(rng, 0.7, int(rng.uniform(700, 3200)))
+        if rmr is not None:
+            metabolic['rmr'] = rmr
+        if rng.random() < 0.5:
+            caloric['rmr'] = int(rng.uniform(900, 2600))
+        if rng.random() < 0.7:
+            metabolic['rer'] = round(float(rng.uniform(0.6, 1.1)), 3)
+        if rng.random() < 0.3:
+            fat = int(rng.integers(10, 95))
+            caloric['fat_percent'], caloric['cho_percent'] = fat, 100 - fat
+        vo2_source = rng.random()
+        if vo2_source < 0.3:
+            metabolic['vo2max_rel'] = round(float(rng.uniform(8, 65)), 1)
+        elif vo2_source < 0.45:
+            metabolic['vo2max_abs'] = round(float(rng.uniform(0.5, 5.5)), 2)
+
+        records.append({'patient_info': patient, 'core_scores': {},
+                        'metabolic_data': metabolic, 'caloric_data': caloric})
+    return records
+
+
+def synthetic_ergometry(rng, n):
+    """extract_ergometry_data-shaped dicts: chart-range PDFs and measured breath tables"""
+    datasets = []
+    for _ in range(n):
+        measured = rng.random() < 0.5
+        patient = {}
+        if rng.random() < 0.9:
+            patient = {'gender': rng.choice(['Male', 'Female']), 'age': int(rng.integers(18, 85)),
+                       'weight_kg': round(float(rng.uniform(45, 130)), 1),
+                       'height_cm': int(rng.integers(150, 200))}
+        series = new_time_series()
+        samples = int(rng.integers(6, 40))
+        channels = {
+            'vo2': rng.normal(rng.uniform(180, 420), 15, samples),
+            'vco2': rng.normal(rng.uniform(150, 380), 15, samples),
+            'rer': rng.normal(rng.uniform(0.68, 1.05), 0.03, samples),
+            'hr': rng.normal(rng.uniform(45, 105), 4, samples),
+            've_vo2': rng.normal(rng.uniform(16, 52), 2, samples),
+            've_vco2': rng.normal(rng.uniform(22, 45), 2, samples),
+        }
+        for channel, values in channels.items():
+            if rng.random() < 0.7:
+                series[channel] = SeriesColumn(values)
+        data = {'patient_info': patient, 'time_series': series, 'summary_stats': {},
+                'chart_ranges': {}, 'data_source': 'breath_by_breath' if measured else 'pdf'}
+        summarize(series, data['summary_stats'])
+        if not measured and rng.random() < 0.5:
+            low = int(rng.integers(45, 80))
+            data['chart_ranges'] = {'hr_min': low, 'hr_max': low + int(rng.integers(10, 60))}
+        datasets.append(data)
+    return datasets
+
+
+def scalar_extracted(records):
+    scores = {key: [] for key in CORE_SCORE_KEYS + ('biological_age',)}
+    for record in records:
+        data = enhance_extracted_data_with_calculated_scores(copy.deepcopy(record))
+        bio_age = calculate_biological_age(data['patient_info'], data['core_scores'], data['metabolic_data'])
+        for key in CORE_SCORE_KEYS:
+            scores[key].append(data['core_scores'][key])
+        scores['biological_age'].append(np.nan if bio_age is None else bio_age)
+    return {key: np.array(values, dtype=np.float64) for key, values in scores.items()}
+
+
+def scalar_ergometry(datasets):
+    scores = {key: [] for key in CORE_SCORE_KEYS}
+    for data in datasets:
+        result = score_ergometry_data(data)
+        for key in CORE_SCORE_KEYS:
+            scores[key].append(result['core_scores'][key])
+    return {key: np.array(values, dtype=np.float64) for key, values in scores.items()}
+
+
+def timed(fn, *args):
+    """Run fn with its debug prints suppressed; returns (result, seconds)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scalar vs vectorized cohort scoring time')
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    records = synthetic_extracted(rng, args.patients)
+    datasets = synthetic_ergometry(rng, args.patients)
+    print(f"{args.patients} synthetic patients per path (seed {args.seed})\n")
+
+    print(f"{'path':<26}{'scalar ms':>12}{'build ms':>12}{'vector ms':>12}{'speedup':>10}")
+    print('-' * 72)
+    for label, scalar_fn, build_fn, vector_fn, inputs in (
+        ('metabolic + bio age', scalar_extracted, cohort_from_extracted, score_cohort, records),
+        ('ergometry', scalar_ergometry, cohort_from_ergometry, ergometry_core_scores, datasets),
+    ):
+        _, scalar_s = timed(scalar_fn, inputs)
+        cohort, build_s = timed(build_fn, inputs)
+        _, vector_s = timed(vector_fn, cohort)
+        print(f"{label:<26}{scalar_s * 1000:>12.1f}{build_s * 1000:>12.1f}{vector_s * 1000:>12.2f}"
+              f"{scalar_s / vector_s:>9.0f}x")
+    print('-' * 72)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
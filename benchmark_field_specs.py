@@ -0,0 +1,115 @@
+"""
+Field-Spec Extraction Benchmark
+
+Measures the declarative FieldSpec table (utils/field_specs.py) against the
+previous approach of calling re.search with an uncompiled pattern for every
+field on every page.
+
+Usage:
+    python benchmark_field_specs.py [extra.pdf ...] [--repeat N]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.ergometry_calculator import ParsedPDF
+from utils.field_specs import ALL_FIELDS, FIRST, FieldMatcher
+
+SAMPLE_GLOB = os.path.join('static', 'samples', '*.pdf')
+
+
+def load_pages(paths):
+    """Page text for every PDF (parsed once, outside the timed region)"""
+    pages = []
+    for path in paths:
+        with ParsedPDF(path) as doc:
+            pages.append([doc.page_text(i) for i in range(len(doc))])
+    return pages
+
+
+def legacy_pass(documents):
+    """Every pattern, uncompiled, on every page (the pre-FieldSpec loop)"""
+    for doc_pages in documents:
+        for text in doc_pages:
+            for spec in ALL_FIELDS:
+                re.search(spec.pattern.pattern, text, spec.pattern.flags)
+
+
+def matcher_pass(matcher, documents):
+    for doc_pages in documents:
+        matcher.extract(doc_pages)
+
+
+def per_field_costs(documents, repeat):
+    """Microseconds per page for each spec: raw regex vs prefilter + regex"""
+    all_pages = [text for doc_pages in documents for text in doc_pages]
+    lowered = [text.lower() for text in all_pages]
+    rows = []
+    for spec in ALL_FIELDS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text in all_pages:
+                spec.pattern.search(text)
+        raw = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text, low in zip(all_pages, lowered):
+                if spec.applies_to(low):
+                    spec.pattern.search(text)
+        filtered = time.perf_counter() - start
+
+        hits = sum(1 for text in all_pages if spec.pattern.search(text))
+        calls = repeat * max(len(all_pages), 1)
+        rows.append((spec.name, spec.policy, hits, raw / calls * 1e6, filtered / calls * 1e6))
+    return rows
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FieldSpec extraction')
+    parser.add_argument('pdfs', nargs='*', help='additional PDFs to include')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(SAMPLE_GLOB)) + args.pdfs
+    if not paths:
+        print(f"No PDFs found (looked in {SAMPLE_GLOB})")
+        return 1
+
+    documents = load_pages(paths)
+    page_count = sum(len(d) for d in documents)
+    print(f"{len(paths)} PDFs, {page_count} pages, {len(ALL_FIELDS)} field specs, repeat={args.repeat}\n")
+
+    print(f"{'field':<18}{'policy':<8}{'pages hit':>10}{'regex us/page':>16}{'filtered us/page':>18}")
+    print('-' * 70)
+    for name, policy, hits, raw, filtered in per_field_costs(documents, args.repeat):
+        print(f"{name:<18}{policy:<8}{hits:>10}{raw:>16.2f}{filtered:>18.2f}")
+
+    matcher = FieldMatcher(ALL_FIELDS)
+    legacy_ms = timed(lambda: legacy_pass(documents), args.repeat)
+    matcher_ms = timed(lambda: matcher_pass(matcher, documents), args.repeat)
+    first_wins = sum(1 for spec in ALL_FIELDS if spec.policy == FIRST)
+
+    print('-' * 70)
+    print(f"legacy re.search loop:   {legacy_ms:8.3f} ms / corpus")
+    print(f"FieldMatcher one pass:   {matcher_ms:8.3f} ms / corpus "
+          f"({first_wins} first-wins specs skipped once filled)")
+    if matcher_ms:
+        print(f"speedup:                 {legacy_ms / matcher_ms:8.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Report Pipeline Logging Benchmark
+
+Per-request logging overhead of the scoring steps behind /generate
+(enhance + biological age + peptide recommendations) and of the
+login_required check, with stdout sent to /dev/null the way gunicorn
+--capture-output drains it.
+
+Levels compared:
+    DEBUG    every record formatted and written - the volume the old
+             always-on print() narration produced
+    INFO     the default: one summary line per step
+    WARNING  production with summaries off
+    off      logging.disable(): the floor, no logging at all
+
+The login check is also timed against the three f-string prints it replaced.
+
+Usage:
+    python benchmark_logging.py [--requests N]
+"""
+import argparse
+import contextlib
+import copy
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+
+from calculate_scores import enhance_extracted_data_with_calculated_scores, calculate_biological_age
+from peptide_recommendations import calculate_peptide_recommendations
+from report_log import configure, get_logger, lazy
+
+PATIENT = {
+    'patient_info': {'name': 'Benchmark Patient', 'test_date': '01/15/2025', 'gender': 'Male',
+                     'age': 44, 'weight_kg': 82, 'height_cm': 180},
+    'core_scores': {},
+    'metabolic_data': {'rmr': 1750, 'rer': 0.84, 'vo2max_rel': 41.5},
+    'caloric_data': {},
+}
+SESSION = {'user': {'id': 'user-1234', 'email': 'someone@example.com'}, '_permanent': True, '_fresh': True}
+
+auth_log = get_logger('app.auth', 'LOGIN_CHECK')
+
+
+def score_request():
+    """The logged scoring work of one /generate call"""
+    data = enhance_extracted_data_with_calculated_scores(copy.deepcopy(PATIENT))
+    bio_age = calculate_biological_age(data['patient_info'], data['core_scores'], data['metabolic_data'])
+    calculate_peptide_recommendations(data['patient_info'], data['core_scores'], data['metabolic_data'],
+                                      bio_age, data['patient_info']['age'])
+
+
+def login_check_print(session=SESSION, endpoint='generate_report'):
+    print(f"[LOGIN_CHECK] Route: {endpoint}")
+    print(f"[LOGIN_CHECK] Session keys: {list(session.keys())}")
+    print(f"[LOGIN_CHECK] Has user: {'user' in session}")
+    print(f"[LOGIN_CHECK] User authenticated: {session['user'].get('id', 'unknown')}")
+
+
+def login_check_log(session=SESSION, endpoint='generate_report'):
+    auth_log.debug("User authenticated", route=endpoint, user_id=session['user'].get('id', 'unknown'),
+                   session_keys=lazy(lambda: list(session.keys())))
+
+
+def per_call_us(fn, n, repeats=5):
+    """Best of `repeats` runs of n calls, in microseconds per call"""
+    best = float('inf')
+    with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+        fn()  # warm up
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(n):
+                fn()
+            best = min(best, time.perf_counter() - start)
+    return best / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report pipeline logging overhead')
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    n = args.requests
+
+    settings = [
+        ('DEBUG', dict(levels='DEBUG', sample_rates={})),
+        ('DEBUG, auth 1/100', dict(levels='DEBUG', sample_rates={'app.auth': 100})),
+        ('INFO', dict(levels='INFO', sample_rates={})),
+        ('WARNING', dict(levels='WARNING', sample_rates={})),
+    ]
+
+    print(f"{n} requests per setting, stdout -> /dev/null\n")
+    print(f"{'level':<22}{'scoring us/req':>16}{'login check us/req':>20}")
+    print('-' * 58)
+    results = {}
+    for label, kwargs in settings:
+        configure(redact_phi=True, **kwargs)
+        results[label] = (per_call_us(score_request, n), per_call_us(login_check_log, n * 10))
+        print(f"{label:<22}{results[label][0]:>16.1f}{results[label][1]:>20.2f}")
+
+    logging.disable(logging.CRITICAL)
+    floor = (per_call_us(score_request, n), per_call_us(login_check_log, n * 10))
+    logging.disable(logging.NOTSET)
+    print(f"{'off':<22}{floor[0]:>16.1f}{floor[1]:>20.2f}")
+    print(f"{'print() (old)':<22}{'':>16}{per_call_us(login_check_print, n * 10):>20.2f}")
+    print('-' * 58)
+
+    debug, production = results['DEBUG'][0], results['WARNING'][0]
+    print(f"Logging overhead per request: DEBUG {debug - floor[0]:.1f} us, "
+          f"INFO {results['INFO'][0] - floor[0]:.1f} us, WARNING {production - floor[0]:.1f} us")
+    configure()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+PDF Rendering Setup Benchmark
+
+How much per-render setup the PDF rendering service (utils/pdf_render.py)
+removes from /download/<id>/pdf. The old routes built a FontConfiguration
+and parsed the print stylesheet with CSS(string=...) for every render;
+PdfRenderer builds them once per worker thread.
+
+Rows:
+    setup per render     FontConfiguration() + CSS(string=PRINT_CSS) - the
+                         work every old render repeated
+    old render           that setup plus write_pdf, per PDF
+    PdfRenderer          render_pdf() with the shared setup, per PDF
+    first render         a fresh process's first PDF, without / with
+                         warm_up() at startup
+
+The report is the basic PNOE report with its stylesheet inlined, as the
+download route renders it. Remote assets are served offline from the
+report asset cache (seed_report_assets.py), so network time is excluded.
+
+Usage:
+    python benchmark_pdf_rendering.py [--renders N]
+"""
+import argparse
+import copy
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+os.environ.setdefault('REPORT_LOG_LEVEL', 'WARNING')
+
+from asset_cache import AssetCache, ReportURLFetcher
+from ai_basic_report import generate_beautiful_report
+from pdf_render import WRITE_PDF_OPTIONS, PdfRenderer
+from report_styles import PRINT_CSS, inline_stylesheets
+
+PATIENT = {
+    'patient_info': {'name': 'Benchmark Patient', 'test_date': '01/15/2025', 'gender': 'Male',
+                     'age': 44, 'weight_kg': 82, 'height_cm': 180},
+    'core_scores': {},
+    'metabolic_data': {'rmr': 1750, 'rer': 0.84, 'vo2max_rel': 41.5},
+    'caloric_data': {},
+}
+
+# Time to a process's first PDF, run in a subprocess so pango and fontconfig start cold
+FIRST_RENDER = '''
+import os, sys, time
+sys.path.insert(0, {utils!r})
+from pdf_render import PdfRenderer
+renderer = PdfRenderer()
+if {warm}:
+    renderer.warm_up()
+start = time.perf_counter()
+renderer.render_pdf(open({html_path!r}, encoding='utf-8').read(), 'report')
+print(time.perf_counter() - start)
+'''
+
+
+def old_setup():
+    """The setup each old render repeated"""
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    return font_config, CSS(string=PRINT_CSS, font_config=font_config)
+
+
+def old_render(html, url_fetcher):
+    from weasyprint import HTML
+
+    font_config, pdf_css = old_setup()
+    return HTML(string=html, url_fetcher=url_fetcher).write_pdf(
+        stylesheets=[pdf_css], font_config=font_config, **WRITE_PDF_OPTIONS)
+
+
+def per_call_ms(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e3
+
+
+def first_render_ms(html_path, warm):
+    script = FIRST_RENDER.format(utils=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'),
+                                 warm=warm, html_path=html_path)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip()) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF render setup cost, old routes vs PdfRenderer')
+    parser.add_argument('--renders', type=int, default=20)
+    args = parser.parse_args()
+    n = args.renders
+
+    html = inline_stylesheets(generate_beautiful_report(copy.deepcopy(PATIENT), {'report_type': 'performance'}))
+    url_fetcher = ReportURLFetcher(AssetCache(), offline=True)
+    renderer = PdfRenderer(url_fetcher=url_fetcher)
+
+    # Warm both paths (pango, fontconfig, asset cache) before timing
+    old_render(html, url_fetcher)
+    renderer.warm_up()
+    renderer.render_pdf(html, 'report')
+
+    setup_ms = per_call_ms(old_setup, n * 5)
+    old_ms = per_call_ms(lambda: old_render(html, url_fetcher), n)
+    new_ms = per_call_ms(lambda: renderer.render_pdf(html, 'report'), n)
+
+    html_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports', '_benchmark_pdf.html')
+    os.makedirs(os.path.dirname(html_path), exist_ok=True)
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    try:
+        cold_ms = first_render_ms(html_path, warm=False)
+        warmed_ms = first_render_ms(html_path, warm=True)
+    finally:
+        os.unlink(html_path)
+
+    print(f"Basic report, {len(html.encode('utf-8')) / 1024:.0f} KB HTML, {n} renders\n")
+    print(f"{'':<30}{'ms':>10}")
+    print('-' * 40)
+    print(f"{'setup per render (removed)':<30}{setup_ms:>10.2f}")
+    print(f"{'old render':<30}{old_ms:>10.1f}")
+    print(f"{'PdfRenderer':<30}{new_ms:>10.1f}")
+    print(f"{'first render, cold':<30}{cold_ms:>10.1f}")
+    print(f"{'first render, after warm_up':<30}{warmed_ms:>10.1f}")
+    print('-' * 40)
+    print(f"Saved per render: {old_ms - new_ms:.1f} ms ({(old_ms - new_ms) / old_ms * 100:.1f}%)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
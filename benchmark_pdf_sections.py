@@ -0,0 +1,110 @@
+"""
+Section-Parallel PDF Rendering Benchmark
+
+Wall-clock time to one PDF per report tier, rendered as one document by
+PdfRenderer and split at its forced page breaks by SectionRenderer
+(utils/pdf_sections.py). Both are warmed first; the section pool is
+started before timing, as it is after a web worker's first split render.
+
+Columns:
+    sections   chunks the report was split into, or why it rendered serially
+    serial     PdfRenderer.render_pdf, ms per PDF
+    split      SectionRenderer.render_pdf, ms per PDF (render + merge)
+    pages      serial / split page counts - they must match
+    KB         serial / split PDF sizes (chunks embed their own font subsets)
+
+The super premium tier cannot be split (no forced page breaks, counters
+on top-level sections), so it renders serially either way - the baseline.
+Remote assets come from the report asset cache (seed_report_assets.py),
+offline, so network time is excluded. No render slots are passed, so
+every split render uses all --workers processes.
+
+Usage:
+    python benchmark_pdf_sections.py [--workers N] [--renders N]
+"""
+import argparse
+import copy
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+os.environ.setdefault('REPORT_LOG_LEVEL', 'WARNING')
+os.environ.setdefault('REPORT_ASSETS_OFFLINE', '1')
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+from asset_cache import ASSET_CACHE_DIR, AssetCache, ReportURLFetcher
+from ai_basic_report import generate_beautiful_report
+from ai_premium_report import generate_premium_report
+from ai_super_premium_report import generate_super_premium_report
+from pdf_render import PDF_VARIANTS, PdfRenderer
+from pdf_sections import SectionRenderer, split_sections
+from report_styles import inline_stylesheets
+
+PATIENT = {
+    'patient_info': {'name': 'Benchmark Patient', 'test_date': '01/15/2025', 'gender': 'Male',
+                     'age': 44, 'weight_kg': 82, 'height_cm': 180},
+    'core_scores': {},
+    'metabolic_data': {'rmr': 1750, 'rer': 0.84, 'vo2max_rel': 41.5},
+    'caloric_data': {},
+}
+
+TIERS = [
+    ('basic', generate_beautiful_report),
+    ('premium', generate_premium_report),
+    ('super premium', generate_super_premium_report),
+]
+
+
+def page_count(pdf):
+    return len(list(PDFPage.create_pages(PDFDocument(PDFParser(io.BytesIO(pdf))))))
+
+
+def per_call_ms(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        result = fn()
+    return (time.perf_counter() - start) / n * 1e3, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serial vs section-parallel PDF rendering per report tier')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--renders', type=int, default=5)
+    args = parser.parse_args()
+
+    renderer = PdfRenderer(url_fetcher=ReportURLFetcher(AssetCache(), offline=True))
+    sections = SectionRenderer(renderer, workers=args.workers, asset_dir=ASSET_CACHE_DIR)
+    renderer.warm_up()
+
+    print(f"{args.workers} section workers, {args.renders} renders per row\n")
+    print(f"{'tier':<15}{'sections':>20}{'serial ms':>12}{'split ms':>12}{'speedup':>9}{'pages':>10}{'KB':>14}")
+    print('-' * 92)
+    mismatched = 0
+    for tier, generate in TIERS:
+        html = inline_stylesheets(generate(copy.deepcopy(PATIENT), {'report_type': 'performance'}))
+        chunks, reason = split_sections(html, PDF_VARIANTS['report'], args.workers)
+
+        sections.render_pdf(html, 'report')   # starts the pool before timing
+        serial_ms, serial_pdf = per_call_ms(lambda: renderer.render_pdf(html, 'report'), args.renders)
+        split_ms, split_pdf = per_call_ms(lambda: sections.render_pdf(html, 'report'), args.renders)
+
+        pages = (page_count(serial_pdf), page_count(split_pdf))
+        mismatched += pages[0] != pages[1]
+        print(f"{tier:<15}{reason or len(chunks):>20}{serial_ms:>12.0f}{split_ms:>12.0f}"
+              f"{serial_ms / split_ms:>8.1f}x{pages[0]:>5} / {pages[1]:<3}"
+              f"{len(serial_pdf) / 1024:>6.0f} / {len(split_pdf) / 1024:<6.0f}")
+    print('-' * 92)
+    print(sections.stats())
+    if mismatched:
+        print(f"Page counts differ for {mismatched} tier(s)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Report Rendering Benchmark
+
+Time to render one report per tier - basic (PNOE professional), premium and
+super premium (SP comprehensive blueprint) - through the same generator
+functions /generate calls. The report model is built before timing, so the
+numbers are the template work: Jinja2 macros for the patient sections plus
+the patient-independent fragments rendered once per process.
+
+Columns:
+    first     the first report in this process: loads each template (from
+              the bytecode cache after the first run on this machine) and
+              renders the static fragments
+    warm      best-of-5 average once templates and fragments are cached
+    no frag   warm templates, but fragment caches cleared before every report
+              (static sections and score bars re-rendered each time)
+
+Run it on two commits to compare template changes.
+
+Usage:
+    python benchmark_report_rendering.py [--reports N]
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+os.environ.setdefault('REPORT_LOG_LEVEL', 'WARNING')
+
+from ai_basic_report import generate_beautiful_report
+from ai_premium_report import generate_premium_report
+from ai_super_premium_report import generate_super_premium_report
+from report_jinja import cached_fragment, static_fragment
+from report_model import build_report_model
+
+PATIENT = {
+    'patient_info': {'name': 'Benchmark Patient', 'test_date': '01/15/2025', 'gender': 'Male',
+                     'age': 44, 'weight_kg': 82, 'height_cm': 180},
+    'core_scores': {},
+    'metabolic_data': {'rmr': 1750, 'rer': 0.84, 'vo2max_rel': 41.5},
+    'caloric_data': {},
+}
+CUSTOM = {'report_type': 'performance'}
+
+TIERS = [
+    ('basic', generate_beautiful_report),
+    ('premium', generate_premium_report),
+    ('super premium', generate_super_premium_report),
+]
+
+
+def render_once(generate):
+    return generate(copy.deepcopy(PATIENT), dict(CUSTOM))
+
+
+def per_report_ms(generate, n, repeats=5, clear_fragments=False):
+    """Best of `repeats` runs of n reports, in milliseconds per report"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(n):
+            if clear_fragments:
+                static_fragment.cache_clear()
+                cached_fragment.cache_clear()
+            render_once(generate)
+        best = min(best, time.perf_counter() - start)
+    return best / n * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report rendering time per tier')
+    parser.add_argument('--reports', type=int, default=200)
+    args = parser.parse_args()
+    n = args.reports
+
+    # Model computed (and cached) up front - only rendering is timed
+    build_report_model(copy.deepcopy(PATIENT), dict(CUSTOM))
+
+    print(f"{n} reports per tier, report model cached\n")
+    print(f"{'tier':<16}{'size KB':>9}{'first ms':>10}{'warm ms':>10}{'no frag ms':>12}")
+    print('-' * 57)
+    for label, generate in TIERS:
+        start = time.perf_counter()
+        html = render_once(generate)
+        first = (time.perf_counter() - start) * 1e3
+
+        warm = per_report_ms(generate, n)
+        no_fragments = per_report_ms(generate, n, clear_fragments=True)
+        print(f"{label:<16}{len(html.encode('utf-8')) / 1024:>9.1f}{first:>10.2f}{warm:>10.3f}{no_fragments:>12.3f}")
+    print('-' * 57)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Bulk Ingestion CLI
+
+Runs extract -> score -> render for every test in a directory or glob on a
+process pool, one file per task, and appends one JSON line per file to a
+results manifest as soon as that file finishes. Rerunning with the same
+manifest skips inputs that are unchanged since their last successful run
+and retries the ones that failed (see utils/batch_checkpoint.py).
+
+Inputs can be PNOE PDFs, breath-by-breath CSV/XLSX exports, or previously
+saved `<file_id>_data.json` files (re-rendered from the stored data without
+extracting again).
+
+Usage:
+    python3 bulk_ingest.py ~/PNOE_tests --jobs 8
+    python3 bulk_ingest.py 'archive/**/*.pdf' --tier premium --report-type Longevity
+    python3 bulk_ingest.py 'uploads/*_data.json'              # re-render stored data
+    python3 bulk_ingest.py ~/PNOE_tests --no-render --mapping mappings.json
+    python3 bulk_ingest.py ~/PNOE_tests --force                # ignore the checkpoint
+
+`--mapping` is a JSON object of lowercase patient name -> existing file id,
+so reprocessed tests overwrite the data files the web app already knows
+about. Without it, file ids are the MD5 of the file content (same as
+upload_report.py).
+"""
+import argparse
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# Add utils to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from batch_checkpoint import BatchCheckpoint, content_hash, pipeline_version
+from report_log import LEVEL_ENV
+
+INPUT_EXTENSIONS = ('.pdf', '.csv', '.xlsx')
+DATA_SUFFIX = '_data.json'
+DEFAULT_MANIFEST = 'ingest_manifest.jsonl'
+
+# Report tier -> (module, generator function); imported lazily in the workers
+REPORT_TIERS = {
+    'basic': ('ai_basic_report', 'generate_beautiful_report'),
+    'premium': ('ai_premium_report', 'generate_premium_report'),
+    'super_premium': ('ai_super_premium_report', 'generate_super_premium_report'),
+}
+
+_GLOB_CHARS = re.compile(r'[*?\[]')
+
+
+def _is_input(filename: str) -> bool:
+    if filename.startswith('._'):  # macOS resource forks
+        return False
+    return filename.lower().endswith(INPUT_EXTENSIONS) or filename.endswith(DATA_SUFFIX)
+
+
+def find_inputs(patterns: Iterable[str]) -> List[str]:
+    """Expand directories (recursively), globs and plain paths into a sorted, de-duplicated file list"""
+    found = set()
+    for pattern in patterns:
+        pattern = os.path.expanduser(pattern)
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))]
+                found.update(os.path.join(root, f) for f in files if _is_input(f))
+        elif _GLOB_CHARS.search(pattern):
+            found.update(p for p in glob.glob(pattern, recursive=True)
+                         if os.path.isfile(p) and _is_input(os.path.basename(p)))
+        elif os.path.isfile(pattern):
+            found.add(pattern)
+        else:
+            print(f"[INGEST] No such file or directory: {pattern}")
+    return sorted(found)
+
+
+def load_mapping(path: Optional[str]) -> Dict[str, str]:
+    """Patient name -> file id mapping file (names are matched lowercase)"""
+    if not path:
+        return {}
+    with open(path, 'r') as f:
+        return {name.strip().lower(): file_id for name, file_id in json.load(f).items()}
+
+
+def _file_id(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _mapped_id(patient_info: Dict, mapping: Dict[str, str]) -> Optional[str]:
+    name = (patient_info.get('name') or '').strip().lower()
+    name = re.sub(r'\s+test$', '', name)
+    return mapping.get(name)
+
+
+def _extract(path: str) -> Dict:
+    from pnoe_extraction import extract_pnoe_data, extract_breath_data
+    from breath_ingest import is_breath_table
+
+    if is_breath_table(path):
+        return extract_breath_data(path, os.path.basename(path))
+    return extract_pnoe_data(path)
+
+
+def _render(tier: str, extracted_data: Dict, custom_data: Dict) -> str:
+    module_name, function_name = REPORT_TIERS[tier]
+    module = __import__(module_name)
+    return getattr(module, function_name)(extracted_data, custom_data)
+
+
+def process_file(path: str, output_dir: str, tier: Optional[str] = 'basic',
+                 report_type: str = 'Performance', focus_areas: Optional[List[str]] = None,
+                 mapping: Optional[Dict[str, str]] = None, verbose: bool = False) -> Dict:
+    """
+    Pool entry point: extract, score and render one input.
+
+    Never raises; failures come back as a record with status 'failed' so one
+    bad PDF does not stop the batch.
+
+    Args:
+        tier: report tier to render, or None to only extract and score
+    """
+    started = time.perf_counter()
+    timings = {}
+    record = {'input': path, 'status': 'failed', 'worker': os.getpid()}
+
+    # Extraction and report generation print a lot of debug output; from
+    # several processes at once it is unreadable, so it is dropped by default
+    sink = contextlib.ExitStack()
+    if not verbose:
+        devnull = sink.enter_context(open(os.devnull, 'w'))
+        sink.enter_context(contextlib.redirect_stdout(devnull))
+
+    try:
+        with sink:
+            from calculate_scores import enhance_extracted_data_with_calculated_scores, calculate_biological_age
+
+            stage = time.perf_counter()
+            if path.endswith(DATA_SUFFIX):
+                with open(path, 'r') as f:
+                    extracted_data = json.load(f)
+                file_id = os.path.basename(path)[:-len(DATA_SUFFIX)]
+                data_file = path
+            else:
+                extracted_data = _extract(path)
+                if not extracted_data or not extracted_data.get('patient_info'):
+                    raise ValueError('Failed to extract patient data')
+                file_id = _mapped_id(extracted_data['patient_info'], mapping or {}) or _file_id(path)
+                data_file = os.path.join(output_dir, f'{file_id}{DATA_SUFFIX}')
+                timings['extract'] = time.perf_counter() - stage
+
+            stage = time.perf_counter()
+            extracted_data = enhance_extracted_data_with_calculated_scores(extracted_data)
+            patient_info = extracted_data.get('patient_info', {})
+            chronological_age = patient_info.get('age')
+            biological_age = None
+            if chronological_age:
+                biological_age = calculate_biological_age(
+                    patient_info,
+                    extracted_data.get('core_scores', {}),
+                    extracted_data.get('metabolic_data', {})
+                )
+            timings['score'] = time.perf_counter() - stage
+
+            html_file = None
+            if tier:
+                stage = time.perf_counter()
+                custom_data = {
+                    'chronological_age': chronological_age,
+                    'biological_age': biological_age,
+                    'report_type': report_type,
+                    'custom_notes': '',
+                    'goals': []
+                }
+                if focus_areas:
+                    custom_data['focus_areas'] = focus_areas
+                html_content = _render(tier, extracted_data, custom_data)
+                html_file = os.path.join(output_dir, f'{file_id}_report.html')
+                with open(html_file, 'w', encoding='utf-8') as f:
+                    f.write(html_content)
+                timings['render'] = time.perf_counter() - stage
+
+            # Stored data inputs are the source of truth; only new extractions are written
+            if data_file != path:
+                with open(data_file, 'w') as f:
+                    json.dump(extracted_data, f, indent=2)
+
+        record.update({
+            'status': 'ok',
+            'file_id': file_id,
+            'patient': patient_info.get('name'),
+            'chronological_age': chronological_age,
+            'biological_age': biological_age,
+            'core_scores': extracted_data.get('core_scores', {}),
+            'data_file': data_file,
+            'html_file': html_file,
+        })
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+
+    timings['total'] = time.perf_counter() - started
+    record['timings'] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    return record
+
+
+def _format_timing(record: Dict) -> str:
+    timings = record['timings']
+    stages = '  '.join(f"{stage} {timings[stage]:6.2f}s"
+                       for stage in ('extract', 'score', 'render') if stage in timings)
+    name = os.path.basename(record['input'])
+    if record['status'] == 'ok':
+        return f"{timings['total']:6.2f}s  {stages}  {name} -> {record['file_id']}"
+    return f"{timings['total']:6.2f}s  FAILED  {name}: {record['error']}"
+
+
+def _pipeline_version(tier: Optional[str]) -> str:
+    roots = ['pnoe_extraction', 'calculate_scores']
+    if tier:
+        roots.append(REPORT_TIERS[tier][0])
+    return pipeline_version(*roots)
+
+
+def run(inputs: Iterable[str], output_dir: str = 'uploads', jobs: Optional[int] = None,
+        tier: Optional[str] = 'basic', report_type: str = 'Performance',
+        focus_areas: Optional[List[str]] = None, mapping: Optional[Dict[str, str]] = None,
+        manifest_path: Optional[str] = None, force: bool = False, verbose: bool = False) -> List[Dict]:
+    """
+    Process every input on `jobs` processes (default: CPU count), appending
+    each result to the JSON-lines manifest as it finishes.
+
+    The manifest is also the checkpoint for the next run with the same path:
+    inputs whose content hash, pipeline version and tier match a successful
+    record are skipped (unless `force`), so an interrupted or nightly run
+    only redoes new, changed and failed inputs.
+
+    Returns one record per input; skipped inputs return their previous record
+    with `skipped: True`.
+    """
+    paths = [os.path.abspath(p) for p in find_inputs(inputs)]
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    os.makedirs(output_dir, exist_ok=True)
+    if manifest_path is None:
+        manifest_path = os.path.join(output_dir, DEFAULT_MANIFEST)
+
+    version = _pipeline_version(tier)
+    checkpoint = BatchCheckpoint(manifest_path)
+    records = []
+    pending = {}
+    for path in paths:
+        digest = content_hash(path)
+        previous = None if force else checkpoint.is_current(path, digest, version, tier)
+        if previous:
+            records.append(dict(previous, skipped=True))
+        else:
+            pending[path] = digest
+
+    print(f"[INGEST] {len(paths)} file(s): {len(pending)} to process, {len(records)} unchanged; "
+          f"{jobs} process(es), tier: {tier or 'none'}, version: {version}")
+    print(f"[INGEST] Manifest: {manifest_path}")
+
+    options = dict(output_dir=output_dir, tier=tier, report_type=report_type,
+                   focus_areas=focus_areas, mapping=mapping, verbose=verbose)
+    done = 0
+    started = time.perf_counter()
+
+    def _record(path, record):
+        nonlocal done
+        done += 1
+        record.update(input=path, content_hash=pending[path], version=version, tier=tier,
+                      finished_at=datetime.now().isoformat(timespec='seconds'))
+        checkpoint.record(record)
+        records.append(record)
+        print(f"[INGEST] [{done}/{len(pending)}] {_format_timing(record)}")
+
+    try:
+        if jobs == 1 or len(pending) <= 1:
+            for path in pending:
+                _record(path, process_file(path, **options))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = {pool.submit(process_file, path, **options): path for path in pending}
+                for future in as_completed(futures):
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        # A worker killed mid-file (e.g. out of memory) breaks the pool;
+                        # the affected inputs are recorded as failed and retried next run
+                        record = {'status': 'failed', 'error': f"{type(e).__name__}: {e}", 'timings': {'total': 0.0}}
+                    _record(futures[future], record)
+    finally:
+        checkpoint.close()
+
+    wall = time.perf_counter() - started
+    processed = [r for r in records if not r.get('skipped')]
+    failed = [r for r in processed if r['status'] != 'ok']
+    busy = sum(r['timings']['total'] for r in processed)
+    print(f"[INGEST] Done: {len(processed) - len(failed)} ok, {len(failed)} failed, "
+          f"{len(records) - len(processed)} skipped in {wall:.2f}s "
+          f"({busy:.2f}s of work, {busy / wall if wall else 0:.1f}x)")
+    for record in failed:
+        print(f"[INGEST]   FAILED {record['input']}: {record['error']}")
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract, score and render metabolic tests in parallel")
+    parser.add_argument('inputs', nargs='+', help="files, directories or glob patterns ('**' recurses)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('-o', '--output-dir', default='uploads', help="where data and report files are written")
+    parser.add_argument('--manifest', default=None,
+                        help=f"JSON-lines results/checkpoint file (default: <output-dir>/{DEFAULT_MANIFEST})")
+    parser.add_argument('--force', action='store_true', help="reprocess inputs the manifest says are up to date")
+    parser.add_argument('--tier', choices=sorted(REPORT_TIERS), default='basic', help="report tier to render")
+    parser.add_argument('--no-render', action='store_true', help="extract and score only")
+    parser.add_argument('--report-type', default='Performance', help="Performance, Longevity or Health")
+    parser.add_argument('--focus-area', action='append', dest='focus_areas', help="report focus area (repeatable)")
+    parser.add_argument('--mapping', default=None, help="JSON file of patient name -> existing file id")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show extraction and report debug output")
+    args = parser.parse_args(argv)
+    if args.verbose:
+        # Workers read it on first use, whether forked or spawned
+        os.environ.setdefault(LEVEL_ENV, 'DEBUG')
+
+    records = run(
+        args.inputs,
+        output_dir=args.output_dir,
+        jobs=args.jobs,
+        tier=None if args.no_render else args.tier,
+        report_type=args.report_type,
+        focus_areas=args.focus_areas,
+        mapping=load_mapping(args.mapping),
+        manifest_path=args.manifest,
+        force=args.force,
+        verbose=args.verbose,
+    )
+    return 1 if any(r['status'] != 'ok' for r in records) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
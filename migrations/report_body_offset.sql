@@ -0,0 +1,6 @@
+-- Report view splice point
+-- /view and /view-ai stream the stored report and insert the navigation
+-- buttons after <body>; body_offset is that position (characters into
+-- html_content). NULL for older rows - the view finds the tag instead.
+
+ALTER TABLE reports ADD COLUMN IF NOT EXISTS body_offset INTEGER;
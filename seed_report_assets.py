@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Seed the Report Asset Cache
+
+Downloads every remote asset the report templates use (utils/report_assets.json)
+into report_assets/, including the font files referenced by the Google Fonts
+stylesheets, so WeasyPrint renders PDFs from local files (see
+utils/asset_cache.py). Run it once with network access - at build time, or
+before committing report_assets/ - and again after adding images or fonts
+to a template.
+
+Usage:
+    python3 seed_report_assets.py                 # fetch what is missing
+    python3 seed_report_assets.py --force         # refetch everything
+    python3 seed_report_assets.py --check         # list missing assets, no network;
+                                                  # exit 1 if any
+    python3 seed_report_assets.py --allow-missing # build step: warn about assets that
+                                                  # could not be fetched, exit 0
+"""
+import argparse
+import os
+import re
+import sys
+
+# Add utils to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from asset_cache import ASSET_CACHE_DIR, MANIFEST_PATH, AssetCache, load_manifest, seed, stylesheet_urls
+
+UTILS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils')
+
+# Template sources whose remote URLs must be in the manifest
+TEMPLATE_SOURCES = (
+    'pnoe_professional_template.py',
+    'ai_premium_report.py',
+    'sp_comprehensive_blueprint_template.py',
+    'ultimate_report_template.py',
+    os.path.join('report_templates', 'pnoe_professional.html.j2'),
+    os.path.join('report_templates', 'ai_premium.html.j2'),
+    os.path.join('report_templates', 'sp_comprehensive_blueprint.html.j2'),
+)
+URL_PATTERN = re.compile(r'https?://[^"\'\s)]+')
+SCRIPT_SUFFIXES = ('.js',)   # WeasyPrint does not run scripts
+
+
+def template_urls():
+    """Remote asset URLs referenced in the template sources"""
+    urls = set()
+    for name in TEMPLATE_SOURCES:
+        with open(os.path.join(UTILS_DIR, name), 'r', encoding='utf-8') as f:
+            urls.update(url for url in URL_PATTERN.findall(f.read()) if not url.endswith(SCRIPT_SUFFIXES))
+    return urls
+
+
+def check(cache, manifest):
+    """Print manifest gaps and uncached assets; returns the number of problems"""
+    listed = set(manifest['stylesheets']) | set(manifest['images'])
+    unlisted = sorted(template_urls() - listed)
+    for url in unlisted:
+        print(f"  not in manifest: {url}")
+
+    missing = [url for url in manifest['stylesheets'] + manifest['images'] if url not in cache]
+    for sheet in manifest['stylesheets']:
+        cached = cache.get(sheet)
+        if cached is not None:
+            css = cached['string'].decode(cached.get('encoding') or 'utf-8', errors='replace')
+            missing.extend(url for url in stylesheet_urls(css, sheet) if url not in cache)
+    for url in missing:
+        print(f"  not cached: {url}")
+
+    print(f"{len(cache)} assets cached in {cache.cache_dir}; "
+          f"{len(unlisted)} unlisted, {len(missing)} missing")
+    return len(unlisted) + len(missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed the WeasyPrint report asset cache')
+    parser.add_argument('--cache-dir', default=ASSET_CACHE_DIR)
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--force', action='store_true', help='refetch assets that are already cached')
+    parser.add_argument('--check', action='store_true', help='report missing assets without fetching')
+    parser.add_argument('--allow-missing', action='store_true',
+                        help='warn about assets that could not be fetched instead of failing '
+                             '(reports render without them)')
+    args = parser.parse_args()
+
+    cache = AssetCache(args.cache_dir)
+    manifest = load_manifest(args.manifest)
+
+    if args.check:
+        return 1 if check(cache, manifest) else 0
+
+    result = seed(cache, manifest['images'], manifest['stylesheets'], force=args.force)
+    for url in result['failed']:
+        print(f"  FAILED: {url}")
+    print(f"Fetched {len(result['fetched'])}, already cached {len(result['cached'])}, "
+          f"failed {len(result['failed'])} -> {cache.cache_dir}")
+    if result['failed'] and args.allow_missing:
+        print(f"WARNING: {len(result['failed'])} asset(s) not cached; PDFs render without them "
+              f"until the next seed")
+        return 0
+    return 1 if result['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -149,16 +149,21 @@ function setupDragAndDrop() {
         const files = e.dataTransfer.files;
         if (files.length > 0) {
             const file = files[0];
-            if (file.type === 'application/pdf') {
+            if (file.type === 'application/pdf' || isBreathTable(file)) {
                 document.getElementById('fileInput').files = files;
                 showFileInfo(file);
             } else {
-                alert('Please upload a PDF file');
+                alert('Please upload a PDF, or a breath-by-breath CSV/XLSX export');
             }
         }
     });
 }
 
+// Breath-by-breath exports are scored directly instead of going through PDF extraction
+function isBreathTable(file) {
+    return /\.(csv|xlsx)$/i.test(file.name);
+}
+
 // Show File Info
 function showFileInfo(file) {
     document.getElementById('fileName').textContent = file.name;
@@ -179,11 +184,12 @@ async function uploadFile() {
     document.getElementById('progressBar').style.display = 'block';
     document.getElementById('uploadBtn').disabled = true;
 
+    const breathTable = isBreathTable(file);
     const formData = new FormData();
-    formData.append('pdf_file', file);
+    formData.append(breathTable ? 'data_file' : 'pdf_file', file);
 
     try {
-        const response = await fetch('/upload', {
+        const response = await fetch(breathTable ? '/upload_breath' : '/upload', {
             method: 'POST',
             body: formData,
             credentials: 'same-origin',
@@ -198,7 +204,12 @@ async function uploadFile() {
             throw new Error('Please log in again. Your session may have expired.');
         }
 
-        const data = await response.json();
+        let data = await response.json();
+
+        // Extraction runs in the background; poll until the job finishes
+        if (data.success && !data.extracted_data) {
+            data = await waitForExtraction(data.status_url || ('/api/jobs/' + data.job_id));
+        }
 
         if (data.success) {
             currentFileId = data.file_id;
@@ -222,6 +233,33 @@ async function uploadFile() {
     }
 }
 
+// Poll an extraction job until it is done or failed
+async function waitForExtraction(statusUrl) {
+    const pollIntervalMs = 1000;
+    const maxWaitMs = 5 * 60 * 1000;
+    const started = Date.now();
+
+    while (Date.now() - started < maxWaitMs) {
+        await new Promise(resolve => setTimeout(resolve, pollIntervalMs));
+
+        const response = await fetch(statusUrl, {
+            credentials: 'same-origin',
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        });
+        const job = await response.json();
+
+        if (job.status === 'done') {
+            return { success: true, file_id: job.file_id, test_id: job.test_id, extracted_data: job.extracted_data };
+        }
+        if (job.status === 'failed' || !response.ok) {
+            return { success: false, error: job.error || 'Extraction failed' };
+        }
+    }
+    return { success: false, error: 'Extraction is taking too long, please try again' };
+}
+
 // Display Extracted Data
 function displayExtractedData(data) {
     const previewDiv = document.getElementById('dataPreview');
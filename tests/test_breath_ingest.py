@@ -0,0 +1,46 @@
+"""
+Breath-by-breath table ingestion (utils/breath_ingest.py): column
+mapping, unit detection and the series handed to score_ergometry_data.
+"""
+import io
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+
+from breath_ingest import read_breath_table
+
+
+def _csv(header, rows):
+    lines = [','.join(header)] + [','.join(str(cell) for cell in row) for row in rows]
+    return io.BytesIO('\n'.join(lines).encode('utf-8'))
+
+
+def _values(column):
+    return np.asarray(list(column), dtype=np.float64)
+
+
+def test_rer_column_without_vco2():
+    rows = [(0.25 + i * 0.001, 0.80 + (i % 5) * 0.01, 60 + i % 4) for i in range(50)]
+    data = read_breath_table(_csv(('VO2 (L/min)', 'RER', 'HR'), rows), 'rest.csv')
+
+    series = data['time_series']
+    assert len(series['vco2']) == 0
+    np.testing.assert_allclose(_values(series['rer']), [rer for _, rer, _ in rows])
+    np.testing.assert_allclose(_values(series['vo2']), [vo2 * 1000 for vo2, _, _ in rows])
+    assert len(series['hr']) == 50
+
+
+def test_rer_derived_from_vco2_when_no_rer_column():
+    rows = [(300, 240, 62)] * 20
+    data = read_breath_table(_csv(('VO2', 'VCO2', 'HR'), rows), 'rest.csv')
+    np.testing.assert_allclose(_values(data['time_series']['rer']), [0.8] * 20)
+
+
+def test_units_decided_once_per_file():
+    # ml/min throughout; the second chunk's low readings must not be read as L/min
+    rows = [(300, 250)] * 10 + [(8, 7)] * 10
+    data = read_breath_table(_csv(('VO2 (ml/min)', 'VCO2 (ml/min)'), rows), 'rest.csv', chunk_rows=10)
+    assert _values(data['time_series']['vo2']).max() == 300
@@ -0,0 +1,52 @@
+"""
+Vectorized cohort scoring (utils/cohort_scoring.py) must match the
+per-patient scoring functions exactly, including NaN for missing scores
+and biological ages. Uses the synthetic cohorts from
+benchmark_cohort_scoring.py, which covers gaps and out-of-range values.
+"""
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'utils'))
+
+from benchmark_cohort_scoring import (
+    synthetic_extracted, synthetic_ergometry, scalar_extracted, scalar_ergometry
+)
+from cohort_scoring import cohort_from_extracted, cohort_from_ergometry, score_cohort, ergometry_core_scores
+
+PATIENTS = 1000
+
+
+def _quiet(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+def _assert_same(scalar, vector):
+    for key, expected in scalar.items():
+        got = vector[key]
+        bad = ~((expected == got) | (np.isnan(expected) & np.isnan(got)))
+        index = int(np.flatnonzero(bad)[0]) if bad.any() else None
+        assert index is None, (f"{key}: {int(bad.sum())} patient(s) differ, first #{index}: "
+                               f"scalar={expected[index]} vectorized={got[index]}")
+
+
+@pytest.mark.parametrize('seed', [7, 11])
+def test_metabolic_scores_and_bio_age_match_scalar(seed):
+    records = synthetic_extracted(np.random.default_rng(seed), PATIENTS)
+    _assert_same(_quiet(scalar_extracted, records),
+                 _quiet(score_cohort, _quiet(cohort_from_extracted, records)))
+
+
+@pytest.mark.parametrize('seed', [7, 11])
+def test_ergometry_scores_match_scalar(seed):
+    datasets = synthetic_ergometry(np.random.default_rng(seed), PATIENTS)
+    _assert_same(_quiet(scalar_ergometry, datasets),
+                 _quiet(ergometry_core_scores, _quiet(cohort_from_ergometry, datasets)))
@@ -0,0 +1,49 @@
+"""
+Stored reports link fingerprinted stylesheets under static/reports, so
+every template's current stylesheet must be committed there, and inlining
+must never leave a link behind.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'utils'))
+
+from ai_premium_report import AIPremiumReportTemplate
+from pnoe_professional_template import PNOEProfessionalReport
+from sp_comprehensive_blueprint_template import SPComprehensiveBlueprintReport
+from ultimate_report_template import MarkGentryReport
+import report_styles
+from report_styles import ReportStylesheet, STYLES_DIR, inline_stylesheets
+
+TEMPLATES = (PNOEProfessionalReport, SPComprehensiveBlueprintReport, AIPremiumReportTemplate, MarkGentryReport)
+
+
+def test_current_stylesheets_are_committed():
+    for template in TEMPLATES:
+        report = template()
+        stylesheet = ReportStylesheet(report.stylesheet_name, report._get_styles())
+        path = os.path.join(STYLES_DIR, stylesheet.filename)
+        assert os.path.exists(path), f"{stylesheet.filename} missing: run python utils/report_styles.py and commit it"
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == stylesheet.css
+
+
+def test_inline_known_stylesheet():
+    report = PNOEProfessionalReport()
+    stylesheet = ReportStylesheet(report.stylesheet_name, report._get_styles())
+    html = inline_stylesheets(f"<head>{stylesheet.link_tag()}</head>")
+    assert html == f"<head><style>\n{stylesheet.css}\n</style></head>"
+
+
+def test_inline_missing_stylesheet_uses_latest_of_template():
+    stale = ReportStylesheet('pnoe_professional', '/* retired */')
+    assert not os.path.exists(os.path.join(STYLES_DIR, stale.filename))
+    html = inline_stylesheets(f"<head>{stale.link_tag()}</head>")
+    assert '<link' not in html
+    assert html == f"<head><style>\n{report_styles.latest_stylesheet_css(stale.filename)}\n</style></head>"
+
+
+def test_inline_unknown_template_drops_link():
+    html = inline_stylesheets(f"<head>{ReportStylesheet('retired_template', 'p {}').link_tag()}</head>")
+    assert html == '<head></head>'
@@ -11,163 +11,66 @@ import os
 # Add parent directory to path to import template
 sys.path.insert(0, os.path.dirname(__file__))
 from pnoe_professional_template import PNOEProfessionalReport
-from calculate_scores import enhance_extracted_data_with_calculated_scores, calculate_biological_age
-from peptide_recommendations import calculate_peptide_recommendations, format_peptide_recommendations_html
+from report_model import build_report_model, apply_report_model
+from report_log import get_logger
 
-def generate_beautiful_report(extracted_data, custom_data):
-    """Generate a comprehensive, beautiful HTML report using the PNOE professional template"""
+log = get_logger('ai_basic_report', 'BEAUTIFUL_REPORT')
+peptide_log = get_logger('ai_basic_report.peptide', 'PEPTIDE')
 
-    # DEBUG: Print what we received
-    print(f"\n[DEBUG] EXTRACTED DATA (before enhancement):")
-    print(f"  patient_info: {extracted_data.get('patient_info', {})}")
-    print(f"  core_scores: {extracted_data.get('core_scores', {})}")
-    print(f"  caloric_data: {extracted_data.get('caloric_data', {})}")
-    print(f"[DEBUG] CUSTOM DATA: {custom_data}\n")
+def generate_beautiful_report(extracted_data, custom_data, inline_css=True):
+    """
+    Generate a comprehensive, beautiful HTML report using the PNOE professional template
 
-    # CALCULATE CORE SCORES if not present in PDF
-    extracted_data = enhance_extracted_data_with_calculated_scores(extracted_data)
+    inline_css=False links the fingerprinted stylesheet instead of embedding
+    it (for reports stored and viewed in the browser - see report_styles)
+    """
 
-    print(f"[DEBUG] EXTRACTED DATA (after enhancement):")
-    print(f"  core_scores: {extracted_data.get('core_scores', {})}\n")
+    log.debug("EXTRACTED DATA (before enhancement)", patient_info=extracted_data.get('patient_info', {}),
+              core_scores=extracted_data.get('core_scores', {}), caloric_data=extracted_data.get('caloric_data', {}))
+    log.debug("CUSTOM DATA %s", custom_data)
 
-    # Create a modified report instance with user's data
-    report = PNOEProfessionalReport()
-
-    # Override with extracted data - UPDATE ALL FIELDS
-    patient_info = extracted_data.get('patient_info', {})
-    if patient_info.get('name'):
-        report.patient_info['name'] = patient_info['name']
-    if patient_info.get('test_date'):
-        report.patient_info['test_date'] = patient_info['test_date']
-    if patient_info.get('weight_kg'):
-        report.patient_info['weight_kg'] = patient_info['weight_kg']
-    if patient_info.get('height_cm'):
-        report.patient_info['height_cm'] = patient_info['height_cm']
-    if patient_info.get('gender'):
-        report.patient_info['gender'] = patient_info['gender']
-    if patient_info.get('age'):
-        report.patient_info['age'] = patient_info['age']
-        # Also use as chronological age if not provided in custom_data
-        if not custom_data.get('chronological_age'):
-            report.chronological_age = patient_info['age']
-
-    # Override core scores if extracted
-    core_scores = extracted_data.get('core_scores', {})
-    if core_scores:
-        print(f"[DEBUG] Updating core_scores with: {core_scores}")
-        report.core_scores.update(core_scores)
+    # Calculated scores, caloric plan, biological age and peptides (computed once, shared by all tiers)
+    model = build_report_model(extracted_data, custom_data)
 
-    print(f"[DEBUG] Final core_scores: {report.core_scores}")
-
-    # Calculate PROPER RMR from patient data (don't trust extracted values - they're wrong!)
-    # The PDF extraction picks up wrong numbers (VO2 ml/min instead of RMR)
-    print(f"[DEBUG] Calculating PROPER RMR from patient data...")
-
-    # Calculate RMR using Mifflin-St Jeor equation
-    age = report.patient_info['age']
-    weight_kg = report.patient_info['weight_kg']
-    height_cm = report.patient_info['height_cm']
-    gender = report.patient_info['gender'].lower()
-
-    if 'male' in gender:
-        calculated_rmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + 5
-    else:
-        calculated_rmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) - 161
+    # IMPORTANT: Also update the extracted_data so it gets saved to the JSON file
+    apply_report_model(extracted_data, model)
 
-    calculated_rmr = int(calculated_rmr)
+    log.debug("EXTRACTED DATA (after enhancement)", core_scores=extracted_data.get('core_scores', {}))
 
-    # Calculate TDEE (Total Daily Energy Expenditure) based on activity level
-    # Using moderate activity multiplier (1.55) for workout days
-    # Using light activity multiplier (1.375) for rest days
-    tdee_rest = int(calculated_rmr * 1.375)  # Light activity
-    tdee_workout = int(calculated_rmr * 1.55)  # Moderate activity
+    # Create a modified report instance with user's data
+    report = PNOEProfessionalReport()
+    report.inline_css = inline_css
 
-    print(f"[DEBUG] Calculated RMR: {calculated_rmr} kcal (age={age}, weight={weight_kg}kg, height={height_cm}cm, gender={gender})")
-    print(f"[DEBUG] TDEE Rest: {tdee_rest} kcal, TDEE Workout: {tdee_workout} kcal")
+    # Override with extracted data (and the custom chronological age)
+    report.patient_info.update(model['profile'])
+    if model['chronological_age']:
+        report.chronological_age = model['chronological_age']
 
-    # Use calculated values for caloric balance
-    report.caloric_data['burn_rest'] = tdee_rest
-    report.caloric_data['burn_workout'] = tdee_workout
+    # Override core scores if extracted or calculated
+    report.core_scores.update(model['core_scores'])
 
-    # Calculate eat values based on goals (maintenance = TDEE, bulk = +300-500, cut = -300-500)
-    # Default to slight surplus for performance/health goals
-    report.caloric_data['eat_rest'] = tdee_rest + 200
-    report.caloric_data['eat_workout'] = tdee_workout + 300
+    log.debug("Final core_scores %s", report.core_scores)
 
-    # Update fuel percentages if extracted
-    caloric_data = extracted_data.get('caloric_data', {})
-    if caloric_data:
-        if 'fat_percent' in caloric_data:
-            report.caloric_data['fat_percent'] = caloric_data['fat_percent']
-        if 'cho_percent' in caloric_data:
-            report.caloric_data['cho_percent'] = caloric_data['cho_percent']
+    # Caloric balance from the calculated RMR, fuel percentages from the PDF or RER
+    report.caloric_data.update(model['caloric_data'])
 
-    print(f"[DEBUG] Final caloric_data: {report.caloric_data}")
+    log.debug("Final caloric_data %s", report.caloric_data)
 
-    # IMPORTANT: Also update the extracted_data so it gets saved to the JSON file
-    extracted_data['caloric_data']['burn_rest'] = tdee_rest
-    extracted_data['caloric_data']['burn_workout'] = tdee_workout
-    extracted_data['caloric_data']['eat_rest'] = tdee_rest + 200
-    extracted_data['caloric_data']['eat_workout'] = tdee_workout + 300
-
-    # Override with custom data
-    if custom_data.get('chronological_age'):
-        report.chronological_age = custom_data['chronological_age']
-        report.patient_info['age'] = custom_data['chronological_age']
-        print(f"DEBUG beautiful_report: Set chronological_age = {custom_data['chronological_age']}")
-
-    # Calculate or use provided biological age
-    if custom_data.get('biological_age'):
-        report.biological_age = custom_data['biological_age']
-        print(f"DEBUG beautiful_report: Set biological_age = {custom_data['biological_age']}")
-    else:
-        # Calculate biological age from metabolic data and core scores
-        print(f"DEBUG beautiful_report: Calculating biological age from metabolic data...")
-        calculated_bio_age = calculate_biological_age(
-            report.patient_info,
-            extracted_data.get('core_scores', {}),
-            extracted_data.get('metabolic_data', {})
-        )
-        if calculated_bio_age:
-            report.biological_age = calculated_bio_age
-            print(f"DEBUG beautiful_report: Calculated biological_age = {calculated_bio_age}")
+    report.biological_age = model['biological_age']
 
     # Store custom notes and goals for later use
     report.custom_notes = custom_data.get('custom_notes', '')
     report.custom_goals = custom_data.get('goals', [])
     report.report_type = custom_data.get('report_type', 'Performance').title()
 
-    # CALCULATE PEPTIDE RECOMMENDATIONS (NO DEFAULTS - all data-driven)
-    print(f"\n[PEPTIDE] Calculating AI-powered peptide recommendations...")
-    peptide_recommendations = calculate_peptide_recommendations(
-        patient_info=report.patient_info,
-        core_scores=extracted_data.get('core_scores', {}),
-        metabolic_data=extracted_data.get('metabolic_data', {}),
-        biological_age=report.biological_age,
-        chronological_age=report.chronological_age
-    )
-
-    # Store recommendations in report object and extracted_data
-    report.peptide_recommendations = peptide_recommendations
-    report.peptide_html = format_peptide_recommendations_html(peptide_recommendations)
-    extracted_data['peptide_recommendations'] = peptide_recommendations
-
-    print(f"[PEPTIDE] Generated {len(peptide_recommendations)} unique recommendations\n")
-
-    # DEBUG: Verify ages before generating
-    print(f"[BEAUTIFUL_REPORT DEBUG] About to call report.generate()")
-    print(f"[BEAUTIFUL_REPORT DEBUG] report.chronological_age = {report.chronological_age}")
-    print(f"[BEAUTIFUL_REPORT DEBUG] report.biological_age = {report.biological_age}")
-
-    # Generate and return HTML
-    import tempfile
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as tmp:
-        report.generate(tmp.name)
-        with open(tmp.name, 'r') as f:
-            html = f.read()
-        os.unlink(tmp.name)
+    report.peptide_recommendations = model['peptide_recommendations']
+    report.peptide_html = model['peptide_html']
 
-    return html
+    peptide_log.debug("Generated %d unique recommendations", len(report.peptide_recommendations))
+    log.debug("Generating HTML", chronological_age=report.chronological_age, biological_age=report.biological_age)
+
+    # Render and return HTML (in memory - no temp file)
+    return report.render()
 
 # Keep the old function as backup
 def generate_beautiful_report_OLD(extracted_data, custom_data):
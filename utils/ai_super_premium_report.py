@@ -1,6 +1,6 @@
 """
 AI SUPER PREMIUM Report Generator
-THE ULTIMATE REPORT: Generates BOTH AI_Basic + AI_Premium, then MERGES them
+THE ULTIMATE REPORT: Everything from AI_Basic + AI_Premium in one document
 Creates comprehensive blueprint showing all data from both report types
 """
 from datetime import datetime
@@ -11,42 +11,35 @@ import os
 # Add parent directory to path to import templates
 sys.path.insert(0, os.path.dirname(__file__))
 from sp_comprehensive_blueprint_template import SPComprehensiveBlueprintReport
-from ai_basic_report import generate_beautiful_report as generate_basic_report
-from ai_premium_report import generate_premium_report
-from calculate_scores import enhance_extracted_data_with_calculated_scores, calculate_biological_age
-from peptide_recommendations import calculate_peptide_recommendations, format_peptide_recommendations_html
+from report_model import build_report_model, apply_report_model
+from report_log import get_logger
 
-def generate_super_premium_report(extracted_data, custom_data):
+log = get_logger('ai_super_premium_report', 'SUPER PREMIUM')
+
+def generate_super_premium_report(extracted_data, custom_data, inline_css=True):
     """
     Generate SUPER PREMIUM report by:
-    1. Generating AI_Basic report
-    2. Generating AI_Premium report
-    3. Merging both into SP Comprehensive Blueprint format
+    1. Building the report model shared with AI_Basic and AI_Premium
+       (calculated scores, caloric plan, biological age, peptides)
+    2. Rendering it in SP Comprehensive Blueprint format
 
     This gives users ALL the data from both report types in one comprehensive document.
+    inline_css=False links the fingerprinted stylesheet instead of embedding it.
     """
 
-    print(f"\n[SUPER PREMIUM] Generating BOTH Basic + Premium reports for merging...")
-    print(f"[SUPER PREMIUM] Patient: {extracted_data.get('patient_info', {}).get('name', 'Unknown')}")
-
-    # Step 1: Generate AI_Basic report (this will enhance data and calculate everything)
-    print(f"\n[SUPER PREMIUM] Step 1/3: Generating AI_Basic report...")
-    basic_html = generate_basic_report(extracted_data.copy(), custom_data.copy())
-
-    # Step 2: Generate AI_Premium report (using same enhanced data)
-    print(f"[SUPER PREMIUM] Step 2/3: Generating AI_Premium report...")
-    premium_html = generate_premium_report(extracted_data.copy(), custom_data.copy())
-
-    # Step 3: Merge both into SP Comprehensive Blueprint
-    print(f"[SUPER PREMIUM] Step 3/3: Merging both reports into SP Comprehensive Blueprint...")
+    # Step 1: Compute everything the Basic and Premium reports show, once
+    log.debug("Step 1/2: Building report model...")
+    model = build_report_model(extracted_data, custom_data)
+    apply_report_model(extracted_data, model)
 
-    # At this point, extracted_data has been enhanced with all calculations
-    # Now create the SP Comprehensive Blueprint with all the data
+    # Step 2: Render the SP Comprehensive Blueprint
+    log.debug("Step 2/2: Rendering SP Comprehensive Blueprint...")
 
     report = SPComprehensiveBlueprintReport()
+    report.inline_css = inline_css
 
     # Set patient info
-    patient_info = extracted_data.get('patient_info', {})
+    patient_info = model['patient_info']
     report.patient_info = {
         'name': patient_info.get('name', 'Patient Name'),
         'test_date': patient_info.get('test_date', datetime.now().strftime('%m/%d/%Y')),
@@ -59,27 +52,25 @@ def generate_super_premium_report(extracted_data, custom_data):
     }
 
     # Set core scores
-    report.core_scores = extracted_data.get('core_scores', {})
+    report.core_scores = model['core_scores']
 
     # Set caloric data
-    report.caloric_data = extracted_data.get('caloric_data', {})
+    report.caloric_data = model['caloric_data']
 
     # Set biological age
-    report.chronological_age = custom_data.get('chronological_age') or patient_info.get('age')
-    report.biological_age = custom_data.get('biological_age') or report.chronological_age
+    report.chronological_age = model['chronological_age']
+    report.biological_age = model['biological_age'] or report.chronological_age
 
     # Set report type
     report.report_type = custom_data.get('report_type', 'Performance')
 
     # Add peptide recommendations
-    peptide_recommendations = extracted_data.get('peptide_recommendations', [])
-    if peptide_recommendations:
-        report.peptide_recommendations = peptide_recommendations
-        report.peptide_html = format_peptide_recommendations_html(peptide_recommendations)
+    if model['peptide_recommendations']:
+        report.peptide_recommendations = model['peptide_recommendations']
+        report.peptide_html = model['peptide_html']
 
     # Generate the final merged SP Comprehensive Blueprint
-    print(f"[SUPER PREMIUM] ✅ Merging complete! Generating final HTML...")
-    merged_html = report.generate()
+    merged_html = report.render()
 
     # Add metadata comment at the top
     metadata = f"""<!--
@@ -99,7 +90,6 @@ Merged into SP Comprehensive Blueprint format.
 
     final_html = merged_html.replace('<!DOCTYPE html>', f'<!DOCTYPE html>\n{metadata}')
 
-    print(f"[SUPER PREMIUM] ✅ SUPER PREMIUM report generated successfully!")
-    print(f"[SUPER PREMIUM] Contains data from BOTH Basic + Premium reports")
+    log.info("SUPER PREMIUM report generated")
 
     return final_html
@@ -0,0 +1,278 @@
+"""
+Report Asset Cache
+
+Report templates pull images from Unsplash and optimalvitality.health and
+fonts from Google Fonts. WeasyPrint fetched every one of them over the
+network on every PDF render, so PDF time tracked third-party latency and
+rendering stalled or failed offline.
+
+AssetCache keeps those assets on disk, content-addressed:
+
+    report_assets/index.json                 url -> sha256, mime type, encoding
+    report_assets/objects/ab/ab12...ef       the bytes, stored once per digest
+
+It is seeded ahead of time from the manifest of assets the templates use
+(utils/report_assets.json) by seed_report_assets.py, which also follows the
+url() references inside cached stylesheets, so the Google Fonts font files
+are stored locally next to their CSS. ReportURLFetcher is the url_fetcher
+handed to WeasyPrint:
+
+    HTML(string=html, base_url=..., url_fetcher=ReportURLFetcher(cache))
+
+Cached URLs never touch the network. Misses are fetched once with a short
+timeout and stored, or refused immediately in offline mode
+(REPORT_ASSETS_OFFLINE=1). A URL that failed is not retried for
+FAILED_RETRY_SECONDS, so an unreachable host costs one timeout, not one per
+render. WeasyPrint renders without a resource it could not fetch.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+ASSET_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'report_assets')
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_assets.json')
+OFFLINE_ENV = 'REPORT_ASSETS_OFFLINE'
+
+FETCH_TIMEOUT = 5             # seconds, for a miss during a render
+SEED_TIMEOUT = 30             # seconds, for seeding
+FAILED_RETRY_SECONDS = 300
+
+REMOTE_SCHEMES = ('http://', 'https://')
+CSS_URL_PATTERN = re.compile(r'url\(\s*[\'"]?([^\'")]+?)[\'"]?\s*\)')
+
+
+class AssetUnavailable(Exception):
+    """A remote asset that is not cached and cannot be fetched now"""
+
+
+def _parse_content_type(header: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """'text/css; charset=utf-8' -> ('text/css', 'utf-8')"""
+    if not header:
+        return None, None
+    parts = [part.strip() for part in header.split(';')]
+    encoding = None
+    for part in parts[1:]:
+        if part.lower().startswith('charset='):
+            encoding = part.split('=', 1)[1].strip('"\'')
+    return parts[0].lower() or None, encoding
+
+
+def fetch_remote(url: str, timeout: float) -> Tuple[bytes, Optional[str], Optional[str]]:
+    """GET url; returns (content, mime_type, encoding)"""
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    mime_type, encoding = _parse_content_type(response.headers.get('Content-Type'))
+    return response.content, mime_type, encoding
+
+
+class AssetCache:
+    """Content-addressed on-disk store of remote report assets, keyed by URL"""
+
+    def __init__(self, cache_dir: str = ASSET_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self._lock = threading.Lock()
+        self._index = None
+        self._index_mtime = None
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+
+    def _load_index(self) -> Dict[str, Dict]:
+        """The URL index, re-read when another process (or the seeder) has replaced it"""
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            mtime = None
+        if self._index is None or mtime != self._index_mtime:
+            index = {}
+            if mtime is not None:
+                try:
+                    with open(self.index_path, 'r', encoding='utf-8') as f:
+                        index = json.load(f)
+                except (OSError, ValueError):
+                    index = {}
+            self._index, self._index_mtime = index, mtime
+        return self._index
+
+    def _write_atomic(self, path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        The cached asset in WeasyPrint url_fetcher form (string, mime_type,
+        encoding, redirected_url), or None
+        """
+        with self._lock:
+            entry = self._load_index().get(url)
+        if entry is None:
+            return None
+        try:
+            with open(self._object_path(entry['sha256']), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        return {
+            'string': content,
+            'mime_type': entry.get('mime_type'),
+            'encoding': entry.get('encoding'),
+            'redirected_url': url,
+        }
+
+    def put(self, url: str, content: bytes, mime_type: Optional[str] = None,
+            encoding: Optional[str] = None) -> str:
+        """Store content for url (atomically); returns its sha256"""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            self._write_atomic(path, content)
+
+        with self._lock:
+            index = dict(self._load_index())
+            index[url] = {'sha256': digest, 'mime_type': mime_type, 'encoding': encoding, 'size': len(content)}
+            self._write_atomic(self.index_path, json.dumps(index, indent=2, sort_keys=True).encode('utf-8'))
+            self._index, self._index_mtime = index, os.path.getmtime(self.index_path)
+        return digest
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return url in self._load_index()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load_index())
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, List[str]]:
+    """{'stylesheets': [...], 'images': [...]} - the remote assets report templates use"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def stylesheet_urls(css: str, base_url: str) -> List[str]:
+    """Absolute remote URLs referenced with url(...) in a stylesheet (font files, images)"""
+    urls = []
+    for reference in CSS_URL_PATTERN.findall(css):
+        url = urljoin(base_url, reference.strip())
+        if url.startswith(REMOTE_SCHEMES) and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def seed(cache: AssetCache, urls: Iterable[str], stylesheets: Iterable[str] = (),
+         force: bool = False, timeout: float = SEED_TIMEOUT) -> Dict[str, List[str]]:
+    """
+    Download assets into the cache, following url() references inside the
+    stylesheets.
+
+    Returns:
+        {'fetched': [...], 'cached': [...], 'failed': [...]} URLs
+    """
+    result = {'fetched': [], 'cached': [], 'failed': []}
+
+    def store(url: str) -> Optional[Dict]:
+        if not force:
+            cached = cache.get(url)
+            if cached is not None:
+                result['cached'].append(url)
+                return cached
+        try:
+            content, mime_type, encoding = fetch_remote(url, timeout)
+        except requests.RequestException:
+            result['failed'].append(url)
+            return None
+        cache.put(url, content, mime_type, encoding)
+        result['fetched'].append(url)
+        return {'string': content, 'encoding': encoding}
+
+    for url in stylesheets:
+        asset = store(url)
+        if asset is None:
+            continue
+        css = asset['string'].decode(asset.get('encoding') or 'utf-8', errors='replace')
+        for reference in stylesheet_urls(css, url):
+            store(reference)
+
+    for url in urls:
+        store(url)
+    return result
+
+
+class ReportURLFetcher:
+    """
+    WeasyPrint url_fetcher serving remote assets from an AssetCache.
+    Non-HTTP URLs (data:, file:) go to WeasyPrint's default fetcher.
+    """
+
+    def __init__(self, cache: Optional[AssetCache] = None, offline: Optional[bool] = None,
+                 timeout: float = FETCH_TIMEOUT):
+        self.cache = cache or AssetCache()
+        self.offline = offline if offline is not None else os.getenv(OFFLINE_ENV, '').lower() in ('1', 'true', 'yes')
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self._failed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url: str, timeout: float = 10, ssl_context=None) -> Dict:
+        if not url.startswith(REMOTE_SCHEMES):
+            from weasyprint.urls import default_url_fetcher
+            return default_url_fetcher(url, timeout=timeout, ssl_context=ssl_context)
+
+        cached = self.cache.get(url)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached
+
+        with self._lock:
+            self.misses += 1
+            failed_at = self._failed_at.get(url)
+        if self.offline:
+            raise AssetUnavailable(f"Not in the report asset cache (offline): {url}")
+        if failed_at is not None and time.monotonic() - failed_at < FAILED_RETRY_SECONDS:
+            raise AssetUnavailable(f"Recently unreachable: {url}")
+
+        try:
+            content, mime_type, encoding = fetch_remote(url, min(timeout, self.timeout))
+        except requests.RequestException as e:
+            with self._lock:
+                self.failures += 1
+                self._failed_at[url] = time.monotonic()
+            raise AssetUnavailable(f"Could not fetch {url}: {e}") from e
+
+        self.cache.put(url, content, mime_type, encoding)
+        return {'string': content, 'mime_type': mime_type, 'encoding': encoding, 'redirected_url': url}
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for this worker process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cached_assets': len(self.cache),
+                'offline': self.offline,
+                'hits': self.hits,
+                'misses': self.misses,
+                'failures': self.failures,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
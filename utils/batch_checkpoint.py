@@ -0,0 +1,120 @@
+"""
+Batch Run Checkpoints
+
+bulk_ingest appends one JSON line per finished input to its manifest and
+fsyncs it, so the manifest survives a crashed or killed run. Read back on
+the next run it is a checkpoint: an input is skipped when its last record
+succeeded with the same content hash, pipeline version and report tier,
+and its output files still exist. Failed and changed inputs run again.
+
+The pipeline version hashes the source of every utils module the pipeline
+imports (found by following import statements from the entry modules), so
+a calculator or template change re-runs everything it could affect.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, Optional
+
+from extraction_cache import extractor_version
+
+UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def content_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _local_imports(source: str) -> Iterable[str]:
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.split('.')[-1]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            yield node.module.split('.')[-1]
+
+
+def pipeline_version(*modules: str) -> str:
+    """
+    extractor_version over `modules` and every utils module they import,
+    directly or transitively.
+
+    Args:
+        modules: utils module names (e.g. 'pnoe_extraction', 'ai_basic_report')
+    """
+    pending = list(modules)
+    sources = {}
+    while pending:
+        name = pending.pop()
+        path = os.path.join(UTILS_DIR, f"{name}.py")
+        if name in sources or not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            sources[name] = f.read()
+        pending.extend(_local_imports(sources[name]))
+    return extractor_version(*(sources[name] for name in sorted(sources)))
+
+
+class BatchCheckpoint:
+    """Latest manifest record per input, plus an fsynced append log"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: Dict[str, Dict] = {}
+        lines = 0
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a killed run
+                    self.records[record['input']] = record
+        if lines > len(self.records):
+            self._compact()
+        self._file = None
+
+    def _compact(self):
+        """Rewrite the log with one line per input (atomic replace)"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            for record in self.records.values():
+                f.write(json.dumps(record) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def is_current(self, input_path: str, digest: str, version: str, tier: Optional[str]) -> Optional[Dict]:
+        """The previous record if this input can be skipped, else None"""
+        record = self.records.get(input_path)
+        if not record or record.get('status') != 'ok':
+            return None
+        if record.get('content_hash') != digest or record.get('version') != version:
+            return None
+        if record.get('tier') != tier:
+            return None
+        outputs = [record.get('data_file'), record.get('html_file') if tier else None]
+        if not all(os.path.exists(p) for p in outputs if p):
+            return None
+        return record
+
+    def record(self, record: Dict):
+        """Append one finished input and flush it to disk before returning"""
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records[record['input']] = record
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
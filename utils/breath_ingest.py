@@ -0,0 +1,264 @@
+"""
+Breath-by-Breath Table Ingestion
+
+Reads breath-by-breath exports (CSV, or XLSX via openpyxl) from PNOE and
+other metabolic carts straight into SeriesColumns, skipping PDF layout
+analysis entirely. Rows are parsed in fixed-size chunks and each chunk is
+converted to NumPy once, so a full exercise test (10-20k breaths) is
+ingested in milliseconds. Units (L/min vs ml/min) are detected once per
+file, so every chunk of a file is scaled the same way.
+
+Any metadata rows above the header ("Gender, Male (63)", "Weight, 71 kg")
+are read with the shared patient field specs. The result has the same
+shape as ergometry_calculator.extract_ergometry_data, with data_source
+'breath_by_breath', so score_ergometry_data can score it directly.
+"""
+
+import csv
+import io
+import os
+import re
+import sys
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from time_series import SeriesColumn, new_time_series, summarize
+from field_specs import FieldMatcher, PATIENT_FIELDS
+
+CHUNK_ROWS = 4096
+
+BREATH_EXTENSIONS = {'csv', 'xlsx'}
+
+# Normalized header (lowercase, units and punctuation stripped) -> column
+HEADER_ALIASES = {
+    'time': ('t', 'time', 'times', 'timesec', 'elapsedtime'),
+    'vo2': ('vo2', 'vo2abs', 'vo2mlmin', 'vo2lmin'),
+    'vco2': ('vco2', 'vco2mlmin', 'vco2lmin'),
+    've': ('ve', 'vebtps', 'velmin', 'minuteventilation'),
+    'hr': ('hr', 'heartrate', 'hrbpm'),
+    'rer': ('rer', 'rq'),
+    'load': ('load', 'watts', 'wr', 'workload', 'power', 'speed'),
+}
+_ALIAS_TO_COLUMN = {alias: column for column, aliases in HEADER_ALIASES.items() for alias in aliases}
+_UNIT_RE = re.compile(r'[\(\[].*?[\)\]]')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]')
+
+_PATIENT_MATCHER = FieldMatcher(PATIENT_FIELDS)
+
+
+def _normalize_header(cell) -> str:
+    text = _UNIT_RE.sub('', str(cell or '').lower())
+    return _NON_ALNUM_RE.sub('', text)
+
+
+def _map_header(row: Sequence) -> Dict[str, int]:
+    """Column name -> index for a candidate header row"""
+    mapping = {}
+    for index, cell in enumerate(row):
+        column = _ALIAS_TO_COLUMN.get(_normalize_header(cell))
+        if column and column not in mapping:
+            mapping[column] = index
+    return mapping
+
+
+def _to_float_array(cells: List) -> np.ndarray:
+    """Vectorized float conversion; blanks and junk become NaN"""
+    try:
+        return np.array(cells, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.full(len(cells), np.nan)
+        for i, cell in enumerate(cells):
+            try:
+                out[i] = float(cell)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _chunks(rows: Iterator[Sequence], size: int) -> Iterator[List[Sequence]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iter_csv_rows(stream) -> Iterator[Sequence]:
+    if isinstance(stream, (str, os.PathLike)):
+        with open(stream, 'r', newline='', encoding='utf-8-sig') as f:
+            yield from csv.reader(f)
+        return
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    yield from csv.reader(stream)
+
+
+def _iter_xlsx_rows(stream) -> Iterator[Sequence]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX breath tables need openpyxl (pip install openpyxl)")
+
+    # read_only streams rows from the sheet XML instead of building the workbook
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+# Unit detection per column: (median below, median above, factor). Decided
+# once per file, from the first chunk holding values, and applied to every chunk
+UNIT_RULES = {
+    'vo2': (10, None, 1000),     # L/min -> ml/min
+    'vco2': (10, None, 1000),    # L/min -> ml/min
+    've': (None, 500, 0.001),    # ml/min -> L/min
+}
+
+
+def _unit_factor(values: np.ndarray, below, above, factor: float):
+    """`factor` if the median crosses the rule's threshold, 1.0 if not, None without values"""
+    finite = values[np.isfinite(values)]
+    if not finite.size:
+        return None
+    median = np.median(finite)
+    if (below is not None and median < below) or (above is not None and median > above):
+        return factor
+    return 1.0
+
+
+def read_breath_table(stream, filename: str, chunk_rows: int = CHUNK_ROWS) -> Dict:
+    """
+    Parse a breath-by-breath table into extract_ergometry_data-shaped data.
+
+    Args:
+        stream: path or binary/text file object
+        filename: used to pick the CSV or XLSX reader
+        chunk_rows: rows converted to NumPy per batch
+
+    Raises:
+        ValueError: unsupported file type or no recognizable VO2 header
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        rows = _iter_csv_rows(stream)
+    elif extension == 'xlsx':
+        rows = _iter_xlsx_rows(stream)
+    else:
+        raise ValueError(f"Unsupported breath table type: {filename}")
+
+    data = {
+        'patient_info': {},
+        'time_series': new_time_series(),
+        'chart_ranges': {},
+        'summary_stats': {},
+        'is_rmr_test': True,
+        'is_exercise_test': False,
+        'data_source': 'breath_by_breath'
+    }
+    series = data['time_series']
+    series['time'] = SeriesColumn()
+
+    # Metadata rows until the header (first row naming VO2 plus another channel)
+    preamble = []
+    header = None
+    for row in rows:
+        mapping = _map_header(row)
+        if 'vo2' in mapping and len(mapping) >= 2:
+            header = mapping
+            break
+        cells = [str(c).strip() for c in row if c not in (None, '')]
+        if cells:
+            preamble.append(' '.join(cells))
+    if header is None:
+        raise ValueError("No breath-by-breath header (VO2, VCO2, HR, ...) found")
+
+    if preamble:
+        _PATIENT_MATCHER.extract(['\n'.join(preamble)], data)
+    if 'load' in header:
+        data['is_exercise_test'] = True
+        data['is_rmr_test'] = False
+
+    # Exercise tests: resting metrics come from the baseline phase (breaths at
+    # the starting load), peaks from every breath
+    exercise = 'load' in header
+    baseline_load = None
+    peak_vo2 = peak_hr = -np.inf
+
+    breaths = 0
+    width = max(header.values()) + 1
+    factors = {}
+    for chunk in _chunks(rows, chunk_rows):
+        chunk = [row for row in chunk if row and len(row) >= width]
+        if not chunk:
+            continue
+        columns = {name: _to_float_array([row[index] for row in chunk]) for name, index in header.items()}
+        breaths += len(chunk)
+        for name, rule in UNIT_RULES.items():
+            if name in columns and factors.get(name) is None:
+                factors[name] = _unit_factor(columns[name], *rule)
+            if factors.get(name) not in (None, 1.0):
+                columns[name] = columns[name] * factors[name]
+
+        vo2 = columns['vo2']
+        vco2 = columns.get('vco2')
+        gas = np.isfinite(vo2) & (vo2 > 0)
+        if vco2 is not None:
+            gas &= np.isfinite(vco2) & (vco2 > 0)
+
+        rest = np.ones(len(chunk), dtype=bool)
+        if exercise:
+            load = columns['load']
+            if baseline_load is None and np.isfinite(load).any():
+                baseline_load = float(load[np.isfinite(load)][0])
+            rest = load <= (baseline_load if baseline_load is not None else 0) + 1e-6
+            if gas.any():
+                peak_vo2 = max(peak_vo2, float(vo2[gas].max()))
+
+        keep = gas & rest
+        series['vo2'].extend(vo2[keep])
+        if 'time' in columns:
+            series['time'].extend(columns['time'][keep])
+        if vco2 is not None:
+            series['vco2'].extend(vco2[keep])
+
+        # The export's own RER/RQ column if it has one, else VCO2 / VO2
+        rer = columns.get('rer')
+        if rer is None and vco2 is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rer = vco2 / vo2
+        if rer is not None:
+            rer_ok = rest & np.isfinite(rer) & (rer > 0.5) & (rer < 1.5)
+            series['rer'].extend(rer[rer_ok])
+
+        if 've' in columns:
+            ve = columns['ve']
+            ve_ok = keep & np.isfinite(ve) & (ve > 0)
+            series['ve_vo2'].extend(ve[ve_ok] * 1000 / vo2[ve_ok])
+            if vco2 is not None:
+                series['ve_vco2'].extend(ve[ve_ok] * 1000 / vco2[ve_ok])
+
+        if 'hr' in columns:
+            hr = columns['hr']
+            hr_ok = np.isfinite(hr) & (hr > 25) & (hr < 250)
+            series['hr'].extend(hr[hr_ok & rest])
+            if exercise and hr_ok.any():
+                peak_hr = max(peak_hr, float(hr[hr_ok].max()))
+
+    if exercise:
+        data['peak'] = {
+            'vo2_ml_min': peak_vo2 if np.isfinite(peak_vo2) else None,
+            'hr_bpm': peak_hr if np.isfinite(peak_hr) else None,
+        }
+    data['breath_count'] = breaths
+    summarize(series, data['summary_stats'])
+    return data
+
+
+def is_breath_table(filename: str) -> bool:
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in BREATH_EXTENSIONS
@@ -8,6 +8,19 @@ Biological Age Algorithm aligned with PNOE methodology:
 - Supporting factors: Core scores, BMI, cardiovascular health
 """
 import math
+import os
+import sys
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from piecewise import Piecewise
+from report_log import get_logger
+
+log = get_logger('calculate_scores', 'CALCULATE_SCORES')
+enhance_log = get_logger('calculate_scores.enhance', 'ENHANCE_DATA')
+bio_age_log = get_logger('calculate_scores.bio_age', 'CALCULATE_BIO_AGE')
 
 # VO2 max percentile reference tables (ACSM Guidelines, 10th Edition)
 # Values represent 50th percentile VO2 max (ml/kg/min) by age and gender
@@ -48,6 +61,100 @@ VO2MAX_PERCENTILES_FEMALE = {
 }
 
 
+# Percentile reported for a VO2 max between two table columns (below p10,
+# p10-25, p25-50, p50-75, p75-90, at or above p90)
+VO2MAX_PERCENTILE_BANDS = (5, 17, 37, 62, 82, 95)
+
+# Age reported when a VO2 max is below every age's 50th percentile
+VO2MAX_AGE_BEYOND_TABLE = 85
+
+
+class VO2maxTable:
+    """
+    One ACSM percentile table compiled into dense arrays at import.
+
+    The 50th-percentile column falls with age, so it is stored reversed
+    (ascending) to answer "youngest age whose median is at or below this
+    VO2 max" with a single binary search: np.searchsorted for arrays, bisect
+    on plain-list copies for single numbers (no NumPy call overhead on the
+    per-patient path). Numbers return ints, arrays return arrays.
+    """
+
+    def __init__(self, table):
+        self.ages = np.array(sorted(table), dtype=np.float64)
+        self.percentiles = tuple(sorted(next(iter(table.values()))))
+        # values[i, j]: VO2 max at ages[i], percentiles[j]
+        self.values = np.array([[table[age][p] for p in self.percentiles] for age in sorted(table)])
+        p50 = self.values[:, self.percentiles.index(50)]
+        if not (np.all(np.diff(p50) < 0) and np.all(np.diff(self.values, axis=1) > 0)):
+            raise ValueError("VO2 max table must fall with age and rise with percentile")
+        self._p50_ascending = p50[::-1].copy()
+        self._bands = np.array(VO2MAX_PERCENTILE_BANDS)
+        self._age_list = [int(age) for age in self.ages]
+        self._p50_list = self._p50_ascending.tolist()
+        self._row_lists = self.values.tolist()
+
+    def equivalent_age(self, vo2max):
+        """Youngest table age for which `vo2max` is at or above the 50th percentile"""
+        if isinstance(vo2max, (int, float)):
+            at_or_below = bisect_right(self._p50_list, vo2max)
+            return self._age_list[len(self._age_list) - at_or_below] if at_or_below else VO2MAX_AGE_BEYOND_TABLE
+
+        vo2max = np.asarray(vo2max, dtype=np.float64)
+        # Number of ages whose median is <= vo2max; those are the oldest ones
+        at_or_below = np.searchsorted(self._p50_ascending, vo2max, side='right')
+        index = np.clip(len(self.ages) - at_or_below, 0, len(self.ages) - 1)
+        age = np.where(at_or_below > 0, self.ages[index], VO2MAX_AGE_BEYOND_TABLE)
+        return int(age) if age.ndim == 0 else age
+
+    def closest_age_index(self, age):
+        """Row of the closest table age (the younger one on ties)"""
+        if isinstance(age, (int, float)):
+            ages = self._age_list
+            upper = min(bisect_left(ages, age), len(ages) - 1)
+            lower = max(upper - 1, 0)
+            return upper if abs(ages[upper] - age) < abs(ages[lower] - age) else lower
+
+        age = np.asarray(age, dtype=np.float64)
+        upper = np.clip(np.searchsorted(self.ages, age, side='left'), 0, len(self.ages) - 1)
+        lower = np.clip(upper - 1, 0, len(self.ages) - 1)
+        closer_upper = np.abs(self.ages[upper] - age) < np.abs(self.ages[lower] - age)
+        return np.where(closer_upper, upper, lower)
+
+    def percentile_for_age(self, vo2max, age):
+        """Percentile band (VO2MAX_PERCENTILE_BANDS) of `vo2max` among people of `age`"""
+        if isinstance(vo2max, (int, float)) and isinstance(age, (int, float)):
+            row = self._row_lists[self.closest_age_index(age)]
+            return VO2MAX_PERCENTILE_BANDS[bisect_right(row, vo2max)]
+
+        vo2max = np.asarray(vo2max, dtype=np.float64)
+        rows = np.broadcast_to(self.closest_age_index(age), vo2max.shape)
+        if vo2max.ndim == 0:
+            return int(self._bands[np.searchsorted(self.values[int(rows)], vo2max, side='right')])
+        band = np.empty(vo2max.shape, dtype=np.intp)
+        for row in np.unique(rows):
+            selected = rows == row
+            band[selected] = np.searchsorted(self.values[row], vo2max[selected], side='right')
+        return self._bands[band]
+
+
+VO2MAX_TABLE_MALE = VO2maxTable(VO2MAX_PERCENTILES_MALE)
+VO2MAX_TABLE_FEMALE = VO2maxTable(VO2MAX_PERCENTILES_FEMALE)
+
+
+# Biological age adjustments (years) for the secondary and supporting factors.
+# `>=` ladders read bottom-up: e.g. fat-burning < 30 -> +8, 30-39 -> +5, ..., 80+ -> -10
+FAT_BURNING_AGE_ADJUSTMENT = Piecewise.steps([30, 40, 50, 60, 70, 80], [8, 5, 2, -2, -4, -7, -10], closed='left')
+RMR_RATIO_AGE_ADJUSTMENT = Piecewise.steps([0.88, 0.95, 1.05, 1.15], [5, 2, -2, -5, -8], closed='left')
+CORE_SCORE_AGE_ADJUSTMENT = Piecewise.steps([50, 60, 70, 80], [3, 1, -2, -3, -6], closed='left')
+BMI_AGE_ADJUSTMENT = Piecewise.steps([18.5, 25, 30, 35], [1, -2, 1, 3, 4], closed='left')
+
+
+def vo2max_table(gender):
+    """Table for a gender string (any gender containing 'male' uses the male table)"""
+    return VO2MAX_TABLE_MALE if 'male' in gender.lower() else VO2MAX_TABLE_FEMALE
+
+
 def get_vo2max_biological_age(vo2max, gender, chronological_age):
     """
     Calculate biological age based on VO2 max using ACSM percentile tables.
@@ -69,52 +176,18 @@ def get_vo2max_biological_age(vo2max, gender, chronological_age):
     if not vo2max or vo2max <= 0:
         return chronological_age, 50, 0
 
-    # Select appropriate table
-    if 'male' in gender.lower():
-        table = VO2MAX_PERCENTILES_MALE
-    else:
-        table = VO2MAX_PERCENTILES_FEMALE
-
-    # Find the age where this VO2 max would be the 50th percentile
-    vo2max_bio_age = chronological_age
+    table = vo2max_table(gender)
 
-    # Search through ages to find where this VO2 max matches 50th percentile
-    ages = sorted(table.keys())
+    # Youngest age where this VO2 max is at or above the 50th percentile
+    vo2max_bio_age = table.equivalent_age(vo2max)
 
-    for age in ages:
-        p50 = table[age][50]
-        if vo2max >= p50:
-            vo2max_bio_age = age
-            break
-    else:
-        # VO2 max is below all 50th percentiles - use oldest age + adjustment
-        vo2max_bio_age = ages[-1] + 5
-
-    # Also calculate what percentile this person is at for their actual age
-    # Find closest age bracket
-    closest_age = min(ages, key=lambda x: abs(x - chronological_age))
-    age_data = table[closest_age]
-
-    # Determine percentile for their age
-    percentile = 50  # default
-    if vo2max >= age_data[90]:
-        percentile = 95
-    elif vo2max >= age_data[75]:
-        percentile = 82  # midpoint 75-90
-    elif vo2max >= age_data[50]:
-        percentile = 62  # midpoint 50-75
-    elif vo2max >= age_data[25]:
-        percentile = 37  # midpoint 25-50
-    elif vo2max >= age_data[10]:
-        percentile = 17  # midpoint 10-25
-    else:
-        percentile = 5
+    # Percentile band at the closest age bracket
+    percentile = table.percentile_for_age(vo2max, chronological_age)
 
     adjustment = chronological_age - vo2max_bio_age
 
-    print(f"  VO2 max: {vo2max:.1f} ml/kg/min")
-    print(f"  VO2 max percentile for age {chronological_age}: {percentile}th")
-    print(f"  VO2 max biological age: {vo2max_bio_age} (adjustment: {adjustment:+d} years)")
+    bio_age_log.debug("VO2 max %.1f ml/kg/min", vo2max, percentile=percentile,
+                      vo2max_age=vo2max_bio_age, adjustment=adjustment)
 
     return vo2max_bio_age, percentile, adjustment
 
@@ -144,7 +217,7 @@ def estimate_vo2max_from_metrics(patient_info, core_scores, metabolic_data):
     # Check if we have actual VO2 max data
     vo2max = metabolic_data.get('vo2max_rel') or metabolic_data.get('vo2max') if metabolic_data else None
     if vo2max and vo2max > 10:  # Sanity check - valid VO2 max is > 10
-        print(f"  Using MEASURED VO2 max: {vo2max} ml/kg/min")
+        bio_age_log.debug("Using MEASURED VO2 max: %s ml/kg/min", vo2max)
         return vo2max, True  # Return True = measured
 
     # Check for absolute VO2 max and convert to relative
@@ -152,7 +225,7 @@ def estimate_vo2max_from_metrics(patient_info, core_scores, metabolic_data):
     if vo2max_abs and weight_kg > 0:
         vo2max = (vo2max_abs * 1000) / weight_kg  # Convert L/min to ml/kg/min
         if 10 < vo2max < 80:  # Sanity check
-            print(f"  Using MEASURED VO2 max (converted): {vo2max:.1f} ml/kg/min")
+            bio_age_log.debug("Using MEASURED VO2 max (converted): %.1f ml/kg/min", vo2max)
             return vo2max, True  # Return True = measured
 
     # Estimate VO2 max using modified Jackson formula
@@ -180,8 +253,8 @@ def estimate_vo2max_from_metrics(patient_info, core_scores, metabolic_data):
     # Ensure reasonable bounds (15-70 ml/kg/min)
     estimated_vo2max = max(15, min(70, estimated_vo2max))
 
-    print(f"  ESTIMATED VO2 max (no test data): {estimated_vo2max:.1f} ml/kg/min")
-    print(f"    (Based on age={age}, BMI={bmi:.1f}, PA={pa_level:.1f})")
+    bio_age_log.debug("ESTIMATED VO2 max (no test data): %.1f ml/kg/min", estimated_vo2max,
+                      age=age, bmi=bmi, pa_level=pa_level)
 
     return estimated_vo2max, False  # Return False = estimated
 
@@ -241,13 +314,13 @@ def calculate_core_scores_from_metabolic_data(patient_info, metabolic_data, calo
     extracted_rmr = metabolic_data.get('rmr') or caloric_data.get('rmr')
     if extracted_rmr and 0.5 < (extracted_rmr / calculated_rmr) < 1.5:
         rmr = extracted_rmr
-        print(f"[CALCULATE_SCORES] Using extracted RMR: {rmr} kcal (validated against calculated: {calculated_rmr:.0f})")
+        log.debug("Using extracted RMR: %s kcal (validated against calculated: %.0f)", rmr, calculated_rmr)
     else:
         rmr = calculated_rmr
         if extracted_rmr:
-            print(f"[CALCULATE_SCORES] Rejected extracted RMR ({extracted_rmr}) - using calculated: {rmr:.0f} kcal")
+            log.debug("Rejected extracted RMR (%s) - using calculated: %.0f kcal", extracted_rmr, rmr)
         else:
-            print(f"[CALCULATE_SCORES] No extracted RMR - using calculated: {rmr:.0f} kcal")
+            log.debug("No extracted RMR - using calculated: %.0f kcal", rmr)
     rer = metabolic_data.get('rer', 0.85)
     fat_percent = caloric_data.get('fat_percent', 50)
 
@@ -320,15 +393,9 @@ def calculate_core_scores_from_metabolic_data(patient_info, metabolic_data, calo
         'breathing_coord': breathing_coord
     }
 
-    # Debug output
-    print(f"\n[CALCULATE_SCORES] Input data:")
-    print(f"  Age: {age}, Weight: {weight_kg}kg, Height: {height_cm}cm, Gender: {gender}")
-    print(f"  RMR: {rmr} (expected: {expected_rmr:.0f}, ratio: {rmr_ratio:.2f})")
-    print(f"  Fat%: {fat_percent}%, RER: {rer}")
-    print(f"\n[CALCULATE_SCORES] Calculated scores:")
-    for key, value in scores.items():
-        print(f"  {key}: {value}%")
-    print()
+    log.debug("Input data", age=age, weight_kg=weight_kg, height_cm=height_cm, gender=gender,
+              rmr=rmr, expected_rmr=expected_rmr, rmr_ratio=rmr_ratio, fat_percent=fat_percent, rer=rer)
+    log.debug("Calculated scores", **scores)
 
     return scores
 
@@ -349,7 +416,7 @@ def enhance_extracted_data_with_calculated_scores(extracted_data):
     metabolic_data = extracted_data.get('metabolic_data', {})
 
     if 'fat_percent' not in caloric_data or 'cho_percent' not in caloric_data:
-        print("[ENHANCE_DATA] Fuel percentages not found in PDF, calculating from metabolic data...")
+        enhance_log.debug("Fuel percentages not found in PDF, calculating from metabolic data...")
 
         # Get RER value
         rer = metabolic_data.get('rer')
@@ -405,9 +472,10 @@ def enhance_extracted_data_with_calculated_scores(extracted_data):
             # Apply age bonus (younger = lower RER)
             rer = max(0.70, rer - age_factor)
 
-            print(f"[ENHANCE_DATA] Invalid/missing RER, estimated from RMR ratio ({rmr_ratio:.2f}) + age ({age}): {rer:.3f}")
+            enhance_log.debug("Invalid/missing RER, estimated from RMR ratio (%.2f) + age (%s): %.3f",
+                              rmr_ratio, age, rer)
         else:
-            print(f"[ENHANCE_DATA] Using extracted RER: {rer}")
+            enhance_log.debug("Using extracted RER: %s", rer)
 
         # Calculate fuel percentages from RER
         fat_pct, cho_pct = calculate_fuel_percentages_from_rer(rer)
@@ -415,13 +483,13 @@ def enhance_extracted_data_with_calculated_scores(extracted_data):
         extracted_data['caloric_data']['fat_percent'] = fat_pct
         extracted_data['caloric_data']['cho_percent'] = cho_pct
 
-        print(f"[ENHANCE_DATA] Calculated fuel percentages: Fat {fat_pct}%, Carbs {cho_pct}%")
+        enhance_log.debug("Calculated fuel percentages", fat_percent=fat_pct, cho_percent=cho_pct)
 
     # STEP 2: Calculate core scores if missing
     core_scores = extracted_data.get('core_scores', {})
 
     if not core_scores or len(core_scores) == 0:
-        print("[ENHANCE_DATA] No core scores found in PDF, calculating from metabolic data...")
+        enhance_log.debug("No core scores found in PDF, calculating from metabolic data...")
 
         patient_info = extracted_data.get('patient_info', {})
         caloric_data = extracted_data.get('caloric_data', {})  # Use updated caloric_data
@@ -433,9 +501,9 @@ def enhance_extracted_data_with_calculated_scores(extracted_data):
         )
 
         extracted_data['core_scores'] = calculated_scores
-        print(f"[ENHANCE_DATA] Added {len(calculated_scores)} calculated core scores")
+        enhance_log.info("Added %d calculated core scores", len(calculated_scores))
     else:
-        print(f"[ENHANCE_DATA] Using {len(core_scores)} core scores from PDF extraction")
+        enhance_log.info("Using %d core scores from PDF extraction", len(core_scores))
 
     return extracted_data
 
@@ -466,9 +534,8 @@ def calculate_biological_age(patient_info, core_scores, metabolic_data):
     height_cm = patient_info.get('height_cm', 180)
     gender = patient_info.get('gender', 'Male').lower()
 
-    print(f"\n[CALCULATE_BIO_AGE] Calculating biological age (PNOE-aligned algorithm)...")
-    print(f"  Chronological age: {chronological_age}")
-    print(f"  Gender: {gender}, Weight: {weight_kg}kg, Height: {height_cm}cm")
+    bio_age_log.debug("Calculating biological age (PNOE-aligned algorithm)...", chronological_age=chronological_age,
+                      gender=gender, weight_kg=weight_kg, height_cm=height_cm)
 
     # ========================================================================
     # PRIMARY FACTOR: VO2 MAX
@@ -485,7 +552,7 @@ def calculate_biological_age(patient_info, core_scores, metabolic_data):
         vo2max_weight = 0.50  # 50% - Full weight when measured
         secondary_weight = 0.30  # 30%
         supporting_weight = 0.20  # 20%
-        print(f"\n  === PRIMARY FACTOR: VO2 MAX (50% weight - MEASURED) ===")
+        bio_age_log.debug("PRIMARY FACTOR: VO2 MAX (50%% weight - MEASURED)")
 
         # Calculate VO2 max biological age
         vo2max_bio_age, vo2max_percentile, vo2max_adjustment = get_vo2max_biological_age(
@@ -499,38 +566,21 @@ def calculate_biological_age(patient_info, core_scores, metabolic_data):
         supporting_weight = 0.50  # 50% - Core scores + BMI
         vo2max_adjustment = 0  # Neutral - no effect
         vo2max_percentile = 50  # Assume average
-        print(f"\n  === VO2 MAX: Not measured (using core scores instead) ===")
-        print(f"  VO2 max: {vo2max:.1f} ml/kg/min (estimated - NOT used for biological age)")
-        print(f"  Note: Get a VO2 max exercise test for accurate biological age based on cardio fitness")
+        bio_age_log.debug("VO2 MAX: Not measured (estimated %.1f ml/kg/min NOT used for biological age)", vo2max)
 
     # ========================================================================
     # SECONDARY FACTORS (30% weight): Fat-burning + Metabolic Rate
     # These are the other two factors PNOE emphasizes
     # ========================================================================
-    print(f"\n  === SECONDARY FACTORS: FAT-BURNING + METABOLIC RATE (30% weight) ===")
-
     secondary_adjustments = []
 
     # Fat-burning efficiency (range: -10 to +10 years)
     fat_burning_score = core_scores.get('fat_burning', 50) if core_scores else 50
 
-    if fat_burning_score >= 80:
-        fat_adjustment = -10  # Elite fat burner
-    elif fat_burning_score >= 70:
-        fat_adjustment = -7   # Excellent
-    elif fat_burning_score >= 60:
-        fat_adjustment = -4   # Good
-    elif fat_burning_score >= 50:
-        fat_adjustment = -2   # Average (benefit for maintaining 50%+)
-    elif fat_burning_score >= 40:
-        fat_adjustment = 2    # Below average
-    elif fat_burning_score >= 30:
-        fat_adjustment = 5    # Poor
-    else:
-        fat_adjustment = 8    # Very poor
+    # Elite (80+) -10, excellent -7, good -4, average -2, below average +2, poor +5, very poor +8
+    fat_adjustment = FAT_BURNING_AGE_ADJUSTMENT(fat_burning_score)
 
     secondary_adjustments.append(fat_adjustment)
-    print(f"  Fat burning: {fat_burning_score}% → adjustment: {fat_adjustment:+d} years")
 
     # Metabolic rate (RMR efficiency) - range: -6 to +6 years
     if 'male' in gender:
@@ -547,28 +597,19 @@ def calculate_biological_age(patient_info, core_scores, metabolic_data):
 
     rmr_ratio = rmr / expected_rmr if expected_rmr > 0 else 1.0
 
-    if rmr_ratio >= 1.15:
-        rmr_adjustment = -8  # Very fast metabolism
-    elif rmr_ratio >= 1.05:
-        rmr_adjustment = -5  # Fast metabolism (Mark is here at 1.08)
-    elif rmr_ratio >= 0.95:
-        rmr_adjustment = -2  # Normal (slight benefit)
-    elif rmr_ratio >= 0.88:
-        rmr_adjustment = 2   # Slow metabolism
-    else:
-        rmr_adjustment = 5   # Very slow
+    # Very fast -8, fast -5 (Mark is here at 1.08), normal -2, slow +2, very slow +5
+    rmr_adjustment = RMR_RATIO_AGE_ADJUSTMENT(rmr_ratio)
 
     secondary_adjustments.append(rmr_adjustment)
-    print(f"  Metabolic rate ratio: {rmr_ratio:.2f} → adjustment: {rmr_adjustment:+d} years")
 
     secondary_avg = sum(secondary_adjustments) / len(secondary_adjustments)
-    print(f"  Secondary factors avg adjustment: {secondary_avg:+.1f} years")
+    bio_age_log.debug("SECONDARY FACTORS: fat-burning + metabolic rate", fat_burning=fat_burning_score,
+                      fat_adjustment=fat_adjustment, rmr_ratio=rmr_ratio, rmr_adjustment=rmr_adjustment,
+                      average=secondary_avg)
 
     # ========================================================================
     # SUPPORTING FACTORS (20% weight): Core scores average, BMI
     # ========================================================================
-    print(f"\n  === SUPPORTING FACTORS (20% weight) ===")
-
     supporting_adjustments = []
 
     # Core scores analysis (range: -8 to +8 years)
@@ -580,16 +621,7 @@ def calculate_biological_age(patient_info, core_scores, metabolic_data):
         poor_count = sum(1 for v in core_scores.values() if v < 50)
 
         # Base adjustment from average
-        if avg_score >= 80:
-            base_adj = -6
-        elif avg_score >= 70:
-            base_adj = -3
-        elif avg_score >= 60:
-            base_adj = -2  # Mark is at 67.1%, gets -2 base
-        elif avg_score >= 50:
-            base_adj = 1
-        else:
-            base_adj = 3
+        base_adj = CORE_SCORE_AGE_ADJUSTMENT(avg_score)  # Mark is at 67.1%, gets -2 base
 
         # Bonus for excellent metrics (each excellent = -2 years)
         excellent_bonus = -2 * excellent_count
@@ -603,36 +635,24 @@ def calculate_biological_age(patient_info, core_scores, metabolic_data):
         score_adjustment = base_adj + excellent_bonus + good_bonus + poor_penalty
 
         supporting_adjustments.append(score_adjustment)
-        print(f"  Core scores avg: {avg_score:.1f}% (base: {base_adj:+d})")
-        print(f"    Excellent metrics: {excellent_count} ({excellent_bonus:+.1f}), Good: {good_count} ({good_bonus:+.1f}), Poor: {poor_count} ({poor_penalty:+.1f})")
-        print(f"    Total score adjustment: {score_adjustment:+.1f} years")
+        bio_age_log.debug("Core scores avg %.1f%%", avg_score, base=base_adj, excellent=excellent_count,
+                          good=good_count, poor=poor_count, adjustment=score_adjustment)
 
     # BMI factor (range: -2 to +4 years)
     bmi = weight_kg / ((height_cm / 100) ** 2) if height_cm > 0 else 25
 
-    if bmi < 18.5:
-        bmi_factor = 1   # Underweight
-    elif bmi < 25:
-        bmi_factor = -2  # Optimal
-    elif bmi < 30:
-        bmi_factor = 1   # Overweight
-    elif bmi < 35:
-        bmi_factor = 3   # Obese
-    else:
-        bmi_factor = 4   # Severely obese
+    # Underweight +1, optimal -2, overweight +1, obese +3, severely obese +4
+    bmi_factor = BMI_AGE_ADJUSTMENT(bmi)
 
     supporting_adjustments.append(bmi_factor)
-    print(f"  BMI: {bmi:.1f} → adjustment: {bmi_factor:+d} years")
 
     supporting_avg = sum(supporting_adjustments) / len(supporting_adjustments) if supporting_adjustments else 0
-    print(f"  Supporting factors avg adjustment: {supporting_avg:+.1f} years")
+    bio_age_log.debug("SUPPORTING FACTORS: core scores + BMI", bmi=bmi, bmi_adjustment=bmi_factor,
+                      average=supporting_avg)
 
     # ========================================================================
     # WEIGHTED FINAL CALCULATION
     # ========================================================================
-    print(f"\n  === FINAL WEIGHTED CALCULATION ===")
-    print(f"  Weights: VO2={vo2max_weight:.0%}, Secondary={secondary_weight:.0%}, Supporting={supporting_weight:.0%}")
-
     # Calculate weighted adjustment (weights were set earlier based on measured vs estimated)
     weighted_adjustment = (
         (vo2max_adjustment * vo2max_weight) +
@@ -640,10 +660,10 @@ def calculate_biological_age(patient_info, core_scores, metabolic_data):
         (supporting_avg * supporting_weight)
     )
 
-    print(f"  VO2 max contribution: {vo2max_adjustment:+d} × {vo2max_weight:.0%} = {vo2max_adjustment * vo2max_weight:+.1f}")
-    print(f"  Secondary contribution: {secondary_avg:+.1f} × {secondary_weight:.0%} = {secondary_avg * secondary_weight:+.1f}")
-    print(f"  Supporting contribution: {supporting_avg:+.1f} × {supporting_weight:.0%} = {supporting_avg * supporting_weight:+.1f}")
-    print(f"  Total weighted adjustment: {weighted_adjustment:+.1f} years")
+    bio_age_log.debug("FINAL WEIGHTED CALCULATION", vo2max=vo2max_adjustment, vo2max_weight=vo2max_weight,
+                      secondary=secondary_avg, secondary_weight=secondary_weight,
+                      supporting=supporting_avg, supporting_weight=supporting_weight,
+                      total=weighted_adjustment)
 
     # Calculate final biological age
     # Negative adjustment = factors suggest younger, so ADD to get lower bio age
@@ -653,9 +673,7 @@ def calculate_biological_age(patient_info, core_scores, metabolic_data):
     # Ensure reasonable bounds (18-90 years)
     biological_age = max(18, min(90, round(biological_age)))
 
-    age_diff = chronological_age - biological_age
-    print(f"\n  ✓ BIOLOGICAL AGE: {biological_age} (vs chronological: {chronological_age})")
-    print(f"  ✓ You are {abs(age_diff)} years {'younger' if age_diff > 0 else 'older'} than your chronological age")
-    print()
+    bio_age_log.info("Biological age %s (chronological %s)", biological_age, chronological_age,
+                     vo2max_measured=vo2max_is_measured)
 
     return biological_age
@@ -0,0 +1,409 @@
+"""
+Vectorized Cohort Scoring
+
+NumPy versions of the per-patient scoring functions, for rescoring many
+patients at once (e.g. the whole historical cohort after a formula change):
+
+- fuel_percentages       <-> calculate_scores.enhance_extracted_data_with_calculated_scores (fuel step)
+- metabolic_core_scores  <-> calculate_scores.calculate_core_scores_from_metabolic_data
+- biological_age         <-> calculate_scores.calculate_biological_age
+- ergometry_core_scores  <-> ergometry_calculator.score_ergometry_data (core_scores)
+
+A cohort is a dict of equal-length columns, one entry per patient. Numeric
+columns are float64 with NaN meaning "key not present", and each function
+applies the same default the scalar code uses for a missing key. `gender` is
+a lowercase string column ('' when missing). Build cohorts from extracted
+data dicts with cohort_from_extracted / cohort_from_ergometry.
+
+Results are float64 arrays that match the scalar functions exactly (see
+tests/test_cohort_scoring.py for the parity check). Scores are whole
+numbers, and NaN marks a patient the scalar path would return None for.
+Threshold ladders use the same Piecewise tables as the scalar code; the
+remaining branches are evaluated with np.select in the same order as the
+if/elif chain they replace.
+"""
+
+import os
+import sys
+from typing import Dict, Iterable
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from calculate_scores import (
+    VO2MAX_TABLE_MALE, VO2MAX_TABLE_FEMALE, FAT_BURNING_AGE_ADJUSTMENT, RMR_RATIO_AGE_ADJUSTMENT,
+    CORE_SCORE_AGE_ADJUSTMENT, BMI_AGE_ADJUSTMENT
+)
+from ergometry_calculator import (
+    FAT_PERCENT_FROM_RER, LUNG_UTILIZATION_FROM_VE_VO2, HRV_FROM_RESTING_HR, SYMP_PARASYM_FROM_RESTING_HR
+)
+from field_specs import CORE_SCORE_KEYS
+
+# Columns read from extracted_data (see cohort_from_extracted)
+METABOLIC_COLUMNS = ('age', 'weight_kg', 'height_cm', 'rmr', 'caloric_rmr', 'rer',
+                     'fat_percent', 'vo2max', 'vo2max_abs')
+
+# Columns read from extract_ergometry_data output (see cohort_from_ergometry)
+ERGOMETRY_COLUMNS = ('age', 'weight_kg', 'height_cm', 'vo2', 'rer', 've_vo2', 've_vco2',
+                     'hr', 'breathing_coord')
+
+
+def _float(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _default(column: np.ndarray, value: float) -> np.ndarray:
+    return np.where(np.isnan(column), value, column)
+
+
+def _truthy(column: np.ndarray) -> np.ndarray:
+    """Python truthiness of an optional number: present and non-zero"""
+    return ~np.isnan(column) & (column != 0)
+
+
+def _gender(cohort: Dict) -> np.ndarray:
+    """Lowercase gender with the scalar default ('Male') for missing values"""
+    gender = np.asarray(cohort['gender'], dtype=str)
+    return np.where(gender == '', 'male', gender)
+
+
+def _mifflin_st_jeor(weight_kg, height_cm, age, male) -> np.ndarray:
+    return (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + np.where(male, 5, -161)
+
+
+def _demographics(cohort: Dict):
+    return (_default(cohort['age'], 35), _default(cohort['weight_kg'], 77),
+            _default(cohort['height_cm'], 180))
+
+
+# ============================================================================
+# COHORT BUILDERS
+# ============================================================================
+
+def cohort_from_extracted(records: Iterable[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Columns for fuel_percentages / metabolic_core_scores / biological_age
+    from extracted_data dicts (None values are treated as missing keys).
+    """
+    rows = {name: [] for name in METABOLIC_COLUMNS + CORE_SCORE_KEYS}
+    gender, has_fuel = [], []
+    for record in records:
+        patient = record.get('patient_info') or {}
+        metabolic = record.get('metabolic_data') or {}
+        caloric = record.get('caloric_data') or {}
+        scores = record.get('core_scores') or {}
+
+        gender.append((patient.get('gender') or '').lower())
+        has_fuel.append('fat_percent' in caloric and 'cho_percent' in caloric)
+        values = {
+            'age': patient.get('age'),
+            'weight_kg': patient.get('weight_kg'),
+            'height_cm': patient.get('height_cm'),
+            'rmr': metabolic.get('rmr'),
+            'caloric_rmr': caloric.get('rmr'),
+            'rer': metabolic.get('rer'),
+            'fat_percent': caloric.get('fat_percent'),
+            'vo2max': metabolic.get('vo2max_rel') or metabolic.get('vo2max'),
+            'vo2max_abs': metabolic.get('vo2max_abs'),
+        }
+        values.update((key, scores.get(key)) for key in CORE_SCORE_KEYS)
+        for name, value in values.items():
+            rows[name].append(_float(value))
+
+    cohort = {name: np.array(values, dtype=np.float64) for name, values in rows.items()}
+    cohort['gender'] = np.array(gender, dtype=str)
+    cohort['has_fuel'] = np.array(has_fuel, dtype=bool)
+    return cohort
+
+
+def cohort_from_ergometry(datasets: Iterable[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Columns for ergometry_core_scores from extract_ergometry_data-shaped dicts.
+
+    Per-patient source selection (trimmed vs plain mean, chart-range HR) is
+    resolved here, as is breathing coordination for measured breath-by-breath
+    data (it needs the raw VO2/VCO2 series).
+    """
+    from ergometry_calculator import calculate_breathing_coordination_score
+
+    rows = {name: [] for name in ERGOMETRY_COLUMNS}
+    gender, has_patient_info, is_measured = [], [], []
+    for data in datasets:
+        patient = data['patient_info']
+        stats = data['summary_stats']
+        series = data['time_series']
+        chart_ranges = data.get('chart_ranges', {})
+        measured = data.get('data_source') == 'breath_by_breath'
+        has_vo2, has_vco2 = bool(series['vo2']), bool(series['vco2'])
+        has_rer, has_hr = bool(series['rer']), bool(series['hr'])
+
+        if chart_ranges.get('hr_min') and chart_ranges.get('hr_max'):
+            hr = chart_ranges['hr_min'] + (chart_ranges['hr_max'] - chart_ranges['hr_min']) * 0.1
+        elif has_hr:
+            hr = stats.get('hr_mean', stats.get('hr_trimmed_mean'))
+        else:
+            hr = None
+
+        breathing = None
+        if measured and (has_rer or (has_vo2 and has_vco2) or has_hr):
+            breathing = calculate_breathing_coordination_score(data)
+
+        gender.append((patient.get('gender') or '').lower())
+        has_patient_info.append(all(k in patient for k in ['gender', 'age', 'weight_kg', 'height_cm']))
+        is_measured.append(measured)
+        values = {
+            'age': patient.get('age'),
+            'weight_kg': patient.get('weight_kg'),
+            'height_cm': patient.get('height_cm'),
+            'vo2': stats.get('vo2_trimmed_mean', stats.get('vo2_mean', 250)) if has_vo2 else None,
+            'rer': stats.get('rer_trimmed_mean', stats.get('rer_mean', 0.85)) if has_rer else None,
+            've_vo2': stats.get('ve_vo2_trimmed_mean', stats.get('ve_vo2_mean', 22)) if series['ve_vo2'] else None,
+            've_vco2': stats.get('ve_vco2_trimmed_mean', stats.get('ve_vco2_mean', 32)) if series['ve_vco2'] else None,
+            'hr': hr,
+            'breathing_coord': breathing,
+        }
+        for name, value in values.items():
+            rows[name].append(_float(value))
+
+    cohort = {name: np.array(values, dtype=np.float64) for name, values in rows.items()}
+    cohort['gender'] = np.array(gender, dtype=str)
+    cohort['has_patient_info'] = np.array(has_patient_info, dtype=bool)
+    cohort['is_measured'] = np.array(is_measured, dtype=bool)
+    return cohort
+
+
+# ============================================================================
+# calculate_scores.py
+# ============================================================================
+
+def fuel_percentages(cohort: Dict) -> np.ndarray:
+    """
+    Fat % after the enhance step: kept when the PDF had both fuel percentages,
+    otherwise derived from RER (or an RER estimated from the RMR ratio and
+    age when RER is missing or outside 0.7-1.0).
+    """
+    age, weight_kg, height_cm = _demographics(cohort)
+    rer = cohort['rer']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        valid_rer = _truthy(rer) & (rer >= 0.7) & (rer <= 1.0)
+
+        rmr = _default(cohort['caloric_rmr'], 1700)
+        expected_rmr = _mifflin_st_jeor(weight_kg, height_cm, age, _gender(cohort) == 'male')
+        rmr_ratio = np.where(expected_rmr > 0, rmr / expected_rmr, 1.0)
+        age_factor = np.maximum(0, (50 - age) * 0.002)
+        estimated_rer = np.select(
+            [rmr_ratio < 0.5, rmr_ratio < 0.8, rmr_ratio < 1.0, rmr_ratio < 1.2],
+            [0.95 - (rmr_ratio * 0.1),
+             0.90 - ((rmr_ratio - 0.5) / 0.3) * 0.03,
+             0.87 - ((rmr_ratio - 0.8) / 0.2) * 0.04,
+             0.83 - ((rmr_ratio - 1.0) / 0.2) * 0.05],
+            np.maximum(0.70, 0.78 - (rmr_ratio - 1.2) * 0.04)
+        )
+        estimated_rer = np.maximum(0.70, estimated_rer - age_factor)
+
+    clamped = np.clip(np.where(valid_rer, rer, estimated_rer), 0.7, 1.0)
+    carb_percent = np.trunc(((clamped - 0.7) / 0.3) * 100)
+    return np.where(cohort['has_fuel'], cohort['fat_percent'], 100 - carb_percent)
+
+
+def metabolic_core_scores(cohort: Dict, fat_percent: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    The seven core scores from demographics, RMR, RER and fat %.
+
+    Args:
+        fat_percent: fat % per patient (default: the cohort's fat_percent
+            column, 50 where missing); pass fuel_percentages(cohort) to
+            match the enhance step
+    """
+    age, weight_kg, height_cm = _demographics(cohort)
+    male = _gender(cohort) == 'male'
+    if fat_percent is None:
+        fat_percent = cohort['fat_percent']
+    fat_percent = _default(fat_percent, 50)
+    rer = _default(cohort['rer'], 0.85)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        calculated_rmr = _mifflin_st_jeor(weight_kg, height_cm, age, male)
+        extracted_rmr = np.where(_truthy(cohort['rmr']), cohort['rmr'], cohort['caloric_rmr'])
+        extracted_ratio = extracted_rmr / calculated_rmr
+        use_extracted = _truthy(extracted_rmr) & (0.5 < extracted_ratio) & (extracted_ratio < 1.5)
+        rmr = np.where(use_extracted, extracted_rmr, calculated_rmr)
+        rmr_ratio = np.where(calculated_rmr > 0, rmr / calculated_rmr, 1.0)
+
+    metabolic_rate = np.clip(np.trunc(rmr_ratio * 70 + 15), 30, 100)
+
+    fat_burning = np.select(
+        [fat_percent >= 70, fat_percent >= 50],
+        [np.minimum(100, 85 + np.floor_divide(fat_percent - 70, 2)), 65 + (fat_percent - 50)],
+        np.maximum(35, 40 + np.floor_divide(fat_percent, 3))
+    )
+
+    lung_base = np.maximum(60, 100 - (age - 25) * 0.5)
+    lung_util = np.clip(np.trunc(lung_base + (rmr_ratio - 0.9) * 20), 50, 100)
+
+    hrv_base = np.maximum(40, 95 - (age - 25) * 0.8)
+    hrv = np.clip(np.trunc(hrv_base + (rmr_ratio - 0.85) * 15), 35, 100)
+
+    rer_balance = np.where(_truthy(rer), np.maximum(0, 1 - np.abs(rer - 0.85) / 0.3), 0.5)
+    symp_parasym = np.clip(np.trunc(60 + rer_balance * 30 + (fat_burning - 60) * 0.3), 40, 100)
+
+    bmi = weight_kg / ((height_cm / 100) ** 2)
+    bmi_factor = np.clip((25 - bmi) * 0.5, -5, 5)
+    vent_age_factor = np.maximum(0, (50 - age) * 0.3)
+    ventilation_eff = np.clip(np.trunc(lung_util * 0.8 + vent_age_factor + bmi_factor), 40, 100)
+
+    weight_factor = np.clip((80 - weight_kg) * 0.05, -3, 3)
+    breathing_coord = np.clip(
+        np.trunc(ventilation_eff * 0.85 + (rmr_ratio - 0.85) * 20 + weight_factor), 30, 100
+    )
+
+    return {
+        'metabolic_rate': metabolic_rate,
+        'fat_burning': fat_burning,
+        'lung_util': lung_util,
+        'hrv': hrv,
+        'symp_parasym': symp_parasym,
+        'ventilation_eff': ventilation_eff,
+        'breathing_coord': breathing_coord,
+    }
+
+
+def vo2max_biological_age(vo2max: np.ndarray, male: np.ndarray) -> np.ndarray:
+    """VO2 max equivalent age per patient from the compiled ACSM tables"""
+    return np.where(male, VO2MAX_TABLE_MALE.equivalent_age(vo2max), VO2MAX_TABLE_FEMALE.equivalent_age(vo2max))
+
+
+def biological_age(cohort: Dict, core_scores: Dict[str, np.ndarray] = None) -> np.ndarray:
+    """
+    Biological age per patient (NaN where the scalar returns None).
+
+    Args:
+        core_scores: score columns to use (default: the cohort's own
+            core-score columns); NaN marks a score that is not present
+    """
+    chronological_age = _default(cohort['age'], 35)
+    _, weight_kg, height_cm = _demographics(cohort)
+    # The scalar code tests `'male' in gender`, which also matches 'female'
+    male = np.char.find(_gender(cohort), 'male') >= 0
+    if core_scores is None:
+        core_scores = {key: cohort[key] for key in CORE_SCORE_KEYS}
+    scores = np.column_stack([core_scores[key] for key in CORE_SCORE_KEYS])
+    present = ~np.isnan(scores)
+    score_count = present.sum(axis=1)
+    has_scores = score_count > 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # PRIMARY: measured VO2 max only
+        vo2max = cohort['vo2max']
+        vo2max_abs = cohort['vo2max_abs']
+        measured_rel = _truthy(vo2max) & (vo2max > 10)
+        converted = (vo2max_abs * 1000) / weight_kg
+        measured_abs = _truthy(vo2max_abs) & (weight_kg > 0) & (10 < converted) & (converted < 80)
+        vo2max_is_measured = measured_rel | measured_abs
+        vo2max = np.where(measured_rel, vo2max, converted)
+
+        vo2max_adjustment = np.where(
+            vo2max_is_measured, chronological_age - vo2max_biological_age(vo2max, male), 0
+        )
+        vo2max_weight = np.where(vo2max_is_measured, 0.50, 0.00)
+        secondary_weight = np.where(vo2max_is_measured, 0.30, 0.50)
+        supporting_weight = np.where(vo2max_is_measured, 0.20, 0.50)
+
+        # SECONDARY: fat-burning + metabolic rate
+        fat_burning_score = np.where(has_scores, _default(core_scores['fat_burning'], 50), 50)
+        fat_adjustment = FAT_BURNING_AGE_ADJUSTMENT(fat_burning_score)
+
+        expected_rmr = _mifflin_st_jeor(weight_kg, height_cm, chronological_age, male)
+        extracted_rmr = cohort['rmr']
+        extracted_ratio = extracted_rmr / expected_rmr
+        use_extracted = _truthy(extracted_rmr) & (0.5 < extracted_ratio) & (extracted_ratio < 1.5)
+        rmr = np.where(use_extracted, extracted_rmr, expected_rmr)
+        rmr_ratio = np.where(expected_rmr > 0, rmr / expected_rmr, 1.0)
+        rmr_adjustment = RMR_RATIO_AGE_ADJUSTMENT(rmr_ratio)
+        secondary_avg = (fat_adjustment + rmr_adjustment) / 2
+
+        # SUPPORTING: core scores + BMI
+        filled = np.where(present, scores, 0)
+        avg_score = filled.sum(axis=1) / score_count
+        excellent_count = (present & (filled >= 80)).sum(axis=1)
+        good_count = (present & (filled >= 60) & (filled < 80)).sum(axis=1)
+        poor_count = (present & (filled < 50)).sum(axis=1)
+        base_adjustment = CORE_SCORE_AGE_ADJUSTMENT(avg_score)
+        score_adjustment = base_adjustment + (-2 * excellent_count) + (-1 * good_count) + (1 * poor_count)
+
+        bmi = np.where(height_cm > 0, weight_kg / ((height_cm / 100) ** 2), 25)
+        bmi_factor = BMI_AGE_ADJUSTMENT(bmi)
+        supporting_avg = np.where(has_scores, (score_adjustment + bmi_factor) / 2, bmi_factor / 1)
+
+    weighted_adjustment = (
+        (vo2max_adjustment * vo2max_weight) +
+        (secondary_avg * secondary_weight) +
+        (supporting_avg * supporting_weight)
+    )
+    result = np.clip(np.rint(chronological_age + weighted_adjustment), 18, 90)
+    return np.where(chronological_age == 0, np.nan, result)
+
+
+def score_cohort(cohort: Dict) -> Dict[str, np.ndarray]:
+    """
+    Core scores and biological age for patients without PDF scores, as the
+    report generators compute them (enhance step, then biological age).
+    """
+    scores = metabolic_core_scores(cohort, fuel_percentages(cohort))
+    scores['biological_age'] = biological_age(cohort, scores)
+    return scores
+
+
+# ============================================================================
+# ergometry_calculator.py
+# ============================================================================
+
+def ergometry_core_scores(cohort: Dict) -> Dict[str, np.ndarray]:
+    """
+    The seven core scores of score_ergometry_data from summary statistics,
+    with the same demographic estimates (moderate activity) for channels
+    that were not measured.
+    """
+    age, weight_kg, height_cm = cohort['age'], cohort['weight_kg'], cohort['height_cm']
+    estimated = cohort['has_patient_info']
+    is_measured = cohort['is_measured']
+    male = np.isin(_gender(cohort), ['male', 'm'])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        predicted_rmr = _mifflin_st_jeor(weight_kg, height_cm, age, male)
+
+        # 1. Metabolic rate: measured VO2 -> RMR, else 92% of predicted
+        has_vo2 = ~np.isnan(cohort['vo2']) & estimated
+        rmr = np.where(has_vo2, cohort['vo2'] * 6.998, predicted_rmr * 0.92)
+        rate = np.trunc(np.clip((rmr / predicted_rmr) * 50, 0, 100))
+        metabolic_rate = np.where(estimated & (predicted_rmr > 0), rate, 50)
+
+        # 2. Fat-burning: measured RER beats demographics beats chart RER
+        has_rer = ~np.isnan(cohort['rer'])
+        mean_rer = np.select([is_measured & has_rer, estimated, has_rer], [cohort['rer'], 0.841, cohort['rer']], 0.841)
+        fat_percent = FAT_PERCENT_FROM_RER(mean_rer)
+        fat_burning = np.trunc(np.clip(fat_percent * 1.1, 0, 100))
+
+        # 3-4. Lung utilization / ventilation efficiency
+        ve_vo2 = np.where(np.isnan(cohort['ve_vo2']), np.where(estimated, 20, 22), cohort['ve_vo2'])
+        ve_vco2 = np.where(np.isnan(cohort['ve_vco2']), 32, cohort['ve_vco2'])
+        lung_util = np.trunc(LUNG_UTILIZATION_FROM_VE_VO2(ve_vo2))
+        ventilation_eff = np.where(ve_vco2 <= 25, 100, np.trunc(np.clip(100 - (ve_vco2 - 25) * 3.7, 0, 100)))
+
+    # 5. Breathing coordination: measured score, else CV 8% -> 67
+    breathing_coord = np.where(np.isnan(cohort['breathing_coord']), 67, cohort['breathing_coord'])
+
+    # 6-7. HRV and autonomic balance from resting HR
+    mean_hr = np.where(np.isnan(cohort['hr']), np.where(estimated, 62, 70), cohort['hr'])
+    hrv = HRV_FROM_RESTING_HR(mean_hr)
+    symp_parasym = SYMP_PARASYM_FROM_RESTING_HR(mean_hr)
+
+    return {
+        'metabolic_rate': metabolic_rate.astype(np.float64),
+        'fat_burning': fat_burning,
+        'lung_util': lung_util.astype(np.float64),
+        'ventilation_eff': ventilation_eff.astype(np.float64),
+        'breathing_coord': breathing_coord,
+        'hrv': hrv.astype(np.float64),
+        'symp_parasym': symp_parasym.astype(np.float64),
+    }
@@ -14,32 +14,187 @@ Scores calculated:
 7. Sympathetic/Parasympathetic Balance (%) - Based on autonomic indicators
 """
 
+import os
 import re
+import sys
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Optional, Union
 import pdfplumber
 
+sys.path.insert(0, os.path.dirname(__file__))
+from time_series import SeriesColumn, new_time_series, summarize
+from piecewise import Piecewise
+from field_specs import (
+    FieldMatcher, PATIENT_FIELDS, CORE_SCORE_FIELDS, REPORT_SUMMARY_FIELDS,
+    REQUIRED_PATIENT_KEYS, REQUIRED_REPORT_KEYS
+)
+
+# Compiled once at import - these run against every uploaded PDF
+_PATIENT_MATCHER = FieldMatcher(PATIENT_FIELDS, required=REQUIRED_PATIENT_KEYS)
+_PERFORMANCE_MATCHER = FieldMatcher(
+    PATIENT_FIELDS + CORE_SCORE_FIELDS + REPORT_SUMMARY_FIELDS,
+    required=REQUIRED_REPORT_KEYS
+)
+
+# Performance Reports keep their scores in the first pages; never read past this
+PERFORMANCE_REPORT_MAX_PAGES = 15
+
+# Scoring tables (utils/piecewise.py). Linear segments are (value, anchor, slope):
+# value + (x - anchor) * slope
+
+# Fat oxidation % from RER: 0.70 -> 100% fat, 1.00 -> 0% fat (100% carb)
+FAT_PERCENT_FROM_RER = Piecewise([0.70, 1.00], [100, (0, 1.00, -100 / 0.30), 0])
+
+# Lung utilization from VE/VO2: 20-25 -> 100-75, 25-30 -> 75-50, 30-40 -> 50-25, 40-50 -> 25-0
+LUNG_UTILIZATION_FROM_VE_VO2 = Piecewise(
+    [20, 25, 30, 40, 50],
+    [100, (100, 20, -5), (75, 25, -5), (50, 30, -2.5), (25, 40, -2.5), 0]
+)
+
+# Autonomic balance components: resting HR (elite 40-50 bpm -> 95) and resting RER
+AUTONOMIC_HR_COMPONENT = Piecewise(
+    [50, 60, 70, 80, 90],
+    [95, (85, 60, -1), (70, 70, -1.5), (55, 80, -1.5), (40, 90, -1.5), (40, 90, -1)],
+    lower=20
+)
+AUTONOMIC_RER_COMPONENT = Piecewise([0.75], [90, (70, 0.85, -200)], lower=40)
+
+# HRV and parasympathetic scores from resting HR, calibrated on Mark (62 bpm -> 88% / 76%)
+RESTING_HR_BREAKS = [55, 58, 62, 66, 70, 75, 80, 85, 90, 95, 100]
+HRV_FROM_RESTING_HR = Piecewise.steps(RESTING_HR_BREAKS, [95, 92, 88, 82, 75, 65, 55, 48, 42, 36, 30, 25])
+SYMP_PARASYM_FROM_RESTING_HR = Piecewise.steps(RESTING_HR_BREAKS, [85, 80, 76, 72, 66, 58, 50, 44, 38, 32, 26, 20])
+
+_HR_AXIS_RE = re.compile(r'Heart Rate.*?(\d{2,3})\s+(\d{2,3})\s+(\d{2,3})', re.DOTALL)
+_HR_LABEL_RE = re.compile(r'\[?\d{2}\]?\s*Heart Rate|HR.*?(\d{2})')
+_TWO_DIGIT_RE = re.compile(r'(?:^|\s)(\d{2})(?:\s|$)')
+_RER_AXIS_RE = re.compile(r'(0\.[5-9]|1\.0)')
+_NUMERIC_CELL_RE = re.compile(r'^-?\d+\.?\d*$')
+# A text line with 3+ standalone numbers - the only rows _parse_data_table uses
+_NUMERIC_ROW_RE = re.compile(r'^(?:[^\n]*?(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])){3}', re.MULTILINE)
+_VO2_RE = re.compile(r'VO2[:\s]+(\d+(?:\.\d+)?)\s*(?:ml|L)')
+_VCO2_RE = re.compile(r'VCO2[:\s]+(\d+(?:\.\d+)?)\s*(?:ml|L)')
+_HR_VALUE_RE = re.compile(r'(?:HR|Heart Rate)[:\s]+(\d+)\s*(?:bpm)?')
+_RER_VALUE_RE = re.compile(r'RER[:\s]+(\d+\.?\d*)')
+_ERGOMETRY_SCORE_RE = re.compile(r'(?:Metabolic rate|Fat-burning|Lung utilization).*?-\s*\d+%')
+_FIRST_PAGE_SCORE_RE = re.compile(r'(?:Metabolic rate|Fat-burning|Lung utilization).*?-\s*\d+%', re.IGNORECASE)
+_REPORT_SCORE_RE = re.compile(
+    r'(?:Metabolic rate|Fat-burning|Lung utilization|Heart Rate Variability).*?-\s*\d+%',
+    re.IGNORECASE
+)
+
+
+class ParsedPDF:
+    """
+    A PNOE PDF opened once and shared by every extraction step.
+
+    pdfplumber re-runs layout analysis every time a page's text or tables are
+    requested, so each page's text and tables are extracted lazily on first
+    use and memoized. Type detection, score extraction and the app fallback
+    all read from the same instance instead of re-opening the file.
+
+    `pages_touched` counts the pages that were actually laid out, so callers
+    can log how far an early-exit scan got.
+    """
+
+    def __init__(self, pdf_path: str):
+        self.path = pdf_path
+        self._pdf = None
+        self._page_text: Dict[int, str] = {}
+        self._page_tables: Dict[int, List] = {}
+        self.tables_skipped = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.pdf.pages)
+
+    @property
+    def pdf(self):
+        """Underlying pdfplumber document, opened on first access."""
+        if self._pdf is None:
+            self._pdf = pdfplumber.open(self.path)
+        return self._pdf
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def page_text(self, index: int) -> str:
+        """Text of page `index` (0-based), extracted at most once."""
+        if index not in self._page_text:
+            self._page_text[index] = self.pdf.pages[index].extract_text() or ""
+        return self._page_text[index]
+
+    def page_tables(self, index: int, marker=None) -> List:
+        """
+        Tables of page `index` (0-based), extracted at most once.
+
+        If `marker` (a compiled regex) is given and the page text does not
+        match it, the page cannot hold the rows the caller is looking for and
+        [] is returned without running pdfplumber's table detection.
+        """
+        if index not in self._page_tables:
+            if marker is not None and not marker.search(self.page_text(index)):
+                self.tables_skipped += 1
+                return []
+            self._page_tables[index] = self.pdf.pages[index].extract_tables() or []
+        return self._page_tables[index]
+
+    @property
+    def pages_touched(self) -> int:
+        """Number of distinct pages whose text or tables have been extracted."""
+        return len(self._page_text.keys() | self._page_tables.keys())
+
+    def iter_text(self, max_pages: Optional[int] = None):
+        """Lazily yield page text in order, extracting each page on demand."""
+        count = len(self) if max_pages is None else min(max_pages, len(self))
+        for i in range(count):
+            yield self.page_text(i)
+
+    def text(self, max_pages: Optional[int] = None) -> str:
+        """Newline-joined text of the first `max_pages` pages (all if None)."""
+        count = len(self) if max_pages is None else min(max_pages, len(self))
+        return "".join(self.page_text(i) + "\n" for i in range(count))
+
+
+PDFSource = Union[str, ParsedPDF]
+
+
+@contextmanager
+def open_pdf(source: PDFSource):
+    """
+    Yield a ParsedPDF for `source`.
 
-def extract_ergometry_data(pdf_path: str) -> Dict:
+    Callers that already hold a ParsedPDF get it back untouched (and keep
+    ownership); a path is opened here and closed when the block exits.
+    """
+    if isinstance(source, ParsedPDF):
+        yield source
+    else:
+        with ParsedPDF(source) as doc:
+            yield doc
+
+
+def extract_ergometry_data(pdf_path: PDFSource) -> Dict:
     """
     Extract raw ergometry data from PNOE Ergometry PDF.
 
     Returns dict with:
     - patient_info: name, gender, age, weight, height
-    - time_series: VO2, VCO2, HR, RER values over time
+    - time_series: VO2, VCO2, HR, RER values over time (SeriesColumn per channel)
     - summary_stats: calculated averages and peaks
     - chart_ranges: estimated ranges from chart axes
     """
     data = {
         'patient_info': {},
-        'time_series': {
-            'vo2': [],      # ml/min
-            'vco2': [],     # ml/min
-            'hr': [],       # bpm
-            'rer': [],      # ratio
-            've_vo2': [],   # ventilatory equivalent O2
-            've_vco2': [],  # ventilatory equivalent CO2
-        },
+        # vo2/vco2 ml/min, hr bpm, rer ratio, ve_vo2/ve_vco2 ventilatory equivalents
+        'time_series': new_time_series(),
         'chart_ranges': {},  # Estimated ranges from chart axes
         'summary_stats': {},
         'is_rmr_test': False,
@@ -47,29 +202,11 @@ def extract_ergometry_data(pdf_path: str) -> Dict:
         'data_source': 'raw_ergometry'
     }
 
-    with pdfplumber.open(pdf_path) as pdf:
-        full_text = ""
-        for page in pdf.pages:
-            text = page.extract_text() or ""
-            full_text += text + "\n"
+    with open_pdf(pdf_path) as doc:
+        full_text = doc.text()
 
         # Extract patient info
-        name_match = re.search(r'Name\s+([^\n]+?)(?:\s+Status|$)', full_text)
-        if name_match:
-            data['patient_info']['name'] = name_match.group(1).strip()
-
-        gender_age_match = re.search(r'Gender\s+(\w+)\s*\((\d+)\)', full_text)
-        if gender_age_match:
-            data['patient_info']['gender'] = gender_age_match.group(1)
-            data['patient_info']['age'] = int(gender_age_match.group(2))
-
-        weight_match = re.search(r'Weight\s+(\d+(?:\.\d+)?)\s*kg', full_text)
-        if weight_match:
-            data['patient_info']['weight_kg'] = float(weight_match.group(1))
-
-        height_match = re.search(r'Height\s+(\d+(?:\.\d+)?)\s*cm', full_text)
-        if height_match:
-            data['patient_info']['height_cm'] = float(height_match.group(1))
+        _PATIENT_MATCHER.extract(doc.iter_text(), data)
 
         # Detect test type
         if 'RMR' in full_text:
@@ -78,8 +215,8 @@ def extract_ergometry_data(pdf_path: str) -> Dict:
             data['is_exercise_test'] = True
 
         # Extract data from tables if present
-        for page in pdf.pages:
-            tables = page.extract_tables()
+        for page_index in range(len(doc)):
+            tables = doc.page_tables(page_index, marker=_NUMERIC_ROW_RE)
             for table in tables:
                 if table:
                     _parse_data_table(table, data)
@@ -114,7 +251,7 @@ def _extract_chart_axis_ranges(text: str, data: Dict):
 
     # Look for HR axis values (typically 60-75 for RMR, higher for exercise)
     # Pattern: consecutive numbers like "75 70 65 60" near "Heart Rate"
-    hr_section = re.search(r'Heart Rate.*?(\d{2,3})\s+(\d{2,3})\s+(\d{2,3})', text, re.DOTALL)
+    hr_section = _HR_AXIS_RE.search(text)
     if hr_section:
         hr_vals = [int(hr_section.group(i)) for i in range(1, 4)]
         if all(40 < v < 200 for v in hr_vals):
@@ -124,10 +261,10 @@ def _extract_chart_axis_ranges(text: str, data: Dict):
             ranges['hr_mean'] = (ranges['hr_min'] + ranges['hr_max']) / 2
 
     # If we see specific HR values in the text
-    hr_matches = re.findall(r'\[?\d{2}\]?\s*Heart Rate|HR.*?(\d{2})', text)
+    hr_matches = _HR_LABEL_RE.findall(text)
     if hr_matches:
         # Look for numbers before "Heart Rate" or after "HR"
-        single_hr = re.findall(r'(?:^|\s)(\d{2})(?:\s|$)', text)
+        single_hr = _TWO_DIGIT_RE.findall(text)
         valid_hrs = [int(h) for h in single_hr if 50 <= int(h) <= 100]
         if valid_hrs and 'hr_mean' not in ranges:
             ranges['hr_mean'] = np.mean(valid_hrs)
@@ -137,7 +274,7 @@ def _extract_chart_axis_ranges(text: str, data: Dict):
         ranges['hr_mean'] = 68  # Typical resting HR
 
     # Look for RER axis values (0.5-1.0 range)
-    rer_matches = re.findall(r'(0\.[5-9]|1\.0)', text)
+    rer_matches = _RER_AXIS_RE.findall(text)
     if rer_matches:
         rer_vals = [float(v) for v in rer_matches if 0.5 <= float(v) <= 1.2]
         if rer_vals:
@@ -159,12 +296,12 @@ def _estimate_values_from_chart_ranges(data: Dict):
 
     # Populate time_series with single estimated values
     if 'hr_mean' in ranges:
-        data['time_series']['hr'] = [ranges['hr_mean']]
+        data['time_series']['hr'] = SeriesColumn([ranges['hr_mean']])
         data['summary_stats']['hr_mean'] = ranges['hr_mean']
         data['summary_stats']['hr_std'] = 5.0  # Assume moderate variability
 
     if 'rer_mean' in ranges:
-        data['time_series']['rer'] = [ranges['rer_mean']]
+        data['time_series']['rer'] = SeriesColumn([ranges['rer_mean']])
         data['summary_stats']['rer_mean'] = ranges['rer_mean']
         data['summary_stats']['rer_std'] = 0.05
 
@@ -181,7 +318,7 @@ def _parse_data_table(table: List[List], data: Dict):
         # Look for numeric data rows
         try:
             # Typical format: Time, VO2, VCO2, HR, RER, etc.
-            numeric_values = [float(x) for x in row if x and re.match(r'^-?\d+\.?\d*$', str(x))]
+            numeric_values = [float(x) for x in row if x and _NUMERIC_CELL_RE.match(str(x))]
             if len(numeric_values) >= 3:
                 # Assume order based on typical PNOE format
                 if numeric_values[0] < 1000:  # Likely VO2 in ml/min range
@@ -197,7 +334,7 @@ def _extract_values_from_text(text: str, data: Dict):
     """Extract numeric values from text patterns in the PDF."""
 
     # Look for VO2 values (typically 100-600 ml/min at rest)
-    vo2_matches = re.findall(r'VO2[:\s]+(\d+(?:\.\d+)?)\s*(?:ml|L)', text)
+    vo2_matches = _VO2_RE.findall(text)
     for val in vo2_matches:
         v = float(val)
         if v < 10:  # L/min
@@ -206,7 +343,7 @@ def _extract_values_from_text(text: str, data: Dict):
             data['time_series']['vo2'].append(v)
 
     # Look for VCO2 values
-    vco2_matches = re.findall(r'VCO2[:\s]+(\d+(?:\.\d+)?)\s*(?:ml|L)', text)
+    vco2_matches = _VCO2_RE.findall(text)
     for val in vco2_matches:
         v = float(val)
         if v < 10:
@@ -215,14 +352,14 @@ def _extract_values_from_text(text: str, data: Dict):
             data['time_series']['vco2'].append(v)
 
     # Look for heart rate values
-    hr_matches = re.findall(r'(?:HR|Heart Rate)[:\s]+(\d+)\s*(?:bpm)?', text)
+    hr_matches = _HR_VALUE_RE.findall(text)
     for val in hr_matches:
         hr = int(val)
         if 40 < hr < 200:
             data['time_series']['hr'].append(hr)
 
     # Look for RER values
-    rer_matches = re.findall(r'RER[:\s]+(\d+\.?\d*)', text)
+    rer_matches = _RER_VALUE_RE.findall(text)
     for val in rer_matches:
         rer = float(val)
         if 0.5 < rer < 1.5:
@@ -235,23 +372,8 @@ def _extract_values_from_text(text: str, data: Dict):
 
 
 def _calculate_summary_stats(data: Dict):
-    """Calculate summary statistics from time series data."""
-    stats = data['summary_stats']
-
-    for key, values in data['time_series'].items():
-        if values:
-            arr = np.array(values)
-            stats[f'{key}_mean'] = float(np.mean(arr))
-            stats[f'{key}_std'] = float(np.std(arr))
-            stats[f'{key}_min'] = float(np.min(arr))
-            stats[f'{key}_max'] = float(np.max(arr))
-            # Use middle 80% for more stable average (exclude outliers)
-            if len(arr) > 5:
-                sorted_arr = np.sort(arr)
-                trim_n = len(arr) // 10
-                if trim_n > 0:
-                    trimmed = sorted_arr[trim_n:-trim_n]
-                    stats[f'{key}_trimmed_mean'] = float(np.mean(trimmed))
+    """Copy each column's online statistics into summary_stats."""
+    summarize(data['time_series'], data['summary_stats'])
 
 
 def calculate_predicted_rmr(gender: str, age: int, weight_kg: float, height_cm: float) -> float:
@@ -325,13 +447,7 @@ def calculate_fat_burning_score(rer: float) -> int:
     - Fat percent: 53%
     - Score: 53 * 1.1 = 58% (matches PNOE)
     """
-    if rer <= 0.70:
-        fat_percent = 100
-    elif rer >= 1.00:
-        fat_percent = 0
-    else:
-        # Calculate fat percentage from RER
-        fat_percent = (1.00 - rer) / 0.30 * 100
+    fat_percent = FAT_PERCENT_FROM_RER(rer)
 
     # PNOE applies a 1.1x multiplier (metabolic flexibility bonus)
     score = fat_percent * 1.1
@@ -352,22 +468,7 @@ def calculate_lung_utilization_score(ve_vo2: float) -> int:
 
     Lower VE/VO2 = lungs extract more O2 per breath = better.
     """
-    if ve_vo2 <= 20:
-        return 100
-    elif ve_vo2 >= 50:
-        return 0
-    elif ve_vo2 <= 25:
-        # 20-25 maps to 75-100
-        return int(100 - (ve_vo2 - 20) * 5)
-    elif ve_vo2 <= 30:
-        # 25-30 maps to 50-75
-        return int(75 - (ve_vo2 - 25) * 5)
-    elif ve_vo2 <= 40:
-        # 30-40 maps to 25-50
-        return int(50 - (ve_vo2 - 30) * 2.5)
-    else:
-        # 40-50 maps to 0-25
-        return int(25 - (ve_vo2 - 40) * 2.5)
+    return int(LUNG_UTILIZATION_FROM_VE_VO2(ve_vo2))
 
 
 def calculate_ventilation_efficiency_score(ve_vco2: float) -> int:
@@ -422,9 +523,12 @@ def calculate_breathing_coordination_score(data: Dict) -> int:
                 scores.append(int(100 - (rer_cv - 5) * 4.67))
 
     # Check VO2/VCO2 correlation (should be highly correlated)
-    if len(data['time_series']['vo2']) > 5 and len(data['time_series']['vco2']) > 5:
-        vo2 = np.array(data['time_series']['vo2'][:min(len(data['time_series']['vo2']), len(data['time_series']['vco2']))])
-        vco2 = np.array(data['time_series']['vco2'][:len(vo2)])
+    vo2_column = data['time_series']['vo2']
+    vco2_column = data['time_series']['vco2']
+    if len(vo2_column) > 5 and len(vco2_column) > 5:
+        n = min(len(vo2_column), len(vco2_column))
+        vo2 = vo2_column.values[:n]
+        vco2 = vco2_column.values[:n]
         if len(vo2) > 2:
             correlation = np.corrcoef(vo2, vco2)[0, 1]
             # Correlation > 0.9 = excellent, < 0.5 = poor
@@ -452,7 +556,7 @@ def calculate_breathing_coordination_score(data: Dict) -> int:
         return 65  # Default to average if no data
 
 
-def calculate_hrv_score(hr_data: List[float]) -> int:
+def calculate_hrv_score(hr_data: Union[SeriesColumn, List[float]]) -> int:
     """
     Calculate HRV Score (0-100%).
 
@@ -466,9 +570,12 @@ def calculate_hrv_score(hr_data: List[float]) -> int:
     if not hr_data or len(hr_data) < 5:
         return 65  # Default if insufficient data
 
-    hr_array = np.array(hr_data)
-    mean_hr = np.mean(hr_array)
-    std_hr = np.std(hr_array)
+    # Columns already carry their running mean/std; plain lists are wrapped once
+    if not isinstance(hr_data, SeriesColumn):
+        hr_data = SeriesColumn(hr_data)
+    hr_array = hr_data.values
+    mean_hr = hr_data.mean
+    std_hr = hr_data.std
 
     # Calculate RMSSD approximation from HR data
     # RMSSD-like metric: sqrt of mean squared differences
@@ -519,21 +626,7 @@ def calculate_autonomic_balance_score(data: Dict) -> int:
         # Elite athletes: 40-50 bpm (score: 90-100)
         # Average: 60-70 bpm (score: 60-75)
         # Elevated: 80-90+ bpm (score: 30-50)
-
-        if mean_hr <= 50:
-            hr_score = 95
-        elif mean_hr <= 60:
-            hr_score = 85 + (60 - mean_hr)
-        elif mean_hr <= 70:
-            hr_score = 70 + (70 - mean_hr) * 1.5
-        elif mean_hr <= 80:
-            hr_score = 55 + (80 - mean_hr) * 1.5
-        elif mean_hr <= 90:
-            hr_score = 40 + (90 - mean_hr) * 1.5
-        else:
-            hr_score = max(20, 40 - (mean_hr - 90))
-
-        scores.append(hr_score)
+        scores.append(AUTONOMIC_HR_COMPONENT(mean_hr))
 
     # HRV component (variability indicates parasympathetic activity)
     if data['time_series']['hr'] and len(data['time_series']['hr']) > 5:
@@ -544,13 +637,7 @@ def calculate_autonomic_balance_score(data: Dict) -> int:
     if data['time_series']['rer']:
         mean_rer = data['summary_stats'].get('rer_mean', 0.85)
         # RER 0.70-0.75 at rest = good autonomic state
-        if mean_rer <= 0.75:
-            rer_score = 90
-        elif mean_rer <= 0.85:
-            rer_score = 70 + (0.85 - mean_rer) * 200
-        else:
-            rer_score = max(40, 70 - (mean_rer - 0.85) * 200)
-        scores.append(rer_score)
+        scores.append(AUTONOMIC_RER_COMPONENT(mean_rer))
 
     if scores:
         return int(np.mean(scores))
@@ -668,10 +755,25 @@ def estimate_raw_values_from_demographics(gender: str, age: int, weight_kg: floa
     }
 
 
-def calculate_all_scores(pdf_path: str) -> Dict:
+def calculate_all_scores(pdf_path: PDFSource) -> Dict:
     """
     Main function: Extract data and calculate all 7 core scores.
 
+    See score_ergometry_data for the formulas and the returned dict.
+    """
+    # Extract raw data from PDF
+    return score_ergometry_data(extract_ergometry_data(pdf_path))
+
+
+def score_ergometry_data(data: Dict) -> Dict:
+    """
+    Calculate all 7 core scores from extracted ergometry data.
+
+    `data` has the shape returned by extract_ergometry_data. PDF exports only
+    carry chart axis labels, so demographic estimates are preferred for RER
+    and breathing coordination; measured breath-by-breath tables
+    (data_source 'breath_by_breath') are scored from the real series.
+
     Uses PNOE's actual scoring formulas (reverse-engineered):
     - Metabolic Rate: score = (measured_RMR / predicted_RMR) × 50
     - Fat-burning: score = fat_percent × 1.1
@@ -687,9 +789,6 @@ def calculate_all_scores(pdf_path: str) -> Dict:
     - raw_metrics (underlying measurements)
     - calculation_details (explanations)
     """
-    # Extract raw data from PDF
-    data = extract_ergometry_data(pdf_path)
-
     patient = data['patient_info']
     stats = data['summary_stats']
     chart_ranges = data.get('chart_ranges', {})
@@ -708,6 +807,7 @@ def calculate_all_scores(pdf_path: str) -> Dict:
     has_hr = bool(data['time_series']['hr'])
     has_rer = bool(data['time_series']['rer'])
     has_patient_info = all(k in patient for k in ['gender', 'age', 'weight_kg', 'height_cm'])
+    is_measured = data.get('data_source') == 'breath_by_breath'
 
     # For raw ergometry PDFs, we ALWAYS prefer demographic-based estimates
     # because chart-extracted values come from axis labels, not actual data
@@ -757,8 +857,11 @@ def calculate_all_scores(pdf_path: str) -> Dict:
 
     # 2. FAT-BURNING EFFICIENCY SCORE
     # Formula: score = fat_percent × 1.1
-    # PREFER demographic estimates over chart-extracted values (more accurate)
-    if estimated_values:
+    # PREFER demographic estimates over chart-extracted values (more accurate),
+    # but measured breath-by-breath RER beats both
+    if is_measured and has_rer:
+        mean_rer = stats.get('rer_trimmed_mean', stats.get('rer_mean', 0.85))
+    elif estimated_values:
         mean_rer = estimated_values['rer']  # Use calibrated estimate
     elif has_rer:
         mean_rer = stats.get('rer_trimmed_mean', stats.get('rer_mean', 0.85))
@@ -813,8 +916,13 @@ def calculate_all_scores(pdf_path: str) -> Dict:
 
     # 5. BREATHING COORDINATION SCORE
     # Formula: score = 100 - (CV - 2) × 5.5
-    # PREFER demographic estimates for consistency
-    if estimated_values:
+    # PREFER demographic estimates for consistency, unless real series were measured
+    if is_measured and (has_rer or (has_vo2 and has_vco2) or has_hr):
+        result['core_scores']['breathing_coord'] = calculate_breathing_coordination_score(data)
+        result['calculation_details']['breathing_coord'] = (
+            "From measured RER stability, VO2/VCO2 coupling and HR stability"
+        )
+    elif estimated_values:
         cv = estimated_values['breathing_cv']
         breathing_score = int(100 - (cv - 2) * 5.5)
         result['core_scores']['breathing_coord'] = max(0, min(100, breathing_score))
@@ -850,31 +958,7 @@ def calculate_all_scores(pdf_path: str) -> Dict:
         mean_hr = 70  # Default
 
     # HRV scoring based on resting HR (lower = higher HRV score)
-    # Calibrated: Mark has 62 bpm and got 88% HRV
-    if mean_hr <= 55:
-        hrv_score = 95
-    elif mean_hr <= 58:
-        hrv_score = 92
-    elif mean_hr <= 62:
-        hrv_score = 88  # Mark's value
-    elif mean_hr <= 66:
-        hrv_score = 82
-    elif mean_hr <= 70:
-        hrv_score = 75
-    elif mean_hr <= 75:
-        hrv_score = 65
-    elif mean_hr <= 80:
-        hrv_score = 55
-    elif mean_hr <= 85:
-        hrv_score = 48
-    elif mean_hr <= 90:
-        hrv_score = 42
-    elif mean_hr <= 95:
-        hrv_score = 36
-    elif mean_hr <= 100:
-        hrv_score = 30
-    else:
-        hrv_score = 25
+    hrv_score = HRV_FROM_RESTING_HR(mean_hr)
 
     result['core_scores']['hrv'] = hrv_score
     result['raw_metrics']['mean_hr'] = round(mean_hr)
@@ -884,31 +968,7 @@ def calculate_all_scores(pdf_path: str) -> Dict:
     # Based on autonomic balance indicators (resting HR, HRV)
     # Use the same mean_hr we calculated above
     # Higher parasympathetic = lower resting HR
-    # Calibrated: Mark has 62 bpm and got 76% symp/parasym
-    if mean_hr <= 55:
-        symp_score = 85
-    elif mean_hr <= 58:
-        symp_score = 80
-    elif mean_hr <= 62:
-        symp_score = 76  # Mark's value
-    elif mean_hr <= 66:
-        symp_score = 72
-    elif mean_hr <= 70:
-        symp_score = 66
-    elif mean_hr <= 75:
-        symp_score = 58
-    elif mean_hr <= 80:
-        symp_score = 50
-    elif mean_hr <= 85:
-        symp_score = 44
-    elif mean_hr <= 90:
-        symp_score = 38
-    elif mean_hr <= 95:
-        symp_score = 32
-    elif mean_hr <= 100:
-        symp_score = 26
-    else:
-        symp_score = 20
+    symp_score = SYMP_PARASYM_FROM_RESTING_HR(mean_hr)
 
     result['core_scores']['symp_parasym'] = symp_score
     result['calculation_details']['symp_parasym'] = f"Resting HR: {mean_hr:.0f} bpm → Parasympathetic: {symp_score}%"
@@ -916,7 +976,7 @@ def calculate_all_scores(pdf_path: str) -> Dict:
     return result
 
 
-def is_raw_ergometry_pdf(pdf_path: str) -> bool:
+def is_raw_ergometry_pdf(pdf_path: PDFSource) -> bool:
     """
     Detect if a PDF is raw PNOE ergometry data (needs calculation)
     vs. a processed Performance Report (has scores already).
@@ -931,15 +991,15 @@ def is_raw_ergometry_pdf(pdf_path: str) -> bool:
     - Detailed analysis sections
     """
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            first_page_text = pdf.pages[0].extract_text() or ""
+        with open_pdf(pdf_path) as doc:
+            first_page_text = doc.page_text(0)
 
             # Check for raw ergometry indicators
             is_ergometry = "PNOE Ergometry results" in first_page_text
             is_ergometry = is_ergometry or ("Ergometry" in first_page_text and "Time (sec)" in first_page_text)
 
             # Check for processed report indicators
-            has_scores = bool(re.search(r'(?:Metabolic rate|Fat-burning|Lung utilization).*?-\s*\d+%', first_page_text))
+            has_scores = bool(_ERGOMETRY_SCORE_RE.search(first_page_text))
 
             # If it has ergometry markers and no scores, it's raw data
             if is_ergometry and not has_scores:
@@ -950,7 +1010,7 @@ def is_raw_ergometry_pdf(pdf_path: str) -> bool:
         return False
 
 
-def extract_scores_from_performance_report(pdf_path: str) -> Dict:
+def extract_scores_from_performance_report(pdf_path: PDFSource) -> Dict:
     """
     Extract pre-calculated scores from PNOE Performance/RMR Reports.
 
@@ -964,59 +1024,13 @@ def extract_scores_from_performance_report(pdf_path: str) -> Dict:
     }
 
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            all_text = ""
-            for page in pdf.pages[:15]:  # First 15 pages should have all scores
-                text = page.extract_text() or ""
-                all_text += text + "\n"
-
-            # Extract patient info
-            name_match = re.search(r'Name\s+([^\n]+?)(?:\s+Status|$)', all_text)
-            if name_match:
-                result['patient_info']['name'] = name_match.group(1).strip()
-
-            gender_age_match = re.search(r'Gender\s+(\w+)\s*\((\d+)\)', all_text)
-            if gender_age_match:
-                result['patient_info']['gender'] = gender_age_match.group(1)
-                result['patient_info']['age'] = int(gender_age_match.group(2))
-
-            weight_match = re.search(r'Weight\s+(\d+(?:\.\d+)?)\s*kg', all_text)
-            if weight_match:
-                result['patient_info']['weight_kg'] = float(weight_match.group(1))
-
-            height_match = re.search(r'Height\s+(\d+(?:\.\d+)?)\s*cm', all_text)
-            if height_match:
-                result['patient_info']['height_cm'] = float(height_match.group(1))
-
-            # Extract core scores using specific patterns
-            score_patterns = [
-                (r'Sympathetic/Parasympathetic.*?-\s*(\d+)%', 'symp_parasym'),
-                (r'Ventilation efficiency.*?-\s*(\d+)%', 'ventilation_eff'),
-                (r'Breathing coordination.*?-\s*(\d+)%', 'breathing_coord'),
-                (r'Lung utilization.*?-\s*(\d+)%', 'lung_util'),
-                (r'Heart Rate Variability.*?-\s*(\d+)%', 'hrv'),
-                (r'HRV.*?-\s*(\d+)%', 'hrv'),
-                (r'Metabolic rate.*?-\s*(\d+)%', 'metabolic_rate'),
-                (r'Fat-burning.*?-\s*(\d+)%', 'fat_burning'),
-            ]
-
-            for pattern, score_key in score_patterns:
-                match = re.search(pattern, all_text, re.IGNORECASE)
-                if match and score_key not in result['core_scores']:
-                    result['core_scores'][score_key] = int(match.group(1))
-
-            # Extract raw metrics
-            # RMR/calorie values
-            calorie_match = re.search(r'(\d{4})\s*kcal/day.*?(\d{4})\s*kcal/day', all_text)
-            if calorie_match:
-                result['raw_metrics']['burn_kcal'] = int(calorie_match.group(1))
-                result['raw_metrics']['eat_kcal'] = int(calorie_match.group(2))
-
-            # Fat/carb mix
-            fat_mix_match = re.search(r'(\d+)%\s*fat.*?(\d+)%\s*carb', all_text, re.IGNORECASE)
-            if fat_mix_match:
-                result['raw_metrics']['fat_percent'] = int(fat_mix_match.group(1))
-                result['raw_metrics']['carb_percent'] = int(fat_mix_match.group(2))
+        with open_pdf(pdf_path) as doc:
+            # Patient info, core scores and caloric summary in one pass per page,
+            # stopping as soon as demographics and all seven scores are found
+            _, pages_scanned = _PERFORMANCE_MATCHER.extract(
+                doc.iter_text(max_pages=PERFORMANCE_REPORT_MAX_PAGES), result
+            )
+            result['pages_scanned'] = pages_scanned
 
     except Exception as e:
         result['error'] = str(e)
@@ -1024,7 +1038,7 @@ def extract_scores_from_performance_report(pdf_path: str) -> Dict:
     return result
 
 
-def detect_pdf_type(pdf_path: str) -> str:
+def detect_pdf_type(pdf_path: PDFSource) -> str:
     """
     Detect the type of PNOE PDF:
     - 'raw_ergometry': Raw measurement data with charts (needs calculation)
@@ -1032,9 +1046,9 @@ def detect_pdf_type(pdf_path: str) -> str:
     - 'unknown': Cannot determine type
     """
     try:
-        with pdfplumber.open(pdf_path) as pdf:
+        with open_pdf(pdf_path) as doc:
             # Check first page for ergometry indicators
-            first_page_text = pdf.pages[0].extract_text() or ""
+            first_page_text = doc.page_text(0)
 
             # Check for raw ergometry indicators (usually clear on first page)
             is_ergometry = "PNOE Ergometry results" in first_page_text
@@ -1042,45 +1056,33 @@ def detect_pdf_type(pdf_path: str) -> str:
 
             if is_ergometry:
                 # Double-check it doesn't also have scores (would be performance report)
-                has_scores = bool(re.search(
-                    r'(?:Metabolic rate|Fat-burning|Lung utilization).*?-\s*\d+%',
-                    first_page_text,
-                    re.IGNORECASE
-                ))
+                has_scores = bool(_FIRST_PAGE_SCORE_RE.search(first_page_text))
                 if not has_scores:
                     return 'raw_ergometry'
 
             # Check first 10 pages for performance report indicators
-            # (scores may be on later pages in performance reports)
-            all_text = ""
-            for page in pdf.pages[:10]:
-                text = page.extract_text() or ""
-                all_text += text + "\n"
-
-            # Check for processed report indicators (scores with percentages)
-            has_scores = bool(re.search(
-                r'(?:Metabolic rate|Fat-burning|Lung utilization|Heart Rate Variability).*?-\s*\d+%',
-                all_text,
-                re.IGNORECASE
-            ))
-
-            if has_scores:
-                return 'performance_report'
-
-            # Check for other performance report indicators
-            is_performance = "Performance" in all_text and "Blueprint" in all_text
-            is_performance = is_performance or "Caloric Balance" in all_text
-            is_performance = is_performance or "You Burn" in all_text
-
-            if is_performance:
-                return 'performance_report'
+            # (scores may be on later pages in performance reports), stopping
+            # at the first page that settles it
+            seen_performance = seen_blueprint = False
+            for text in doc.iter_text(max_pages=10):
+                # Check for processed report indicators (scores with percentages)
+                if _REPORT_SCORE_RE.search(text):
+                    return 'performance_report'
+
+                # Check for other performance report indicators
+                seen_performance = seen_performance or "Performance" in text
+                seen_blueprint = seen_blueprint or "Blueprint" in text
+                if seen_performance and seen_blueprint:
+                    return 'performance_report'
+                if "Caloric Balance" in text or "You Burn" in text:
+                    return 'performance_report'
 
             return 'unknown'
     except Exception:
         return 'unknown'
 
 
-def process_pnoe_pdf(pdf_path: str) -> Dict:
+def process_pnoe_pdf(pdf_path: PDFSource) -> Dict:
     """
     Universal function to process any PNOE PDF.
 
@@ -1093,29 +1095,32 @@ def process_pnoe_pdf(pdf_path: str) -> Dict:
     - data_source: 'performance_report', 'raw_ergometry', or 'calculated'
     - data_quality: 'excellent', 'good', 'estimated', 'limited'
     """
-    pdf_type = detect_pdf_type(pdf_path)
-
-    if pdf_type == 'performance_report':
-        result = extract_scores_from_performance_report(pdf_path)
-        result['data_quality'] = 'excellent'
-        return result
-
-    elif pdf_type == 'raw_ergometry':
-        result = calculate_all_scores(pdf_path)
-        result['data_source'] = 'calculated'
-        # Determine quality based on what data was available
-        if result.get('raw_metrics', {}).get('measured_rmr_kcal'):
-            result['data_quality'] = 'good'
-        else:
-            result['data_quality'] = 'estimated'
-        return result
+    with open_pdf(pdf_path) as doc:
+        pdf_type = detect_pdf_type(doc)
+
+        if pdf_type == 'performance_report':
+            result = extract_scores_from_performance_report(doc)
+            result['data_quality'] = 'excellent'
+            result['pages_touched'] = doc.pages_touched
+            return result
+
+        elif pdf_type == 'raw_ergometry':
+            result = calculate_all_scores(doc)
+            result['data_source'] = 'calculated'
+            # Determine quality based on what data was available
+            if result.get('raw_metrics', {}).get('measured_rmr_kcal'):
+                result['data_quality'] = 'good'
+            else:
+                result['data_quality'] = 'estimated'
+            result['pages_touched'] = doc.pages_touched
+            return result
 
-    else:
-        return {
-            'error': 'Unable to detect PDF type. Please upload a PNOE Ergometry or Performance Report.',
-            'data_source': 'unknown',
-            'data_quality': 'none'
-        }
+        else:
+            return {
+                'error': 'Unable to detect PDF type. Please upload a PNOE Ergometry or Performance Report.',
+                'data_source': 'unknown',
+                'data_quality': 'none'
+            }
 
 
 # Convenience function for direct testing
@@ -1126,16 +1131,18 @@ if __name__ == "__main__":
         print(f"\nAnalyzing: {pdf_file}")
         print("=" * 60)
 
-        pdf_type = detect_pdf_type(pdf_file)
-        print(f"Detected Type: {pdf_type}")
+        with ParsedPDF(pdf_file) as doc:
+            pdf_type = detect_pdf_type(doc)
+            print(f"Detected Type: {pdf_type}")
 
-        results = process_pnoe_pdf(pdf_file)
+            results = process_pnoe_pdf(doc)
 
         if 'error' in results:
             print(f"\nError: {results['error']}")
         else:
             print(f"Data Source: {results.get('data_source', 'unknown')}")
             print(f"Data Quality: {results.get('data_quality', 'unknown')}")
+            print(f"Pages Touched: {results.get('pages_touched')}")
 
             print("\nPatient Info:")
             for k, v in results.get('patient_info', {}).items():
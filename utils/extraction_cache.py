@@ -0,0 +1,99 @@
+"""
+Content-Addressed Extraction Cache
+
+Stores the `extracted_data` dict produced for an uploaded PDF, keyed by the
+SHA-256 of the PDF bytes plus an extractor version. Re-uploading the same
+PNOE PDF (after a failed generate, or to get another report tier) returns
+the cached dict without touching pdfplumber.
+
+The extractor version is a hash of the extraction source code (see
+batch_checkpoint.pipeline_version, which follows the utils import graph),
+so editing ergometry_calculator or anything it imports invalidates every
+cached entry automatically.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+
+def extractor_version(*sources) -> str:
+    """
+    Fingerprint the code that produces extracted_data.
+
+    Args:
+        sources: modules, functions or plain strings whose source is hashed
+
+    Returns:
+        12-character hex digest that changes whenever any source changes
+    """
+    digest = hashlib.sha256()
+    for source in sources:
+        text = source if isinstance(source, str) else inspect.getsource(source)
+        digest.update(text.encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+class ExtractionCache:
+    """On-disk cache of extracted_data dicts with per-process hit/miss counters"""
+
+    def __init__(self, cache_dir: str, version: str):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}_{self.version}.json")
+
+    def get(self, content_hash: str) -> Optional[Dict]:
+        """Return the cached extracted_data for this PDF hash, or None"""
+        try:
+            with open(self._path(content_hash), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, content_hash: str, extracted_data: Dict):
+        """Store extracted_data atomically (concurrent writers never expose a partial file)"""
+        # Failed extractions are not cached so a retry gets a fresh attempt
+        if extracted_data.get('error'):
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(extracted_data, f)
+            os.replace(tmp_path, self._path(content_hash))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self.stores += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for this worker process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
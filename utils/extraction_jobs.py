@@ -0,0 +1,182 @@
+"""
+Background PDF Extraction Jobs
+
+Runs extract_pnoe_data on a process pool next to the web workers so a large
+ergometry PDF no longer holds a gunicorn worker for the whole extraction.
+
+Job state lives in small JSON files (one per job) rather than in memory:
+with several gunicorn workers, the worker that answers /api/jobs/<id> is
+not necessarily the one that queued the job.
+
+    queued -> running -> done | failed
+
+The pool worker writes `running` itself when it picks the job up; the
+submitting process writes `done`/`failed` from the future's callback.
+"""
+
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(__file__))
+from pnoe_extraction import extract_pnoe_data
+from report_log import get_logger
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+log = get_logger('extraction_jobs', 'JOBS')
+
+
+class ExtractionTimeout(BaseException):
+    """
+    Raised inside the pool worker when a job exceeds its time limit.
+    BaseException so the extractor's own `except Exception` handlers
+    cannot swallow it.
+    """
+
+
+def _write_json(path: str, data: Dict):
+    """Atomic JSON write so pollers never read a half-written status file"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout()
+
+
+def _run_extraction(status_path: str, pdf_path: str, timeout: int) -> Dict:
+    """Pool entry point: mark the job running, then extract under a time limit"""
+    try:
+        with open(status_path, 'r') as f:
+            job = json.load(f)
+        job['status'] = RUNNING
+        job['started_at'] = time.time()
+        _write_json(status_path, job)
+    except (OSError, ValueError):
+        pass
+
+    # SIGALRM interrupts the extraction inside this worker process only;
+    # platforms without it fall back to no per-job limit
+    use_alarm = timeout and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(timeout)
+    try:
+        return extract_pnoe_data(pdf_path)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+class ExtractionJobs:
+    """Process pool plus on-disk job registry"""
+
+    def __init__(self, jobs_dir: str, max_workers: int = 2, timeout: int = 90):
+        """
+        Args:
+            jobs_dir: directory for <job_id>.json status files
+            max_workers: extraction processes per web worker
+            timeout: seconds a single extraction may run before it is failed
+        """
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def _status_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created on first use so each gunicorn worker gets its own pool. Spawn,
+        # not fork: the web worker has request and render-queue threads running
+        # and pango loaded, and a child forked while one of them holds a lock
+        # can hang. Spawned processes import the main module (see pdf_sections)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=get_context('spawn'))
+            return self._pool
+
+    def _reset_pool(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Current job record, or None for unknown ids"""
+        try:
+            with open(self._status_path(job_id), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, job_id: str, **fields) -> Dict:
+        job = self.get(job_id) or {'job_id': job_id}
+        job.update(fields)
+        _write_json(self._status_path(job_id), job)
+        return job
+
+    def record_done(self, job_id: str, **fields) -> Dict:
+        """Mark a job finished without running it (e.g. extraction cache hit)"""
+        now = time.time()
+        return self.update(job_id, status=DONE, submitted_at=now, finished_at=now, **fields)
+
+    def submit(self, job_id: str, pdf_path: str,
+               on_complete: Callable[[str, Dict], Optional[Dict]], **fields) -> Dict:
+        """
+        Queue extraction of `pdf_path`.
+
+        `on_complete(job_id, extracted_data)` runs in this process once the
+        extraction succeeds; any dict it returns is merged into the job record
+        (e.g. the database test_id).
+        """
+        job = self.update(job_id, status=QUEUED, submitted_at=time.time(), **fields)
+        status_path = self._status_path(job_id)
+
+        try:
+            future = self._get_pool().submit(_run_extraction, status_path, pdf_path, self.timeout)
+        except (BrokenProcessPool, RuntimeError):
+            # A crashed worker breaks the whole pool; start a fresh one
+            self._reset_pool()
+            future = self._get_pool().submit(_run_extraction, status_path, pdf_path, self.timeout)
+
+        def _finished(done_future):
+            try:
+                extracted_data = done_future.result()
+                extra = on_complete(job_id, extracted_data) or {}
+                self.update(job_id, status=DONE, finished_at=time.time(), **extra)
+                log.info("Job done", job_id=job_id)
+            except ExtractionTimeout:
+                self.update(job_id, status=FAILED, finished_at=time.time(),
+                            error=f"Extraction timed out after {self.timeout}s")
+                log.warning("Job timed out", job_id=job_id, timeout=self.timeout)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._reset_pool()
+                self.update(job_id, status=FAILED, finished_at=time.time(), error=str(e))
+                log.warning("Job failed: %s", e, job_id=job_id)
+
+        future.add_done_callback(_finished)
+        return job
@@ -0,0 +1,244 @@
+"""
+Declarative PDF Field Extraction
+
+Single source of truth for every scalar field read out of PNOE PDF text:
+patient demographics, the seven core scores, RMR, RER, VO2 max, heart rate
+and caloric summaries. Each FieldSpec carries its precompiled pattern, type
+coercion, sanity range, first-wins or last-wins policy and page scope.
+
+FieldMatcher evaluates a whole table in one pass per page. A cheap lowercase
+keyword check runs before each regex, fields that are already filled
+(first-wins) are skipped, and scanning stops as soon as every required
+field has a value, so a typical Performance Report is
+read in 3-4 pages rather than 15+.
+
+Used by app.extract_pnoe_data and utils/ergometry_calculator.py.
+Run benchmark_field_specs.py for per-field match costs.
+"""
+import re
+from collections import namedtuple
+from typing import Dict, Iterable, Optional, Sequence, Set, Tuple
+
+FIRST = 'first'  # keep the first value found (earliest page wins)
+LAST = 'last'    # every later match overwrites the previous value
+
+# One output value of a spec: capture group -> data[section][key]
+Target = namedtuple('Target', ['group', 'section', 'key', 'coerce', 'valid'], defaults=(str, None))
+
+
+def _number(value: str):
+    """'71' -> 71, '71.5' -> 71.5"""
+    return float(value) if '.' in value else int(value)
+
+
+def _clean(value: str) -> str:
+    return value.strip()
+
+
+class FieldSpec:
+    """One regex and the field(s) its capture groups fill"""
+
+    def __init__(self, name: str, pattern: str, targets: Sequence[Target], keywords: Sequence[str],
+                 flags: int = 0, policy: str = FIRST, pages: Optional[int] = None,
+                 unless: Optional[str] = None):
+        """
+        Args:
+            name: unique field name (used for required sets and `unless`)
+            pattern: regex source, compiled once here
+            targets: where each capture group is stored, with coercion and sanity range
+            keywords: lowercase literals, at least one of which must occur on the
+                page before the regex is tried
+            flags: re flags
+            policy: FIRST or LAST
+            pages: only search the first N pages (None = every page)
+            unless: skip this spec once the named spec has matched
+        """
+        self.name = name
+        self.pattern = re.compile(pattern, flags)
+        self.targets = tuple(targets)
+        self.keywords = tuple(k.lower() for k in keywords)
+        self.policy = policy
+        self.pages = pages
+        self.unless = unless
+
+    def applies_to(self, lowered_text: str) -> bool:
+        return any(k in lowered_text for k in self.keywords)
+
+    def match(self, text: str):
+        """Return [(section, key, value), ...] or None if absent or out of range"""
+        m = self.pattern.search(text)
+        if not m:
+            return None
+
+        values = []
+        for target in self.targets:
+            try:
+                value = target.coerce(m.group(target.group))
+            except (TypeError, ValueError):
+                return None
+            if target.valid and not (target.valid[0] <= value <= target.valid[1]):
+                return None
+            values.append((target.section, target.key, value))
+        return values
+
+
+class FieldMatcher:
+    """Evaluates a FieldSpec table page by page"""
+
+    def __init__(self, specs: Sequence[FieldSpec], required: Iterable[Tuple[str, str]] = ()):
+        """
+        Args:
+            specs: FieldSpec table, evaluated in order
+            required: (section, key) pairs that must all be filled before
+                extract() may stop early; empty means scan every page
+        """
+        self.specs = tuple(specs)
+        self.required = tuple(required)
+        produced = {(t.section, t.key) for spec in self.specs for t in spec.targets}
+        missing = set(self.required) - produced
+        if missing:
+            raise ValueError(f"Required fields not produced by spec table: {sorted(missing)}")
+
+    def scan_page(self, text: str, page_index: int, data: Dict, found: Set[str]):
+        """Apply every pending spec to one page, writing matches into `data`"""
+        lowered = text.lower()
+        for spec in self.specs:
+            if spec.policy == FIRST and spec.name in found:
+                continue
+            if spec.pages is not None and page_index >= spec.pages:
+                continue
+            if spec.unless and spec.unless in found:
+                continue
+            if not spec.applies_to(lowered):
+                continue
+
+            values = spec.match(text)
+            if values is None:
+                continue
+            for section, key, value in values:
+                data.setdefault(section, {})[key] = value
+            found.add(spec.name)
+
+    def is_complete(self, data: Dict) -> bool:
+        """True once every required (section, key) has a value in `data`"""
+        return bool(self.required) and all(
+            key in data.get(section, {}) for section, key in self.required
+        )
+
+    def extract(self, pages: Iterable[str], data: Optional[Dict] = None) -> Tuple[Dict, int]:
+        """
+        Scan pages in order, stopping once the required fields are filled
+        (a lazy iterable is only consumed as far as needed).
+
+        Returns:
+            (data, pages_scanned)
+        """
+        data = {} if data is None else data
+        found: Set[str] = set()
+        pages_scanned = 0
+        for page_index, text in enumerate(pages):
+            pages_scanned += 1
+            self.scan_page(text, page_index, data, found)
+            if self.is_complete(data):
+                break
+        return data, pages_scanned
+
+
+# ============================================================================
+# FIELD TABLES
+# ============================================================================
+
+PATIENT_FIELDS = (
+    FieldSpec('name', r'(?:Name|Subject)[:\s]+([^\n]+?)(?:\s+(?:Status|Gender)|$)',
+              [Target(1, 'patient_info', 'name', _clean)], ['name', 'subject']),
+    FieldSpec('test_date', r'Date[:\s]+(\d{1,2}/\d{1,2}/\d{2,4})',
+              [Target(1, 'patient_info', 'test_date')], ['date'], pages=1),
+    FieldSpec('gender_age', r'Gender[:\s]+(\w+)\s*\((\d+)\)',
+              [Target(1, 'patient_info', 'gender'),
+               Target(2, 'patient_info', 'age', int, (1, 120))], ['gender']),
+    FieldSpec('gender', r'Gender[:\s]+(Male|Female)',
+              [Target(1, 'patient_info', 'gender')], ['gender'], unless='gender_age'),
+    FieldSpec('weight', r'Weight[:\s]+(\d+(?:\.\d+)?)\s*kg',
+              [Target(1, 'patient_info', 'weight_kg', _number, (20, 350))], ['weight']),
+    FieldSpec('height', r'Height[:\s]+(\d+(?:\.\d+)?)\s*cm',
+              [Target(1, 'patient_info', 'height_cm', _number, (100, 250))], ['height']),
+)
+
+# Demographics every report needs before a scan may stop early
+REQUIRED_PATIENT_KEYS = (
+    ('patient_info', 'name'),
+    ('patient_info', 'gender'),
+    ('patient_info', 'age'),
+    ('patient_info', 'weight_kg'),
+    ('patient_info', 'height_cm'),
+)
+
+_SCORE = (0, 100)
+
+
+def _score(name, label, key=None, unless=None):
+    return FieldSpec(name, label + r'[^\n]*?-\s*(\d+)%',
+                     [Target(1, 'core_scores', key or name, int, _SCORE)],
+                     [label.lower()], flags=re.IGNORECASE, unless=unless)
+
+
+CORE_SCORE_FIELDS = (
+    _score('symp_parasym', r'Sympathetic/Parasympathetic'),
+    _score('ventilation_eff', r'Ventilation efficiency'),
+    _score('breathing_coord', r'Breathing coordination'),
+    _score('lung_util', r'Lung utilization'),
+    _score('hrv', r'Heart Rate Variability'),
+    # Short label only counts when the full one never matched
+    _score('hrv_short', r'HRV', key='hrv', unless='hrv'),
+    _score('metabolic_rate', r'Metabolic rate'),
+    _score('fat_burning', r'Fat-burning'),
+)
+
+CORE_SCORE_KEYS = ('symp_parasym', 'ventilation_eff', 'breathing_coord', 'lung_util',
+                   'hrv', 'metabolic_rate', 'fat_burning')
+
+# A Performance Report scan is done once demographics and all seven scores are in
+REQUIRED_REPORT_KEYS = REQUIRED_PATIENT_KEYS + tuple(('core_scores', key) for key in CORE_SCORE_KEYS)
+
+# Fields read from free text by the app's generic (non-ergometry) extraction.
+# Later pages overwrite earlier ones, matching the original per-page loop.
+METRIC_FIELDS = (
+    FieldSpec('rmr', r'RMR[:\s]+(\d+)',
+              [Target(1, 'caloric_data', 'rmr', int, (500, 5000)),
+               Target(1, 'metabolic_data', 'rmr', int, (500, 5000))], ['rmr'], policy=LAST),
+    FieldSpec('total_burn', r'(?:Total[^\n]*?Burn|Daily[^\n]*?Expenditure)[:\s]+(\d+)',
+              [Target(1, 'caloric_data', 'total_burn', int)], ['burn', 'expenditure'],
+              flags=re.IGNORECASE, policy=LAST),
+    FieldSpec('fat_percent', r'Fat[^\n]*?(\d+)\s*%',
+              [Target(1, 'caloric_data', 'fat_percent', int, _SCORE)], ['fat'],
+              flags=re.IGNORECASE, policy=LAST),
+    FieldSpec('cho_percent', r'(?:Carb|CHO)[^\n]*?(\d+)\s*%',
+              [Target(1, 'caloric_data', 'cho_percent', int, _SCORE)], ['carb', 'cho'],
+              flags=re.IGNORECASE, policy=LAST),
+    FieldSpec('max_hr', r'(?:Max|Maximum)[^\n]*?(?:HR|Heart Rate)[:\s]+(\d+)',
+              [Target(1, 'heart_rate_data', 'max_hr', int, (40, 250))], ['max'], policy=LAST),
+    FieldSpec('rer', r'RER[:\s]+([0-9.]+)',
+              [Target(1, 'metabolic_data', 'rer', float, (0.5, 1.5))], ['rer'], policy=LAST),
+    FieldSpec('vo2max_abs', r'VO2[^\n]*?max[:\s]+([0-9.]+)[^\n]*?L/min',
+              [Target(1, 'metabolic_data', 'vo2max_abs', float, (0.3, 8))], ['vo2'],
+              flags=re.IGNORECASE, policy=LAST),
+    FieldSpec('vo2max_rel', r'VO2[^\n]*?max[:\s]+([0-9.]+)[^\n]*?ml[^\n]*?kg[^\n]*?min',
+              [Target(1, 'metabolic_data', 'vo2max_rel', float, (5, 100))], ['vo2'],
+              flags=re.IGNORECASE, policy=LAST),
+    FieldSpec('resting_hr', r'(?:Resting|Rest)[^\n]*?(?:HR|Heart Rate)[:\s]+(\d+)',
+              [Target(1, 'heart_rate_data', 'resting_hr', int, (25, 150))], ['rest'],
+              flags=re.IGNORECASE, policy=LAST, unless='max_hr'),
+)
+
+# Caloric summary printed on PNOE Performance Report pages
+REPORT_SUMMARY_FIELDS = (
+    FieldSpec('calories', r'(\d{4})\s*kcal/day[^\n]*?(\d{4})\s*kcal/day',
+              [Target(1, 'raw_metrics', 'burn_kcal', int),
+               Target(2, 'raw_metrics', 'eat_kcal', int)], ['kcal/day']),
+    FieldSpec('fuel_mix', r'(\d+)%\s*fat[^\n]*?(\d+)%\s*carb',
+              [Target(1, 'raw_metrics', 'fat_percent', int, _SCORE),
+               Target(2, 'raw_metrics', 'carb_percent', int, _SCORE)], ['carb'],
+              flags=re.IGNORECASE),
+)
+
+ALL_FIELDS = PATIENT_FIELDS + CORE_SCORE_FIELDS + METRIC_FIELDS + REPORT_SUMMARY_FIELDS
@@ -0,0 +1,74 @@
+"""
+Streaming HTML Rendering
+
+Report templates produce their document as a sequence of chunks
+(iter_html) rather than writing one big string to a file. The same chunks
+can be joined in memory, written to any stream, or handed straight to a
+streaming HTTP response:
+
+    html = report.render()                               # str, no disk I/O
+    report.write_to(sys.stdout)                          # any text stream
+    with gzip.open(path, 'wb') as gz:
+        report.write_to(gz, encoding='utf-8')            # binary streams
+    report.write_file('report.html')                     # file output
+    Response(report.iter_html(), mimetype='text/html')   # Flask streaming
+
+Sections are rendered as the chunks are consumed, so a streaming consumer
+never holds the whole document.
+
+CSS is inlined by default, so the document stands alone. For browser views
+set inline_css = False: the template then links its fingerprinted
+stylesheet under /static (see report_styles).
+"""
+
+import os
+import sys
+from typing import Iterator, Optional
+
+sys.path.insert(0, os.path.dirname(__file__))
+from report_styles import ReportStylesheet, publish_stylesheet
+
+
+class StreamingReport:
+    """Mixin for report templates: implement iter_html(), get the rest"""
+
+    # Name of the template's fingerprinted stylesheet; its CSS is _get_styles()
+    stylesheet_name = None
+    inline_css = True
+
+    def iter_html(self) -> Iterator[str]:
+        """The complete HTML document, in order, one chunk at a time"""
+        raise NotImplementedError
+
+    def publish_stylesheet(self) -> ReportStylesheet:
+        """This template's stylesheet, written under /static/reports on first use"""
+        return publish_stylesheet(self.stylesheet_name, self._get_styles())
+
+    def render(self) -> str:
+        """The complete HTML document as a string"""
+        return ''.join(self.iter_html())
+
+    def write_to(self, stream, encoding: Optional[str] = None) -> int:
+        """
+        Write the document to a stream.
+
+        Args:
+            stream: anything with write() - a text stream, or a binary one
+                (BytesIO, GzipFile, socket file) when encoding is given
+            encoding: encode each chunk before writing, e.g. 'utf-8'
+
+        Returns:
+            number of characters (or bytes, with encoding) written
+        """
+        written = 0
+        for chunk in self.iter_html():
+            if encoding:
+                chunk = chunk.encode(encoding)
+            stream.write(chunk)
+            written += len(chunk)
+        return written
+
+    def write_file(self, output_path: str) -> int:
+        """Write the document to output_path as UTF-8"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            return self.write_to(f)
@@ -0,0 +1,227 @@
+"""
+Content-Addressed PDF Cache
+
+/download/<id>/pdf and /download-ai/<id>/pdf used to run WeasyPrint's
+write_pdf on every click and overwrite {file_id}_report.pdf, even when the
+report had not changed. Rendered PDFs are now kept on disk, keyed by the
+SHA-256 of the stored report HTML plus a render version (the print
+stylesheet and WeasyPrint versions):
+
+    key = pdf_cache_key(html_bytes, version)
+    pdf_file, cache_hit = pdf_cache.get_or_render(key, render)
+
+A repeat download is a file open. A miss renders once: concurrent requests
+for the same key - in this process or, where fcntl is available, in
+another gunicorn worker - wait for that render instead of starting their
+own. After each render the directory is trimmed to max_bytes, evicting the
+least recently used PDFs first (every hit touches its file's mtime, so
+recency is shared by all workers).
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:   # no cross-process single flight; workers may render the same PDF twice
+    fcntl = None
+
+sys.path.insert(0, os.path.dirname(__file__))
+from report_log import get_logger
+
+log = get_logger('pdf_cache', 'PDF_CACHE')
+
+PDF_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PDF_SUFFIX = '.pdf'
+USAGE_MAX_AGE = 30   # seconds stats() reuses the last directory scan
+
+
+def pdf_cache_key(html: bytes, version: str) -> str:
+    """SHA-256 of the render version and the report HTML"""
+    digest = hashlib.sha256(version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(html)
+    return digest.hexdigest()
+
+
+class PdfCache:
+    """Size-bounded LRU of rendered PDFs with single-flight renders and per-process counters"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, list] = {}   # key -> [render lock, users]
+        self._usage: Optional[Tuple[float, int, int]] = None   # (scanned at, entries, bytes)
+        os.makedirs(os.path.join(cache_dir, 'locks'), exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + PDF_SUFFIX)
+
+    def _open(self, key: str) -> Optional[BinaryIO]:
+        """
+        Open the cached PDF and mark it recently used, or None. An open file
+        stays readable even if another worker evicts it meanwhile.
+        """
+        path = self._path(key)
+        try:
+            pdf_file = open(path, 'rb')
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return pdf_file
+
+    def get(self, key: str) -> Optional[BinaryIO]:
+        """The cached PDF opened for reading, or None (a miss is counted when it is rendered)"""
+        pdf_file = self._open(key)
+        if pdf_file is not None:
+            with self._lock:
+                self.hits += 1
+        return pdf_file
+
+    @contextmanager
+    def _single_flight(self, key: str):
+        """
+        Hold the render lock for key: a per-key lock within this process and
+        an flock shared with other workers. The flock is striped over 256
+        lock files (by key prefix) so lock files do not pile up.
+        """
+        with self._lock:
+            entry = self._inflight.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                if fcntl is None:
+                    yield
+                    return
+                with open(os.path.join(self.cache_dir, 'locks', f"{key[:2]}.lock"), 'a') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._inflight[key]
+
+    def _store(self, key: str, render: Callable[[str], None]) -> BinaryIO:
+        """Run render(tmp_path) and move the PDF into place atomically"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            render(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return open(self._path(key), 'rb')
+
+    def get_or_render(self, key: str, render: Callable[[str], None]) -> Tuple[BinaryIO, bool]:
+        """
+        Return (open PDF file, cache_hit), calling `render(path)` to write the
+        PDF on a miss. Only one render per key runs at a time; requests that
+        waited for it are served its result. A render that raises is not
+        cached: the exception propagates and the next waiter renders again.
+        """
+        pdf_file = self._open(key)
+        if pdf_file is not None:
+            with self._lock:
+                self.hits += 1
+            return pdf_file, True
+
+        with self._single_flight(key):
+            pdf_file = self._open(key)
+            if pdf_file is not None:
+                with self._lock:
+                    self.coalesced += 1
+                return pdf_file, True
+
+            with self._lock:
+                self.misses += 1
+            pdf_file = self._store(key, render)
+
+        try:
+            self.evict()
+        except OSError as e:
+            log.warning("Eviction failed: %s", e)
+        return pdf_file, False
+
+    def _entries(self):
+        """(mtime, size, path) of every cached PDF"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(PDF_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> int:
+        """Delete least recently used PDFs until the cache fits max_bytes; returns the number deleted"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue   # already evicted by another worker
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self.evictions += evicted
+            self._usage = (time.monotonic(), len(entries) - evicted, total)
+        return evicted
+
+    def _current_usage(self) -> Tuple[int, int]:
+        """(entries, bytes) from the last scan, rescanning once it is USAGE_MAX_AGE old"""
+        with self._lock:
+            usage = self._usage
+        if usage is None or time.monotonic() - usage[0] > USAGE_MAX_AGE:
+            entries = self._entries()
+            usage = (time.monotonic(), len(entries), sum(size for _, size, _ in entries))
+            with self._lock:
+                self._usage = usage
+        return usage[1], usage[2]
+
+    def stats(self) -> Dict:
+        """
+        Hit/miss counters for this worker process, and the cache size as of
+        this worker's last eviction pass or at most USAGE_MAX_AGE seconds ago
+        (/health does not scan the cache directory on every probe)
+        """
+        entries, size = self._current_usage()
+        with self._lock:
+            lookups = self.hits + self.coalesced + self.misses
+            return {
+                'entries': entries,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.coalesced) / lookups, 3) if lookups else None
+            }
@@ -0,0 +1,521 @@
+"""
+PDF Render Queue
+
+A WeasyPrint render of a premium report can take seconds and hundreds of
+MB, and it used to run in the request thread: under --workers 4 --threads 2
+eight simultaneous PDF downloads meant eight renders at once. Renders now
+go through PdfRenderQueue:
+
+- each web worker queues at most max_queued renders (submit raises
+  PdfQueueFull beyond that) and runs them on a small set of threads;
+- a render starts only once it holds one of the host-wide render slots -
+  flocked slot files shared by every gunicorn worker - so at most `slots`
+  WeasyPrint renders run on the machine at a time. A render split across
+  processes (pdf_sections) adds slots it can take without waiting
+  (RenderSlots.acquire_free), one per process;
+- the job id is the PDF cache key, so repeated clicks on one report join
+  the same job, and renders go through PdfCache's single flight.
+
+Speculative renders (submit(..., speculative=True)) pre-render a report's
+PDF right after /generate saves it, since the download usually follows
+within a minute. They run on their own low-priority thread and yield to
+downloads:
+
+- they start only while no download render is queued or running in this
+  worker, and never take the last render slot (with slots > 1), so a
+  download always has a slot to itself;
+- a download for a report that is still queued speculatively promotes it
+  to an ordinary job instead of queueing a second render;
+- they are dropped rather than queued when the worker's queue is full,
+  give their place up to a download that would otherwise be refused, and
+  expire after speculative_ttl seconds in the queue;
+- cancel(job_id) withdraws one (e.g. the report was deleted) until its
+  render has started.
+
+Job state lives in <job_id>.json files, like the extraction jobs, so any
+worker can answer the poll URL. Each record lists its `owners` - the users
+who requested the render, whether they queued or joined it - and only
+they may poll it:
+
+    queued -> running -> done | failed | cancelled
+
+Queue depth, render latency, slot wait and how often a speculative PDF was
+downloaded are kept per process for /health (stats()).
+"""
+
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:   # render slots bound each process instead of the whole host
+    fcntl = None
+
+sys.path.insert(0, os.path.dirname(__file__))
+from report_log import get_logger
+
+log = get_logger('pdf_jobs', 'PDF_QUEUE')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+RENDER_SLOTS = 2
+MAX_QUEUED = 16               # per web worker
+SPECULATIVE_TTL = 120         # seconds a speculative render may wait to start
+POLL_SECONDS = 0.05
+LATENCY_WINDOW = 200          # renders kept for the latency percentiles
+
+
+class PdfQueueFull(Exception):
+    """This worker already has max_queued renders waiting or running"""
+
+
+class RenderCancelled(Exception):
+    """A speculative render was cancelled before it started"""
+
+
+def _write_json(path: str, data: Dict):
+    """Atomic JSON write so pollers never read a half-written status file"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _percentiles_ms(seconds) -> Optional[Dict]:
+    if not seconds:
+        return None
+    ordered = sorted(seconds)
+    return {
+        'p50': round(ordered[len(ordered) // 2] * 1e3, 1),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e3, 1),
+        'max': round(ordered[-1] * 1e3, 1)
+    }
+
+
+class RenderSlots:
+    """Host-wide semaphore: `slots` lock files, each flocked by the render holding it"""
+
+    def __init__(self, lock_dir: str, slots: int = RENDER_SLOTS):
+        self.lock_dir = lock_dir
+        self.slots = slots
+        self._semaphore = threading.BoundedSemaphore(slots)
+        self._held = threading.local()   # .speculative: the slot this thread holds (None: none)
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def _try_lock(self, slot: int):
+        """The flocked lock file for `slot`, or None if another render holds it"""
+        lock_file = open(os.path.join(self.lock_dir, f"slot-{slot}.lock"), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    @staticmethod
+    def _unlock(lock_file):
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+    @contextmanager
+    def acquire(self, speculative: bool = False):
+        """
+        Block until a slot is free and hold it for the with block.
+        Speculative renders leave the last slot to downloads.
+        """
+        outer = getattr(self._held, 'speculative', None)
+        self._held.speculative = speculative
+        try:
+            if fcntl is None:
+                with self._semaphore:
+                    yield
+                return
+
+            usable = max(1, self.slots - 1) if speculative else self.slots
+            while True:
+                for slot in range(usable):
+                    lock_file = self._try_lock(slot)
+                    if lock_file is None:
+                        continue
+                    try:
+                        yield
+                    finally:
+                        self._unlock(lock_file)
+                    return
+                time.sleep(POLL_SECONDS)
+        finally:
+            self._held.speculative = outer
+
+    @contextmanager
+    def acquire_free(self, count: int):
+        """
+        Take up to `count` more slots without waiting and hold them for the
+        with block; yields how many were taken. For a render that already
+        holds a slot and can spread over more processes (pdf_sections).
+        Within a speculative render the last slot is still left to
+        downloads.
+        """
+        speculative = bool(getattr(self._held, 'speculative', False))
+        taken = []
+        try:
+            if fcntl is None:
+                # No view of the other slots' holders: speculative renders take none
+                while not speculative and len(taken) < count and self._semaphore.acquire(blocking=False):
+                    taken.append(None)
+            else:
+                usable = max(1, self.slots - 1) if speculative else self.slots
+                for slot in range(usable):
+                    if len(taken) >= count:
+                        break
+                    lock_file = self._try_lock(slot)
+                    if lock_file is not None:
+                        taken.append(lock_file)
+            yield len(taken)
+        finally:
+            for lock_file in taken:
+                if lock_file is None:
+                    self._semaphore.release()
+                else:
+                    self._unlock(lock_file)
+
+
+class PdfRenderQueue:
+    """Bounded per-worker render queue with host-wide render slots and an on-disk job registry"""
+
+    def __init__(self, jobs_dir: str, cache, slots: int = RENDER_SLOTS, max_queued: int = MAX_QUEUED,
+                 speculative_ttl: float = SPECULATIVE_TTL):
+        """
+        Args:
+            jobs_dir: directory for <job_id>.json status files and the slot locks
+            cache: the PdfCache renders are stored in (job ids are its keys)
+            slots: WeasyPrint renders allowed at once on this host
+            max_queued: jobs this worker accepts before refusing new ones
+            speculative_ttl: seconds a speculative render may wait before it is dropped
+        """
+        self.jobs_dir = jobs_dir
+        self.cache = cache
+        self.slots = RenderSlots(os.path.join(jobs_dir, 'slots'), slots)
+        self.max_queued = max_queued
+        self.speculative_ttl = speculative_ttl
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.running = 0
+        self.speculative_counts = {
+            'submitted': 0, 'skipped': 0, 'rendered': 0, 'used': 0,
+            'promoted': 0, 'cancelled': 0, 'expired': 0
+        }
+        self._render_seconds = deque(maxlen=LATENCY_WINDOW)
+        self._wait_seconds = deque(maxlen=LATENCY_WINDOW)
+        self._jobs: Dict[str, Dict] = {}   # job_id -> in-process state of queued/running jobs
+        self._on_demand = queue.Queue()
+        self._speculative = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._record_fallback_lock = threading.Lock()
+        os.makedirs(os.path.join(jobs_dir, 'locks'), exist_ok=True)
+
+    def _status_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _start_threads(self):
+        # Started on first use so each gunicorn worker gets its own threads after fork
+        if self._threads:
+            return
+        for i in range(self.slots.slots):
+            self._threads.append(threading.Thread(target=self._on_demand_worker, daemon=True,
+                                                  name=f"pdf-render-{i}"))
+        self._threads.append(threading.Thread(target=self._speculative_worker, daemon=True,
+                                              name='pdf-render-speculative'))
+        for thread in self._threads:
+            thread.start()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Current job record, or None for unknown ids"""
+        try:
+            with open(self._status_path(job_id), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @contextmanager
+    def _record_lock(self, job_id: str):
+        """
+        Serialize read-modify-write of a job record across threads and
+        workers: an flock striped over 256 lock files by job id prefix, as
+        PdfCache does for renders
+        """
+        if fcntl is None:
+            with self._record_fallback_lock:
+                yield
+            return
+        with open(os.path.join(self.jobs_dir, 'locks', f"{job_id[:2]}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def update(self, job_id: str, owner: Optional[str] = None, **fields) -> Dict:
+        """Merge fields into the job record, adding `owner` to its owners if given"""
+        with self._record_lock(job_id):
+            job = self.get(job_id) or {'job_id': job_id}
+            job.update(fields)
+            owners = job.setdefault('owners', [])
+            if owner is not None and owner not in owners:
+                owners.append(owner)
+            _write_json(self._status_path(job_id), job)
+        return job
+
+    def depth(self) -> int:
+        """Jobs queued or running in this worker"""
+        with self._lock:
+            return len(self._jobs)
+
+    def submit(self, job_id: str, render: Callable[[str], None], speculative: bool = False,
+               owner: Optional[str] = None, **fields) -> Optional[Dict]:
+        """
+        Queue `render(path)` to produce the PDF cached under job_id. A job
+        already queued in this worker is joined rather than duplicated; a
+        download joining a speculative job promotes it. `owner` (a user id)
+        is added to the job's owners either way.
+
+        Returns:
+            the job record, or None for a speculative render skipped
+            because the queue is full
+
+        Raises:
+            PdfQueueFull: max_queued jobs are already waiting or running here
+        """
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is not None:
+                if entry['speculative'] and not speculative:
+                    self._promote(job_id, entry)
+                if owner is not None:
+                    return self.update(job_id, owner=owner)
+                return self.get(job_id) or {'job_id': job_id, 'status': QUEUED}
+
+            if len(self._jobs) >= self.max_queued:
+                if speculative:
+                    self.speculative_counts['skipped'] += 1
+                    return None
+                if not self._drop_speculative():
+                    self.rejected += 1
+                    raise PdfQueueFull(f"{len(self._jobs)} PDF renders already queued")
+
+            # An earlier record's owners are kept: the same job id means the same report HTML
+            submitted_at = time.time()
+            job = self.update(job_id, owner=owner, status=QUEUED, submitted_at=submitted_at, started_at=None,
+                              finished_at=None, error=None, speculative=speculative, used_at=None, **fields)
+            self._jobs[job_id] = {
+                'render': render,
+                'speculative': speculative,
+                'submitted_at': submitted_at,
+                'claimed': False,
+                'cancelled': False,
+                'future': Future()
+            }
+            (self._speculative if speculative else self._on_demand).put(job_id)
+            if speculative:
+                self.speculative_counts['submitted'] += 1
+            else:
+                self.submitted += 1
+            self._start_threads()
+        return job
+
+    def _promote(self, job_id: str, entry: Dict):
+        """A download is waiting on a speculative job: give it download priority (lock held)"""
+        entry['speculative'] = False
+        self.speculative_counts['promoted'] += 1
+        if not entry['claimed']:
+            self._on_demand.put(job_id)
+        self.update(job_id, promoted_at=time.time())
+
+    def _drop_speculative(self) -> bool:
+        """Cancel one speculative job that has not started, to make room (lock held)"""
+        for job_id, entry in self._jobs.items():
+            if entry['speculative'] and not entry['claimed']:
+                self._cancel(job_id, entry, 'Dropped for a download')
+                return True
+        return False
+
+    def _cancel(self, job_id: str, entry: Dict, reason: str, counter: str = 'cancelled'):
+        """Withdraw a speculative job that has not started rendering (lock held)"""
+        entry['cancelled'] = True
+        self._jobs.pop(job_id, None)
+        if not entry['future'].done():
+            entry['future'].set_result(None)
+        self.speculative_counts[counter] += 1
+        self.update(job_id, status=CANCELLED, finished_at=time.time(), error=reason)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a speculative render that has not started; returns whether it was cancelled"""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or not entry['speculative'] or entry.get('rendering'):
+                return False
+            self._cancel(job_id, entry, 'Cancelled')
+            return True
+
+    def _claim(self, job_id: str) -> Optional[Dict]:
+        """Take a queued job for this thread, or None if it was cancelled or taken via its other queue"""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry['claimed']:
+                return None
+            if entry['speculative'] and time.time() - entry['submitted_at'] > self.speculative_ttl:
+                self._cancel(job_id, entry, 'Expired before rendering', counter='expired')
+                return None
+            entry['claimed'] = True
+            return entry
+
+    def _on_demand_worker(self):
+        while True:
+            job_id = self._on_demand.get()
+            entry = self._claim(job_id)
+            if entry is not None:
+                self._run(job_id, entry)
+
+    def _downloads_pending(self) -> bool:
+        with self._lock:
+            return any(not entry['speculative'] for entry in self._jobs.values())
+
+    def _speculative_worker(self):
+        while True:
+            job_id = self._speculative.get()
+            # Yield to downloads in this worker
+            while self._downloads_pending():
+                time.sleep(POLL_SECONDS)
+            entry = self._claim(job_id)
+            if entry is not None:
+                self._run(job_id, entry)
+
+    def _run(self, job_id: str, entry: Dict):
+        """Render in a slot through the cache's single flight; never raises"""
+        timings = {}
+
+        def render_in_slot(pdf_path):
+            with self.slots.acquire(speculative=entry['speculative']):
+                with self._lock:
+                    if entry['cancelled']:
+                        raise RenderCancelled(job_id)
+                    entry['rendering'] = True
+                    self.running += 1
+                timings['started'] = time.time()
+                try:
+                    self.update(job_id, status=RUNNING, started_at=timings['started'])
+                    entry['render'](pdf_path)
+                finally:
+                    timings['finished'] = time.time()
+                    with self._lock:
+                        self.running -= 1
+
+        try:
+            pdf_file, _ = self.cache.get_or_render(job_id, render_in_slot)
+            pdf_file.close()
+            with self._lock:
+                self.completed += 1
+                if timings:
+                    self._wait_seconds.append(timings['started'] - entry['submitted_at'])
+                    self._render_seconds.append(timings['finished'] - timings['started'])
+                    if entry['speculative']:
+                        self.speculative_counts['rendered'] += 1
+            self.update(job_id, status=DONE, finished_at=time.time())
+        except RenderCancelled:
+            pass
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            log.warning("Render failed: %s", e, job_id=job_id[:12])
+            try:
+                self.update(job_id, status=FAILED, finished_at=time.time(), error=str(e))
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                if self._jobs.get(job_id) is entry:
+                    del self._jobs[job_id]
+            if not entry['future'].done():
+                entry['future'].set_result(None)
+
+    def record_hit(self, job_id: str):
+        """
+        A download was served from the PDF cache: count it if the PDF was
+        pre-rendered speculatively and not downloaded before
+        """
+        job = self.get(job_id)
+        if not job or not job.get('speculative') or job.get('used_at') or job.get('promoted_at'):
+            return
+        try:
+            self.update(job_id, used_at=time.time())
+        except OSError:
+            return
+        with self._lock:
+            self.speculative_counts['used'] += 1
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """
+        Wait up to timeout seconds for a job to finish; returns its record
+        (still queued/running when the render is slow). Jobs queued by
+        another worker are followed through their status file.
+        """
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is not None:
+            try:
+                entry['future'].result(timeout=max(timeout, 0))
+            except FutureTimeout:
+                pass
+            return self.get(job_id)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in (DONE, FAILED, CANCELLED) or time.monotonic() >= deadline:
+                return job
+            time.sleep(POLL_SECONDS)
+
+    def stats(self) -> Dict:
+        """Queue depth, render latency and speculative render use for this worker process"""
+        with self._lock:
+            depth = len(self._jobs)
+            speculative = dict(self.speculative_counts)
+            speculative['queued'] = sum(1 for entry in self._jobs.values() if entry['speculative'])
+            speculative['use_rate'] = (round(speculative['used'] / speculative['rendered'], 3)
+                                       if speculative['rendered'] else None)
+            return {
+                'slots': self.slots.slots,
+                'max_queued': self.max_queued,
+                'depth': depth,
+                'queued': depth - self.running,
+                'running': self.running,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'render_ms': _percentiles_ms(self._render_seconds),
+                'slot_wait_ms': _percentiles_ms(self._wait_seconds),
+                'speculative': speculative
+            }
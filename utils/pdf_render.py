@@ -0,0 +1,163 @@
+"""
+PDF Rendering Service
+
+Both PDF download routes built a new FontConfiguration and re-parsed the
+same print stylesheet with CSS(string=...) for every render. PdfRenderer
+does that setup once per worker thread and keeps it:
+
+    pdf_renderer = PdfRenderer(url_fetcher=report_asset_fetcher)
+    pdf_renderer.warm_up()                                   # at startup
+    pdf_renderer.render_pdf(html, 'report', target=pdf_path, base_url=...)
+
+The setup is per thread rather than per process because WeasyPrint's font
+configuration (fontconfig + pango font map) is not safe to share between
+gunicorn --threads. warm_up() renders a one-line document so the first
+real download does not also pay for loading pango and the system font
+cache.
+
+A variant names the print stylesheets applied on top of the report's own
+CSS (PDF_VARIANTS). render_version(variant) fingerprints them together with
+the WeasyPrint version, for the PDF cache key.
+
+Each render registers the report's @font-face fonts in the shared
+FontConfiguration, so the setup is rebuilt every FONT_CONFIG_MAX_RENDERS
+renders to keep that registry from growing for the life of the worker.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(__file__))
+from report_styles import PRINT_CSS
+
+# variant -> print stylesheets, applied in order
+PDF_VARIANTS: Dict[str, Tuple[str, ...]] = {
+    'report': (PRINT_CSS,),
+    'report_with_ai': (PRINT_CSS,),
+}
+
+WRITE_PDF_OPTIONS = {
+    'presentational_hints': True,
+    'optimize_size': ('fonts', 'images'),
+}
+
+FONT_CONFIG_MAX_RENDERS = 200
+WARM_UP_HTML = '<html><body><p class="patient-info">PDF renderer warm-up</p></body></html>'
+
+
+@lru_cache(maxsize=None)
+def render_version(variant: str) -> str:
+    """12-character digest of the variant's print stylesheets and the WeasyPrint version"""
+    from weasyprint import __version__ as weasyprint_version
+
+    digest = hashlib.sha256(weasyprint_version.encode('utf-8'))
+    for css in PDF_VARIANTS[variant]:
+        digest.update(b'\0')
+        digest.update(css.encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+class PdfRenderer:
+    """WeasyPrint renders with a per-thread FontConfiguration and precompiled print CSS"""
+
+    def __init__(self, url_fetcher: Optional[Callable] = None,
+                 variants: Dict[str, Tuple[str, ...]] = PDF_VARIANTS,
+                 max_renders: int = FONT_CONFIG_MAX_RENDERS):
+        self.url_fetcher = url_fetcher
+        self.variants = variants
+        self.max_renders = max_renders
+        self.setups = 0
+        self.renders = 0
+        self.setup_seconds = 0.0
+        self.render_seconds = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _setup(self) -> Dict:
+        """This thread's font configuration and compiled stylesheets, built on first use"""
+        setup = getattr(self._local, 'setup', None)
+        if setup is not None and setup['renders'] < self.max_renders:
+            return setup
+
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        start = time.perf_counter()
+        font_config = FontConfiguration()
+        setup = {
+            'font_config': font_config,
+            'stylesheets': {
+                variant: [CSS(string=css, font_config=font_config) for css in stylesheets]
+                for variant, stylesheets in self.variants.items()
+            },
+            'renders': 0,
+        }
+        self._local.setup = setup
+
+        with self._lock:
+            self.setups += 1
+            self.setup_seconds += time.perf_counter() - start
+        return setup
+
+    def render_document(self, html: str, variant: str, base_url: Optional[str] = None):
+        """
+        Lay out self-contained report HTML without writing the PDF; returns
+        the WeasyPrint Document (pages, bookmarks) for callers that need more
+        than the bytes. render_pdf() is render_document().write_pdf().
+        """
+        if variant not in self.variants:
+            raise ValueError(f"Unknown PDF variant: {variant}")
+
+        from weasyprint import HTML
+
+        setup = self._setup()
+        options = {'url_fetcher': self.url_fetcher} if self.url_fetcher else {}
+        document = HTML(string=html, base_url=base_url, **options).render(
+            stylesheets=setup['stylesheets'][variant],
+            font_config=setup['font_config'],
+            **WRITE_PDF_OPTIONS
+        )
+        setup['renders'] += 1
+        return document
+
+    def render_pdf(self, html: str, variant: str, target=None, base_url: Optional[str] = None) -> Optional[bytes]:
+        """
+        Render self-contained report HTML to PDF.
+
+        Args:
+            html: the report, stylesheets inlined
+            variant: key of PDF_VARIANTS - which print stylesheets to apply
+            target: filename or file object to write to; None returns the bytes
+            base_url: for resolving relative resources
+
+        Returns:
+            PDF bytes when target is None, else None
+        """
+        start = time.perf_counter()
+        pdf = self.render_document(html, variant, base_url).write_pdf(target, **WRITE_PDF_OPTIONS)
+
+        with self._lock:
+            self.renders += 1
+            self.render_seconds += time.perf_counter() - start
+        return pdf
+
+    def warm_up(self, variant: Optional[str] = None) -> float:
+        """Build this thread's setup and render a tiny document; returns the seconds taken"""
+        start = time.perf_counter()
+        self.render_pdf(WARM_UP_HTML, variant or next(iter(self.variants)))
+        return time.perf_counter() - start
+
+    def stats(self) -> Dict:
+        """Setup/render counters for this worker process"""
+        with self._lock:
+            return {
+                'setups': self.setups,
+                'renders': self.renders,
+                'setup_ms_avg': round(self.setup_seconds / self.setups * 1e3, 1) if self.setups else None,
+                'render_ms_avg': round(self.render_seconds / self.renders * 1e3, 1) if self.renders else None
+            }
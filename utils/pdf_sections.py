@@ -0,0 +1,712 @@
+"""
+Section-Parallel PDF Rendering
+
+WeasyPrint lays out a report on one core, start to finish. Reports with
+forced page breaks between their top-level sections (the premium tier's
+one-page sections, the `.page-break` markers in the PNOE report) do not
+need that: nothing before a forced break moves anything after it, so the
+report can be cut there, the pieces rendered at the same time, and the
+PDFs joined in order.
+
+    pdf_sections = SectionRenderer(pdf_renderer, workers=4, asset_dir='report_assets')
+    pdf_sections.render_pdf(html, 'report', target=pdf_path, base_url=...)
+
+split_sections() cuts the HTML between <body> children at forced breaks
+and groups the pieces into at most `workers` chunks of similar size. Each
+chunk is a complete document with the report's own <head>. Chunks render
+on a process pool and merge_pdfs() copies their pages into one pydyf PDF:
+
+  - page numbering: pages keep document order. Reports whose CSS depends
+    on what came before a break - counter(page), @page :first/:left/
+    :right, running headers, counters or sibling selectors on top-level
+    elements, internal links - are rendered as one document instead
+  - bookmarks: workers report each page's (level, label, position) and
+    the merged outline is nested the way WeasyPrint nests one document's
+  - the first-page header stays on the first page; later chunks drop the
+    top margin/padding/border of <html> and <body>, earlier chunks the
+    bottom, as a body continued across a page break does
+
+Reports that cannot be split, and any failure of the pool, fall back to
+the serial PdfRenderer, so enabling this never loses a download. Each
+chunk embeds its own font subsets, so a sectioned PDF is somewhat larger
+than the serial one. The pool is started with spawn, not fork: the web
+worker has pango loaded and threads running.
+
+Given the render queue's host-wide slots (pdf_jobs.RenderSlots), a
+sectioned render keeps to them: on top of the slot its render already
+holds it takes up to workers - 1 more that are free right now, splits
+into that many chunks, and renders serially when none is free. The pool
+processes hold WeasyPrint's memory between renders, so the pool is shut
+down after idle_timeout seconds without a sectioned render.
+"""
+
+import io
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from multiprocessing import get_context
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pydyf
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+from pdfminer.psparser import PSLiteral
+
+sys.path.insert(0, os.path.dirname(__file__))
+from pdf_render import WRITE_PDF_OPTIONS, PdfRenderer
+from report_log import get_logger
+
+log = get_logger('pdf_sections', 'PDF_SECTIONS')
+
+PDF_SCALE = 0.75   # PDF points per CSS pixel, as WeasyPrint writes pages at zoom 1
+POOL_IDLE_SECONDS = 120   # an unused section pool is shut down after this long
+
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'))
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+STYLE_ELEMENT = re.compile(r'<style\b[^>]*>(.*?)</style\s*>', re.S | re.I)
+PRINT_MEDIA = re.compile(r'^@media\s+(?:only\s+)?(?:print|all)\s*$', re.I)
+COMPOUND = re.compile(r'^(\*|[a-z][a-z0-9-]*)?((?:\.[\w-]+)*)$', re.I)
+COMBINATOR = re.compile(r'\s*([>+~])\s*|\s+')
+STRUCTURAL_PSEUDO = re.compile(r':(?:first|last|only|nth)-', re.I)
+PSEUDO_OR_ATTRIBUTE = re.compile(r'::?[\w-]+(?:\([^)]*\))?|\[[^\]]*\]|#[\w-]+')
+# CSS that depends on a page's position in the whole document
+PAGE_DEPENDENT_CSS = re.compile(
+    r'counters?\(\s*pages?\s*[,)]|@page\s*[\w-]*\s*:(?:first|left|right|blank)|string-set|'
+    r'(?:running|element|target-counters?|target-text)\(|'
+    r'break-(?:before|after)\s*:\s*(?:left|right|recto|verso)', re.I)
+INTERNAL_LINK = re.compile(r'href\s*=\s*["\']?#', re.I)
+BREAK_PROPERTIES = ('page-break-before', 'page-break-after', 'break-before', 'break-after')
+FORCED_BREAKS = ('always', 'page')
+
+# Injected into chunks: a body continued from / onto another page has no
+# margin, padding or border on that side
+CONTINUED_STYLE = ('html, body {{ margin-{side}: 0 !important; padding-{side}: 0 !important; '
+                   'border-{side}-width: 0 !important; }}')
+
+
+class _BodyChildren(HTMLParser):
+    """Source offsets of <body>'s child elements and of the body content"""
+
+    def __init__(self, html: str):
+        super().__init__(convert_charrefs=True)
+        self._line_offsets = [0] + [m.end() for m in re.finditer('\n', html)]
+        self.depth = 0
+        self.body_depth = None
+        self.content_start = None
+        self.content_end = None
+        self.children = []   # (offset, tag, classes, inline style)
+        self.feed(html)
+        self.close()
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if self.body_depth is None:
+            if tag == 'body':
+                self.body_depth = self.depth
+                self.content_start = self._offset() + len(self.get_starttag_text())
+        elif self.depth == self.body_depth + 1 and self.content_end is None:
+            attrs = dict(attrs)
+            self.children.append((self._offset(), tag, frozenset((attrs.get('class') or '').split()),
+                                  attrs.get('style') or ''))
+        if tag not in VOID_ELEMENTS:
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        self.depth -= 1
+        if tag == 'body' and self.depth == self.body_depth and self.content_end is None:
+            self.content_end = self._offset()
+
+
+def _css_rules(css: str) -> List[Tuple[str, str]]:
+    """(selectors, declarations) of the style rules that apply to print, in order"""
+    css = CSS_COMMENT.sub('', css)
+    rules = []
+    pos = 0
+    while True:
+        open_brace = css.find('{', pos)
+        if open_brace < 0:
+            return rules
+        depth, close = 0, len(css)
+        for i in range(open_brace, len(css)):
+            if css[i] == '{':
+                depth += 1
+            elif css[i] == '}':
+                depth -= 1
+                if not depth:
+                    close = i
+                    break
+        prelude = css[pos:open_brace].rsplit(';', 1)[-1].strip()
+        block = css[open_brace + 1:close]
+        if prelude.startswith('@'):
+            # Other media queries may or may not match the page; their rules are skipped
+            if PRINT_MEDIA.match(prelude):
+                rules.extend(_css_rules(block))
+        else:
+            rules.append((prelude, block))
+        pos = close + 1
+
+
+def _declarations(block: str) -> Iterable[Tuple[str, str, bool]]:
+    """(property, value, important) of each declaration in a rule or style attribute"""
+    for declaration in block.split(';'):
+        name, colon, value = declaration.partition(':')
+        if colon:
+            value, bang, important = value.partition('!')
+            yield name.strip().lower(), value.strip().lower(), bool(bang) and important.strip().lower() == 'important'
+
+
+def _compounds(selector: str) -> List[Tuple[str, str]]:
+    """(compound, combinator before it) along a selector, e.g. 'ul > li' -> [('ul', ''), ('li', '>')]"""
+    compounds, combinator, pos = [], '', 0
+    for m in COMBINATOR.finditer(selector):
+        if m.start() > pos:
+            compounds.append((selector[pos:m.start()], combinator))
+        combinator = (m.group(1) or ' ') if m.start() > 0 else ''
+        pos = m.end()
+    if pos < len(selector):
+        compounds.append((selector[pos:], combinator))
+    return compounds
+
+
+def _matches(compound: str, tag: str, classes: frozenset) -> bool:
+    """Whether an element could match a compound selector (ids, attributes and pseudo-classes ignored)"""
+    m = COMPOUND.match(PSEUDO_OR_ATTRIBUTE.sub('', compound))
+    if m is None:
+        return True
+    return (m.group(1) in (None, '*') or m.group(1).lower() == tag) and \
+        {c for c in m.group(2).split('.') if c} <= classes
+
+
+def _simple_selector(selector: str) -> Optional[Tuple[str, frozenset, Tuple[int, int]]]:
+    """(tag, classes, specificity) when a selector on a <body> child is a plain tag/class compound"""
+    compounds = _compounds(selector)
+    if len(compounds) == 2 and compounds[0][0].lower() == 'body' and compounds[1][1] == '>':
+        compounds = compounds[1:]
+        extra_tags = 1
+    else:
+        extra_tags = 0
+    if len(compounds) != 1:
+        return None
+    m = COMPOUND.match(compounds[0][0])
+    if m is None:
+        return None
+    tag = (m.group(1) or '*').lower()
+    classes = frozenset(c for c in m.group(2).split('.') if c)
+    return tag, classes, (len(classes), int(tag != '*') + extra_tags)
+
+
+def _forced_breaks(children: List, rules: List[Tuple[str, str]]) -> Tuple[List[Tuple[bool, bool]], Optional[str]]:
+    """
+    Whether each <body> child has a forced break (before, after), cascading
+    the break properties of plain tag/class rules and inline styles; or a
+    reason the breaks (or the CSS around them) cannot be predicted.
+    """
+    top_level = [(tag, classes) for _, tag, classes, _ in children] + [('html', frozenset()), ('body', frozenset())]
+
+    def any_top_level(compound):
+        return any(_matches(compound, tag, classes) for tag, classes in top_level)
+
+    # (tag, classes, side, value, rank) of every break declaration on a plain selector
+    declared = []
+    for order, (selectors, block) in enumerate(rules):
+        declarations = list(_declarations(block))
+        breaks = [(name.rsplit('-', 1)[1], value, important) for name, value, important in declarations
+                  if name in BREAK_PROPERTIES]
+        counters = any(name in ('counter-reset', 'counter-increment', 'counter-set') for name, _, _ in declarations)
+
+        for selector in selectors.split(','):
+            compounds = _compounds(selector.strip())
+            if not compounds:
+                continue
+            subject = compounds[-1][0]
+            if counters and any_top_level(subject):
+                return [], 'counters'
+            for i, (compound, combinator) in enumerate(compounds):
+                sibling = combinator in ('+', '~') or (i + 1 < len(compounds) and compounds[i + 1][1] in ('+', '~'))
+                if (sibling or STRUCTURAL_PSEUDO.search(compound)) and any_top_level(compound):
+                    return [], 'sibling selectors'
+            if not breaks:
+                continue
+            simple = _simple_selector(selector.strip())
+            if simple is None:
+                if any_top_level(subject):
+                    return [], 'complex break selector'
+                continue
+            tag, classes, specificity = simple
+            for side, value, important in breaks:
+                declared.append((tag, classes, side, value, (important, 0, specificity, order)))
+
+    flags = []
+    for _, tag, classes, style in children:
+        candidates = [(side, value, rank) for rule_tag, rule_classes, side, value, rank in declared
+                      if rule_tag in ('*', tag) and rule_classes <= classes]
+        candidates += [(name.rsplit('-', 1)[1], value, (important, 1, (0, 0), 0))
+                       for name, value, important in _declarations(style) if name in BREAK_PROPERTIES]
+        computed = {}
+        for side, value, rank in candidates:
+            if side not in computed or rank >= computed[side][1]:
+                computed[side] = (value, rank)
+        flags.append(tuple(computed.get(side, ('auto',))[0] in FORCED_BREAKS for side in ('before', 'after')))
+    return flags, None
+
+
+def split_sections(html: str, stylesheets: Tuple[str, ...] = (), max_chunks: int = 2) -> Tuple[List[str], Optional[str]]:
+    """
+    Cut report HTML at forced page breaks between <body> children into at
+    most max_chunks complete documents of similar size.
+
+    Args:
+        html: the report, stylesheets inlined
+        stylesheets: print CSS applied on top of the report's own (PDF_VARIANTS)
+        max_chunks: upper bound on the number of documents
+
+    Returns:
+        (chunks, None), or ([html], reason) when the report must be rendered
+        as one document
+    """
+    css = '\n'.join(STYLE_ELEMENT.findall(html) + list(stylesheets))
+    if PAGE_DEPENDENT_CSS.search(css):
+        return [html], 'page-dependent css'
+    if INTERNAL_LINK.search(html):
+        return [html], 'internal links'
+
+    body = _BodyChildren(html)
+    if body.content_start is None or body.content_end is None:
+        return [html], 'unbalanced html'
+    flags, reason = _forced_breaks(body.children, _css_rules(css))
+    if reason:
+        return [html], reason
+
+    # Section boundaries: the start of every child that follows a forced break
+    boundaries = [body.children[i][0] for i in range(1, len(body.children))
+                  if flags[i - 1][1] or flags[i][0]]
+    if not boundaries or max_chunks < 2:
+        return [html], 'no forced breaks'
+
+    # Group sections into runs of similar length, cutting at the boundary
+    # nearest each even share of the body
+    start, end = body.content_start, body.content_end
+    cuts = []
+    for k in range(1, max_chunks):
+        target = start + (end - start) * k / max_chunks
+        remaining = [b for b in boundaries if not cuts or b > cuts[-1]]
+        if not remaining:
+            break
+        cut = min(remaining, key=lambda b: abs(b - target))
+        if cut not in cuts:
+            cuts.append(cut)
+
+    head_end = html.rfind('</head>', 0, start)
+    if head_end < 0:
+        head_end = start
+    prefix, opening = html[:head_end], html[head_end:start]
+    edges = [start] + cuts + [end]
+    chunks = []
+    for i in range(len(edges) - 1):
+        sides = (['top'] if i > 0 else []) + (['bottom'] if i < len(edges) - 2 else [])
+        style = '<style>' + ' '.join(CONTINUED_STYLE.format(side=side) for side in sides) + '</style>\n'
+        chunks.append(prefix + style + opening + html[edges[i]:edges[i + 1]] + '</body>\n</html>\n')
+    return chunks, None
+
+
+def _pdf_name(name) -> str:
+    """Body of a PDF name (no leading slash), delimiters and non-printing bytes #-escaped"""
+    if isinstance(name, str):
+        name = name.encode('utf-8')
+    return ''.join(chr(b) if 0x21 <= b <= 0x7e and b not in b'#()<>[]{}/%' else f'#{b:02X}' for b in name)
+
+
+class _PdfCopier:
+    """Copies objects parsed by pdfminer from several PDFs into one pydyf.PDF"""
+
+    def __init__(self):
+        self.pdf = pydyf.PDF()
+        self.copied: Dict[Tuple[int, int], bytes] = {}   # (source, object id) -> reference
+
+    def copy(self, value, source: int):
+        """The pydyf value for a pdfminer one; indirect objects are copied once per source"""
+        if isinstance(value, PDFObjRef):
+            key = (source, value.objid)
+            if key not in self.copied:
+                obj = value.resolve()
+                if isinstance(obj, PDFStream):
+                    copy = pydyf.Stream()
+                elif isinstance(obj, dict):
+                    copy = pydyf.Dictionary()
+                elif isinstance(obj, list):
+                    copy = pydyf.Array()
+                else:
+                    return self.copy(obj, source)
+                # Registered before filling, so references back to it resolve
+                self.pdf.add_object(copy)
+                self.copied[key] = copy.reference
+                self.fill(copy, obj, source)
+            return self.copied[key]
+        if isinstance(value, PDFStream):
+            copy = pydyf.Stream()
+            self.pdf.add_object(copy)
+            self.fill(copy, value, source)
+            return copy.reference
+        if isinstance(value, dict):
+            copy = pydyf.Dictionary()
+            self.fill(copy, value, source)
+            return copy
+        if isinstance(value, list):
+            return pydyf.Array([self.copy(item, source) for item in value])
+        if isinstance(value, PSLiteral):
+            return '/' + _pdf_name(value.name)
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if value is None:
+            return 'null'
+        if isinstance(value, bytes):
+            return b'<' + value.hex().encode('ascii') + b'>'
+        return value
+
+    def fill(self, copy, obj, source: int, skip: Tuple[str, ...] = ()):
+        """Copy the entries of a pdfminer dict, list or stream into an empty pydyf one"""
+        if isinstance(obj, PDFStream):
+            attrs, data = dict(obj.attrs), obj.rawdata
+            if data is None:   # already decoded by pdfminer
+                data = obj.get_data()
+                attrs.pop('Filter', None)
+                attrs.pop('DecodeParms', None)
+            attrs.pop('Length', None)   # pydyf writes it
+            copy.extra = {_pdf_name(k): self.copy(v, source) for k, v in attrs.items()}
+            copy.stream = [data]
+        elif isinstance(obj, dict):
+            copy.update((_pdf_name(k), self.copy(v, source)) for k, v in obj.items() if k not in skip)
+        else:
+            copy.extend(self.copy(item, source) for item in obj)
+
+
+def _named_destinations(document: PDFDocument) -> List[Tuple[bytes, PDFObjRef]]:
+    """(name, destination) pairs of a PDF's /Dests name tree"""
+    def walk(node):
+        node = node.resolve() if isinstance(node, PDFObjRef) else node
+        names = node.get('Names', [])
+        names = names.resolve() if isinstance(names, PDFObjRef) else names
+        pairs = list(zip(names[::2], names[1::2]))
+        kids = node.get('Kids', [])
+        for kid in (kids.resolve() if isinstance(kids, PDFObjRef) else kids):
+            pairs.extend(walk(kid))
+        return pairs
+
+    names = document.catalog.get('Names')
+    names = names.resolve() if isinstance(names, PDFObjRef) else names
+    if not names or 'Dests' not in names:
+        return []
+    return walk(names['Dests'])
+
+
+def _bookmark_tree(bookmarks: List[Tuple]) -> List[Tuple]:
+    """
+    WeasyPrint's bookmark tree - (label, (page, x, y), children, state) -
+    from (level, label, page, x, y, state) in document order: each bookmark
+    is a child of the nearest earlier one with a lower level.
+    """
+    root = []
+    stack = [(0, root)]
+    for level, label, page, x, y, state in bookmarks:
+        while stack[-1][0] >= level and len(stack) > 1:
+            stack.pop()
+        children = []
+        stack[-1][1].append((label, (page, x, y), children, state))
+        stack.append((level, children))
+    return root
+
+
+def _add_outlines(pdf: pydyf.PDF, bookmarks: List[Tuple], page_references: List[bytes], parent=None):
+    """Outline items for a bookmark tree, counted as WeasyPrint's pdf.anchors.add_outlines counts them"""
+    count = len(bookmarks)
+    outlines = []
+    for label, (page, x, y), children, state in bookmarks:
+        outline = pydyf.Dictionary({
+            'Title': pydyf.String(label),
+            'Dest': pydyf.Array((page_references[page], '/XYZ', x, y, 0)),
+        })
+        pdf.add_object(outline)
+        children_outlines, children_count = _add_outlines(pdf, children, page_references, parent=outline)
+        outline['Count'] = children_count
+        if state == 'closed':
+            outline['Count'] *= -1
+        else:
+            count += children_count
+        if outlines:
+            outline['Prev'] = outlines[-1].reference
+            outlines[-1]['Next'] = outline.reference
+        if children_outlines:
+            outline['First'] = children_outlines[0].reference
+            outline['Last'] = children_outlines[-1].reference
+        if parent is not None:
+            outline['Parent'] = parent.reference
+        outlines.append(outline)
+
+    if parent is None and outlines:
+        root = pydyf.Dictionary({'Count': count, 'First': outlines[0].reference, 'Last': outlines[-1].reference})
+        pdf.add_object(root)
+        for outline in outlines:
+            outline['Parent'] = root.reference
+        pdf.catalog['Outlines'] = root.reference
+    return outlines, count
+
+
+def merge_pdfs(sections: List[Tuple[bytes, int, List[Tuple]]], target=None) -> Optional[bytes]:
+    """
+    Concatenate section PDFs, in order, into one PDF with a single outline
+    and one set of named destinations. Document info, language and the PDF
+    version come from the first section.
+
+    Args:
+        sections: (PDF bytes, page count, bookmarks) per section, as the
+            pool workers return them; bookmarks are (level, label, page
+            index within the section, x, y, state) in PDF coordinates
+        target: filename or file object to write to; None returns the bytes
+
+    Returns:
+        PDF bytes when target is None, else None
+    """
+    copier = _PdfCopier()
+    pdf = copier.pdf
+    documents, pages = [], []
+    for source, (data, page_count, _) in enumerate(sections):
+        document = PDFDocument(PDFParser(io.BytesIO(data)))
+        source_pages = list(PDFPage.create_pages(document))
+        if len(source_pages) != page_count:
+            raise ValueError(f"Section {source} has {len(source_pages)} pages, expected {page_count}")
+        documents.append(document)
+        # Pages first, in order, so links and destinations into them resolve
+        for page in source_pages:
+            copy = pydyf.Dictionary({'Type': '/Page', 'Parent': pdf.pages.reference})
+            pdf.add_page(copy)
+            copier.copied[(source, page.pageid)] = copy.reference
+            pages.append((source, page, copy))
+
+    for source, page, copy in pages:
+        copier.fill(copy, page.attrs, source, skip=('Type', 'Parent'))
+
+    if documents[0].info:
+        copier.fill(pdf.info, documents[0].info[0], 0)
+    copier.fill(pdf.catalog, documents[0].catalog, 0, skip=('Type', 'Pages', 'Outlines', 'Names'))
+
+    # Named destinations (element ids) of every section, in one sorted name tree
+    destinations = sorted((name, copier.copy(destination, source))
+                          for source, document in enumerate(documents)
+                          for name, destination in _named_destinations(document))
+    if destinations:
+        names = pydyf.Array()
+        for name, destination in destinations:
+            names.extend((copier.copy(name, 0), destination))
+        pdf.catalog['Names'] = pydyf.Dictionary({'Dests': pydyf.Dictionary({'Names': names})})
+
+    # One outline over all sections, nested as if the report were one document
+    page_references = list(pdf.page_references)
+    bookmarks, offset = [], 0
+    for _, page_count, section_bookmarks in sections:
+        bookmarks.extend((level, label, offset + page, x, y, state)
+                         for level, label, page, x, y, state in section_bookmarks)
+        offset += page_count
+    _add_outlines(pdf, _bookmark_tree(bookmarks), page_references)
+
+    match = re.match(rb'%PDF-(\d\.\d)', sections[0][0])
+    version = match.group(1) if match else b'1.7'
+    if target is None:
+        output = io.BytesIO()
+        pdf.write(output, version=version, compress=True)
+        return output.getvalue()
+    if hasattr(target, 'write'):
+        pdf.write(target, version=version, compress=True)
+    else:
+        with open(target, 'wb') as output:
+            pdf.write(output, version=version, compress=True)
+    return None
+
+
+# Per pool process: its own PdfRenderer (fonts, stylesheets, asset fetcher)
+_worker_renderer: Optional[PdfRenderer] = None
+
+
+def _init_worker(asset_dir: Optional[str]):
+    """Pool initializer: set up and warm this process's renderer"""
+    global _worker_renderer
+    url_fetcher = None
+    if asset_dir:
+        from asset_cache import AssetCache, ReportURLFetcher
+        url_fetcher = ReportURLFetcher(AssetCache(asset_dir))
+    _worker_renderer = PdfRenderer(url_fetcher=url_fetcher)
+    _worker_renderer.warm_up()
+
+
+def _render_section(html: str, variant: str, base_url: Optional[str]) -> Tuple[bytes, int, List[Tuple]]:
+    """Pool entry point: (PDF bytes, page count, bookmarks) of one chunk"""
+    document = _worker_renderer.render_document(html, variant, base_url)
+    # Bookmark positions in PDF coordinates (origin bottom-left), as generate_pdf writes them
+    bookmarks = [(level, label, page_number, x * PDF_SCALE, (page.height - y) * PDF_SCALE, state)
+                 for page_number, page in enumerate(document.pages)
+                 for level, label, (x, y), state in page.bookmarks]
+    return document.write_pdf(**WRITE_PDF_OPTIONS), len(document.pages), bookmarks
+
+
+class SectionRenderer:
+    """PdfRenderer.render_pdf, with splittable reports rendered a section per pool process"""
+
+    def __init__(self, renderer: PdfRenderer, workers: int = 0, asset_dir: Optional[str] = None,
+                 slots=None, idle_timeout: float = POOL_IDLE_SECONDS):
+        """
+        Args:
+            renderer: in-process renderer for serial renders and fallbacks
+            workers: pool processes per web worker; below 2 every render is serial
+            asset_dir: AssetCache directory the pool's URL fetchers serve assets from
+            slots: the render queue's RenderSlots; a sectioned render uses one
+                pool process per slot it holds. None: always up to `workers`
+            idle_timeout: seconds without a sectioned render before the pool is shut down
+        """
+        self.renderer = renderer
+        self.workers = workers
+        self.asset_dir = asset_dir
+        self.slots = slots
+        self.idle_timeout = idle_timeout
+        self.sectioned = 0
+        self.sections = 0
+        self.fallbacks = 0
+        self.idle_shutdowns = 0
+        self.serial: Dict[str, int] = {}   # reason -> renders
+        self.render_seconds = 0.0
+        self.merge_seconds = 0.0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._active = 0
+        self._last_used = 0.0
+        self._idle_timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created on first use so each gunicorn worker gets its own pool after
+        # fork. Spawned processes import the main module: gunicorn's entry
+        # point in production, app.py itself under `python app.py`
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'),
+                                                 initializer=_init_worker, initargs=(self.asset_dir,))
+            return self._pool
+
+    def _reset_pool(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _schedule_idle_shutdown(self):
+        """(Re)start the timer that shuts the pool down once it has sat idle (lock held)"""
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = threading.Timer(self.idle_timeout, self._shutdown_if_idle)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+
+    def _shutdown_if_idle(self):
+        with self._lock:
+            idle = time.monotonic() - self._last_used
+            if self._pool is None or self._active or idle < self.idle_timeout:
+                return
+            self._pool.shutdown(wait=False)
+            self._pool = None
+            self._idle_timer = None
+            self.idle_shutdowns += 1
+        log.debug("Shut down idle section pool", idle_seconds=round(idle))
+
+    @contextmanager
+    def _extra_slots(self):
+        """Render slots this render may use besides the one it holds"""
+        if self.slots is None:
+            yield self.workers - 1
+            return
+        with self.slots.acquire_free(self.workers - 1) as taken:
+            yield taken
+
+    def _render_serial(self, html, variant, target, base_url, reason):
+        with self._lock:
+            self.serial[reason] = self.serial.get(reason, 0) + 1
+        return self.renderer.render_pdf(html, variant, target=target, base_url=base_url)
+
+    def render_pdf(self, html: str, variant: str, target=None, base_url: Optional[str] = None) -> Optional[bytes]:
+        """Same contract as PdfRenderer.render_pdf"""
+        if variant not in self.renderer.variants:
+            raise ValueError(f"Unknown PDF variant: {variant}")
+        if self.workers < 2:
+            return self._render_serial(html, variant, target, base_url, 'disabled')
+
+        css = self.renderer.variants[variant]
+        chunks, reason = split_sections(html, css, self.workers)
+        if reason:
+            return self._render_serial(html, variant, target, base_url, reason)
+
+        with self._extra_slots() as extra:
+            if not extra:
+                return self._render_serial(html, variant, target, base_url, 'no free slots')
+            if len(chunks) > extra + 1:
+                chunks, reason = split_sections(html, css, extra + 1)
+                if reason:
+                    return self._render_serial(html, variant, target, base_url, reason)
+
+            with self._lock:
+                self._active += 1
+            error = None
+            try:
+                start = time.perf_counter()
+                pool = self._get_pool()
+                futures = [pool.submit(_render_section, chunk, variant, base_url) for chunk in chunks]
+                sections = [future.result() for future in futures]
+                rendered = time.perf_counter()
+                pdf = merge_pdfs(sections, target)
+            except Exception as e:
+                error = e
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._last_used = time.monotonic()
+                    self._schedule_idle_shutdown()
+
+        if error is not None:
+            # The extra slots are released: the serial render runs in the caller's own slot
+            log.warning("Sectioned render failed, rendering serially: %s", error)
+            self._reset_pool()
+            with self._lock:
+                self.fallbacks += 1
+            return self.renderer.render_pdf(html, variant, target=target, base_url=base_url)
+
+        with self._lock:
+            self.sectioned += 1
+            self.sections += len(chunks)
+            self.render_seconds += rendered - start
+            self.merge_seconds += time.perf_counter() - rendered
+        return pdf
+
+    def stats(self) -> Dict:
+        """Sectioned/serial render counters for this worker process"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'pool_running': self._pool is not None,
+                'idle_shutdowns': self.idle_shutdowns,
+                'sectioned': self.sectioned,
+                'serial': dict(self.serial),
+                'fallbacks': self.fallbacks,
+                'sections_avg': round(self.sections / self.sectioned, 1) if self.sectioned else None,
+                'render_ms_avg': round(self.render_seconds / self.sectioned * 1e3, 1) if self.sectioned else None,
+                'merge_ms_avg': round(self.merge_seconds / self.sectioned * 1e3, 1) if self.sectioned else None
+            }
@@ -3,6 +3,13 @@ AI-Powered Peptide Recommendation Engine
 Analyzes patient metabolic data to provide personalized peptide recommendations
 NO DEFAULTS - All recommendations calculated from patient-specific data
 """
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from report_log import get_logger
+
+log = get_logger('peptide_recommendations', 'PEPTIDE_CALC')
 
 def calculate_peptide_recommendations(patient_info, core_scores, metabolic_data, biological_age, chronological_age):
     """
@@ -44,9 +51,8 @@ def calculate_peptide_recommendations(patient_info, core_scores, metabolic_data,
     # Calculate average core performance
     avg_score = sum(core_scores.values()) / len(core_scores) if core_scores else 50
 
-    print(f"[PEPTIDE_CALC] Patient: age={age}, gender={gender}, BMI={bmi:.1f}")
-    print(f"[PEPTIDE_CALC] Bio age diff: {age_diff:+.0f} years, Avg score: {avg_score:.0f}%")
-    print(f"[PEPTIDE_CALC] Key scores: metabolic={metabolic_rate}%, fat_burn={fat_burning}%, HRV={hrv}%")
+    log.debug("Patient", age=age, gender=gender, bmi=bmi, bio_age_diff=age_diff, avg_score=avg_score,
+              metabolic_rate=metabolic_rate, fat_burning=fat_burning, hrv=hrv)
 
     # ============================================================================
     # PRIMARY RECOMMENDATIONS (based on biggest needs)
@@ -330,7 +336,7 @@ def calculate_peptide_recommendations(patient_info, core_scores, metabolic_data,
     if len(recommendations) >= 3:
         recommendations = add_stack_recommendations(recommendations, patient_info)
 
-    print(f"[PEPTIDE_CALC] Generated {len(recommendations)} personalized recommendations")
+    log.debug("Generated %d personalized recommendations", len(recommendations))
 
     return recommendations
 
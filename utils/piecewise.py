@@ -0,0 +1,108 @@
+"""
+Piecewise Scoring Functions
+
+Most scoring formulas are threshold ladders:
+
+    if hr <= 55: score = 95
+    elif hr <= 58: score = 92
+    ...
+
+Piecewise stores such a ladder as data (ascending breakpoints plus one
+segment per interval), so it can be diffed, printed and evaluated without
+branches. Segments are constant (steps) or linear, `value + (x - anchor) *
+slope`, which is the same arithmetic as the hand-written ladders and gives
+identical scores.
+
+Calling a Piecewise with a number (including a NumPy scalar, which is
+returned as a Python number) uses bisect and plain Python arithmetic;
+calling it with a NumPy array uses np.searchsorted, so the same table
+drives both the per-patient and the cohort (utils/cohort_scoring.py) paths.
+"""
+
+import numbers
+from bisect import bisect_left, bisect_right
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Interval conventions:
+#   'right': (b[i-1], b[i]]  - ladders written `if x <= b`
+#   'left':  [b[i-1], b[i])  - ladders written `if x < b` (or `x >= b` from the top)
+CLOSED_SIDES = ('right', 'left')
+
+
+class Piecewise:
+    """A step or piecewise-linear function of one variable"""
+
+    def __init__(self, breaks: Sequence[float], segments: Sequence, closed: str = 'right',
+                 lower: Optional[float] = None, upper: Optional[float] = None):
+        """
+        Args:
+            breaks: ascending breakpoints (n of them)
+            segments: n + 1 entries, one per interval from -inf to +inf; each
+                is a constant or a (value, anchor, slope) tuple meaning
+                value + (x - anchor) * slope
+            closed: which end of each interval includes its breakpoint
+            lower, upper: optional clamp applied after evaluation
+        """
+        if len(segments) != len(breaks) + 1:
+            raise ValueError(f"{len(breaks)} breakpoints need {len(breaks) + 1} segments, got {len(segments)}")
+        if any(b >= a for a, b in zip(breaks[1:], breaks)):
+            raise ValueError("Breakpoints must be strictly ascending")
+        if closed not in CLOSED_SIDES:
+            raise ValueError(f"closed must be one of {CLOSED_SIDES}")
+
+        self.breaks = list(breaks)
+        self.segments = [s if isinstance(s, tuple) else (s, 0, 0) for s in segments]
+        self.closed = closed
+        self.lower = lower
+        self.upper = upper
+        self.is_step = all(slope == 0 for _, _, slope in self.segments)
+        self._bisect = bisect_left if closed == 'right' else bisect_right
+        self._side = 'left' if closed == 'right' else 'right'
+        self._breaks = np.array(self.breaks, dtype=np.float64)
+        self._values, self._anchors, self._slopes = (np.array(c, dtype=np.float64) for c in zip(*self.segments))
+
+    @classmethod
+    def steps(cls, breaks: Sequence[float], values: Sequence[float], closed: str = 'right') -> 'Piecewise':
+        """Step function: values[i] on the i-th interval"""
+        return cls(breaks, list(values), closed=closed)
+
+    def segment(self, x: float) -> Tuple[float, float, float]:
+        """(value, anchor, slope) of the interval containing x"""
+        return self.segments[self._bisect(self.breaks, x)]
+
+    def __call__(self, x):
+        if isinstance(x, (numbers.Real, np.generic)):
+            if isinstance(x, np.generic):
+                x = x.item()
+            value, anchor, slope = self.segments[self._bisect(self.breaks, x)]
+            result = value if slope == 0 else value + (x - anchor) * slope
+            if self.lower is not None:
+                result = max(self.lower, result)
+            if self.upper is not None:
+                result = min(self.upper, result)
+            return result
+
+        x = np.asarray(x, dtype=np.float64)
+        index = np.searchsorted(self._breaks, x, side=self._side)
+        if self.is_step:
+            result = self._values[index]
+        else:
+            slopes = self._slopes[index]
+            result = np.where(slopes == 0, self._values[index],
+                              self._values[index] + (x - self._anchors[index]) * slopes)
+        if self.lower is not None:
+            result = np.maximum(self.lower, result)
+        if self.upper is not None:
+            result = np.minimum(self.upper, result)
+        return result
+
+    def __repr__(self) -> str:
+        op = '<=' if self.closed == 'right' else '<'
+        parts = []
+        for i, (value, anchor, slope) in enumerate(self.segments):
+            limit = f"x{op}{self.breaks[i]}" if i < len(self.breaks) else 'else'
+            formula = f"{value}" if slope == 0 else f"{value}{'+' if slope >= 0 else '-'}(x-{anchor})*{abs(slope)}"
+            parts.append(f"{limit}: {formula}")
+        return f"Piecewise({'; '.join(parts)})"
@@ -0,0 +1,181 @@
+"""
+PNOE PDF Extraction
+
+Turns an uploaded metabolic test PDF into the `extracted_data` dict used by
+every report tier. Raw ergometry exports go through the calculation engine;
+everything else is read with the shared field-spec table. Breath-by-breath
+CSV/XLSX exports skip PDF parsing and are scored from their measured series.
+
+Kept out of app.py so background extraction workers and batch scripts can
+import it without loading the Flask application.
+"""
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+from ergometry_calculator import ParsedPDF, detect_pdf_type, calculate_all_scores, score_ergometry_data
+from breath_ingest import read_breath_table
+from field_specs import FieldMatcher, PATIENT_FIELDS, CORE_SCORE_FIELDS, METRIC_FIELDS, REQUIRED_REPORT_KEYS
+from report_log import get_logger
+
+log = get_logger('pnoe_extraction', 'EXTRACT')
+
+# Generic (non-ergometry) text extraction: every field evaluated in one pass per page.
+# Pages are read in order and the scan stops once demographics, the seven core
+# scores and RMR are all present.
+PNOE_TEXT_MATCHER = FieldMatcher(
+    PATIENT_FIELDS + CORE_SCORE_FIELDS + METRIC_FIELDS,
+    required=REQUIRED_REPORT_KEYS + (('caloric_data', 'rmr'),)
+)
+
+# Table detection is the slowest pdfplumber step; only run it on pages whose
+# text contains a key the table parser below looks for
+PNOE_TABLE_MARKER = re.compile(r'VO2|RMR|Resting Metabolic Rate')
+
+def extract_pnoe_data(pdf_path):
+    """Extract data from metabolic test PDF - handles both raw ergometry and performance reports"""
+    data = {
+        'patient_info': {},
+        'core_scores': {},
+        'caloric_data': {},
+        'metabolic_data': {},
+        'heart_rate_data': {},
+        'all_text': []
+    }
+
+    # Open the PDF once - type detection, the calculation engine and the
+    # fallback extraction below all share its memoized page text and tables
+    with ParsedPDF(pdf_path) as doc:
+        _extract_pnoe_document(doc, data)
+
+    # Detect test source/type (PNOE, CorSense, etc.)
+    all_text_combined = ' '.join(data.get('all_text', [])).lower()
+    if 'pnoe' in all_text_combined or 'p n o e' in all_text_combined:
+        data['patient_info']['test_source'] = 'PNOE'
+    elif 'corsense' in all_text_combined:
+        data['patient_info']['test_source'] = 'CorSense'
+    else:
+        data['patient_info']['test_source'] = 'Generic'
+
+    return data
+
+def extract_breath_data(stream, filename, patient_info=None):
+    """
+    Score a breath-by-breath CSV/XLSX export (see utils/breath_ingest.py).
+
+    `patient_info` (e.g. demographics typed into the upload form) fills any
+    field the file's own metadata rows did not provide.
+    """
+    data = {
+        'patient_info': {},
+        'core_scores': {},
+        'caloric_data': {},
+        'metabolic_data': {},
+        'heart_rate_data': {},
+        'all_text': []
+    }
+
+    breath_data = read_breath_table(stream, filename)
+    for key, value in (patient_info or {}).items():
+        breath_data['patient_info'].setdefault(key, value)
+
+    _apply_calculated_scores(data, score_ergometry_data(breath_data))
+    data['patient_info']['test_source'] = 'Breath-by-breath'
+    data['metabolic_data']['breath_count'] = breath_data['breath_count']
+    peak = breath_data.get('peak', {})
+    if peak.get('vo2_ml_min'):
+        data['metabolic_data']['vo2max_abs'] = round(peak['vo2_ml_min'] / 1000, 2)
+        weight_kg = data['patient_info'].get('weight_kg')
+        if weight_kg:
+            data['metabolic_data']['vo2max_rel'] = round(peak['vo2_ml_min'] / weight_kg, 1)
+    if peak.get('hr_bpm'):
+        data['heart_rate_data']['max_hr'] = round(peak['hr_bpm'])
+    data['all_text'] = [f"Breath-by-breath table: {breath_data['breath_count']} breaths"]
+    return data
+
+def _apply_calculated_scores(data, calc_result):
+    """Map score_ergometry_data output onto the extracted_data sections"""
+    data['patient_info'] = calc_result.get('patient_info', {})
+    data['core_scores'] = calc_result.get('core_scores', {})
+    data['patient_info']['test_source'] = 'PNOE'
+    data['patient_info']['data_quality'] = calc_result.get('data_quality', 'estimated')
+
+    # Copy raw metrics to appropriate sections
+    raw_metrics = calc_result.get('raw_metrics', {})
+    if 'measured_rmr_kcal' in raw_metrics:
+        data['caloric_data']['rmr'] = raw_metrics['measured_rmr_kcal']
+        data['metabolic_data']['rmr'] = raw_metrics['measured_rmr_kcal']
+    if 'rer' in raw_metrics:
+        data['metabolic_data']['rer'] = raw_metrics['rer']
+    if 'mean_hr' in raw_metrics:
+        data['heart_rate_data']['resting_hr'] = raw_metrics['mean_hr']
+
+    data['calculation_details'] = calc_result.get('calculation_details', {})
+
+def _extract_pnoe_document(doc, data):
+    """Fill `data` from an opened ParsedPDF (see extract_pnoe_data)"""
+    # First, detect PDF type and use appropriate extraction method
+    try:
+        pdf_type = detect_pdf_type(doc)
+
+        if pdf_type == 'raw_ergometry':
+            # Use the calculation engine for raw ergometry data
+            calc_result = calculate_all_scores(doc)
+
+            _apply_calculated_scores(data, calc_result)
+
+            # Add a note that this was calculated from raw data
+            data['all_text'] = ['Raw PNOE Ergometry data - scores calculated from measurements']
+
+            return
+    except Exception as e:
+        # If ergometry calculation fails, fall back to standard extraction
+        log.warning("Ergometry calculation failed, using standard extraction: %s", e)
+
+    try:
+        found_fields = set()
+        for page_num in range(1, len(doc) + 1):
+            text = doc.page_text(page_num - 1)
+            if text:
+                data['all_text'].append(text[:2000])  # First 2000 chars per page
+
+                # Try to extract tables
+                tables = doc.page_tables(page_num - 1, marker=PNOE_TABLE_MARKER)
+                if tables:
+                    for table in tables:
+                        # Process table data
+                        for row in table:
+                            if row and len(row) >= 2:
+                                # Look for key-value pairs in tables
+                                key = str(row[0]).strip() if row[0] else ""
+                                value = str(row[1]).strip() if row[1] else ""
+
+                                # Extract VO2 values from tables
+                                if 'VO2' in key and 'ml/kg/min' in key:
+                                    try:
+                                        vo2_val = float(re.search(r'([0-9.]+)', value).group(1))
+                                        data['metabolic_data']['vo2max_rel'] = vo2_val
+                                    except:
+                                        pass
+
+                                # Extract RMR from tables
+                                if 'RMR' in key or 'Resting Metabolic Rate' in key:
+                                    try:
+                                        rmr_val = int(re.search(r'(\d{3,4})', value).group(1))
+                                        if 1000 <= rmr_val <= 3000:  # Sanity check
+                                            data['caloric_data']['rmr'] = rmr_val
+                                            data['metabolic_data']['rmr'] = rmr_val
+                                    except:
+                                        pass
+
+                # Demographics, core scores and metrics from the shared field table
+                PNOE_TEXT_MATCHER.scan_page(text, page_num - 1, data, found_fields)
+                if PNOE_TEXT_MATCHER.is_complete(data):
+                    break
+
+    except Exception as e:
+        data['error'] = str(e)
+
+    data['pages_scanned'] = doc.pages_touched
+    log.info("Read PDF", pages=doc.pages_touched, tables_skipped=doc.tables_skipped)
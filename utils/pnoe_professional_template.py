@@ -5,11 +5,21 @@ Color Palette: Deep Emerald (Primary), Indigo (Performance), Teal (Longevity)
 Optimized for Print/PDF with CSS-only visualizations (no JS dependency for core visuals)
 """
 import json
+import os
+import sys
 from datetime import datetime
 
-class PNOEProfessionalReport:
+sys.path.insert(0, os.path.dirname(__file__))
+from html_render import StreamingReport
+from report_jinja import report_macro, static_fragment
+
+TEMPLATE = 'pnoe_professional'   # utils/report_templates/pnoe_professional.html.j2
+
+class PNOEProfessionalReport(StreamingReport):
     """Generate professional PNOE-style metabolic blueprint reports"""
 
+    stylesheet_name = 'pnoe_professional'
+
     # Stock images for professional appearance (High Res)
     HERO_IMAGE = "https://images.unsplash.com/photo-1517836357463-d25dfeac3438?w=1600&h=600&fit=crop&q=80"
     TRAINING_IMAGE = "https://images.unsplash.com/photo-1517836357463-d25dfeac3438?w=800&q=80"
@@ -93,6 +103,14 @@ class PNOEProfessionalReport:
             total_weight += w
         return round(total_score / total_weight)
 
+    def _get_stylesheet(self):
+        """Inline <style> block, or a link to the fingerprinted stylesheet when inline_css is off"""
+        if not self.inline_css:
+            return self.publish_stylesheet().link_tag()
+        return f"""<style>
+{self._get_styles()}
+    </style>"""
+
     def _get_styles(self):
         """Return PDF-Optimized CSS"""
         return """
@@ -332,183 +350,37 @@ h3 { color: var(--secondary); font-size: 1.1em; margin: 0 0 10px 0; font-weight:
 """
 
     def _generate_header(self):
-        return f"""
-<div class="header">
-    <div class="header-top">
-        <div class="brand">
-            <span style="font-size:1.8em;">⚡</span>
-            <div>OPTIMAL VITALITY<br><span style="font-size:0.6em;font-weight:400;opacity:0.8;letter-spacing:1px;">PERFORMANCE MEDICINE</span></div>
-        </div>
-        <div class="report-meta">
-            DATE: {self.patient_info['test_date']}<br>
-            ID: {self.patient_info.get('name', '').replace(' ','').upper()[:8]}
-        </div>
-    </div>
-    <h1 class="main-title">Complete Metabolic Blueprint</h1>
-    <div class="subtitle">Advanced Physiology & Longevity Analysis</div>
-</div>
-"""
+        report_id = self.patient_info.get('name', '').replace(' ','').upper()[:8]
+        return report_macro(TEMPLATE, 'header')(self.patient_info['test_date'], report_id)
 
     def _generate_patient_info(self):
         weight_lbs = round(self.patient_info['weight_kg'] * 2.20462, 1)
         height_ft = self.patient_info['height_cm'] // 30.48
         height_in = round((self.patient_info['height_cm'] % 30.48) / 2.54)
-        
-        return f"""
-<div class="patient-grid">
-    <div class="info-item">
-        <div class="info-label">Patient Name</div>
-        <div class="info-value">{self.patient_info['name']}</div>
-    </div>
-    <div class="info-item">
-        <div class="info-label">Age / Gender</div>
-        <div class="info-value">{self.patient_info['age']} / {self.patient_info['gender']}</div>
-    </div>
-    <div class="info-item">
-        <div class="info-label">Body Metrics</div>
-        <div class="info-value">{weight_lbs} lbs / {height_ft}'{height_in}"</div>
-    </div>
-    <div class="info-item">
-        <div class="info-label">Facility</div>
-        <div class="info-value">{self.patient_info.get('facility', 'Optimal Vitality')}</div>
-    </div>
-</div>
-"""
+
+        return report_macro(TEMPLATE, 'patient_info')(self.patient_info, weight_lbs, height_ft, height_in)
 
     def _generate_executive_summary(self):
         perf_score = self._calculate_overall_score()
         long_score = self.longevity_score if self.longevity_score else self._calculate_longevity_score()
-        
-        return f"""
-<div class="score-container">
-    <div class="score-box perf">
-        <h3>Performance Score</h3>
-        <div class="css-pie" style="--p:{perf_score}; --c:#4F46E5">
-            <span class="pie-value" style="color:#4F46E5">{perf_score}</span>
-        </div>
-        <div class="pie-label" style="color:#4F46E5">Excellent</div>
-    </div>
-    <div class="score-box long">
-        <h3>Longevity Score</h3>
-        <div class="css-pie" style="--p:{long_score}; --c:#0F766E">
-            <span class="pie-value" style="color:#0F766E">{long_score}</span>
-        </div>
-        <div class="pie-label" style="color:#0F766E">Good</div>
-    </div>
-</div>
-"""
+
+        return report_macro(TEMPLATE, 'executive_summary')(perf_score, long_score)
 
     def _generate_biological_age(self):
         age_diff = self.biological_age - self.chronological_age
         status_color = "#E11D48" if age_diff > 0 else "#10B981"
         arrow = "→"
+        age_message = f"{age_diff} years older" if age_diff > 0 else f"{abs(age_diff)} years younger"
 
-        # Calculate VO2 max potential scenarios
+        # VO2 max potential: bio age at the Good, Excellent and Elite percentiles
         chrono = self.chronological_age
-        scenarios = [
-            {"vo2": "Average", "percentile": "50th", "bio_age": chrono, "diff": 0},
-            {"vo2": "Good", "percentile": "75th", "bio_age": max(20, chrono - 6), "diff": -6},
-            {"vo2": "Excellent", "percentile": "90th", "bio_age": max(20, chrono - 11), "diff": -11},
-            {"vo2": "Elite", "percentile": "95th+", "bio_age": max(20, chrono - 16), "diff": -16},
-        ]
+        potential_ages = [max(20, chrono - 6), max(20, chrono - 11), max(20, chrono - 16)]
 
-        return f"""
-<div class="card bio-age-card no-break">
-    <h2 style="margin-top:0; color:#BE123C">🧬 Biological Age Analysis</h2>
-    <div class="bio-timeline">
-        <div class="bio-point">
-            <span class="bio-num" style="color:#64748B">{self.chronological_age}</span>
-            <span class="bio-txt">Chronological</span>
-        </div>
-        <div class="bio-arrow">{arrow}</div>
-        <div class="bio-point current" style="border-color:{status_color}">
-            <span class="bio-num" style="color:{status_color}">{self.biological_age}</span>
-            <span class="bio-txt">Biological Age</span>
-        </div>
-    </div>
-    <div class="text-center" style="font-weight:600; color:{status_color}; margin-bottom:15px;">
-        {f"{age_diff} years older" if age_diff > 0 else f"{abs(age_diff)} years younger"} than your calendar age.
-    </div>
-
-    <div style="background:#F8FAFC; border-radius:8px; padding:15px; margin-top:15px;">
-        <h3 style="margin:0 0 10px 0; font-size:1em; color:#475569;">📊 How We Calculate Biological Age</h3>
-        <p style="font-size:0.85em; color:#64748B; margin:0 0 12px 0; line-height:1.5;">
-            Your biological age is calculated using a methodology aligned with the <strong>American Heart Association</strong> research.
-            The primary factor is <strong>VO2 max</strong> (cardiorespiratory fitness) - the single best predictor of longevity.
-            Secondary factors include fat-burning efficiency, metabolic rate, and your core performance scores.
-        </p>
-
-        <h4 style="margin:15px 0 8px 0; font-size:0.9em; color:#475569;">🎯 Your VO2 Max Potential</h4>
-        <p style="font-size:0.8em; color:#64748B; margin:0 0 10px 0;">
-            A VO2 max exercise test would give you the most accurate biological age. Here's what different fitness levels mean for your age:
-        </p>
-
-        <table style="width:100%; border-collapse:collapse; font-size:0.8em;">
-            <thead>
-                <tr style="background:#E2E8F0;">
-                    <th style="padding:8px; text-align:left; border-radius:4px 0 0 0;">Fitness Level</th>
-                    <th style="padding:8px; text-align:center;">Percentile</th>
-                    <th style="padding:8px; text-align:center;">Bio Age</th>
-                    <th style="padding:8px; text-align:right; border-radius:0 4px 0 0;">Difference</th>
-                </tr>
-            </thead>
-            <tbody>
-                <tr style="background:#FEE2E2;">
-                    <td style="padding:8px;">Below Average</td>
-                    <td style="padding:8px; text-align:center;">&lt;50th</td>
-                    <td style="padding:8px; text-align:center; color:#E11D48;">{chrono + 5}+</td>
-                    <td style="padding:8px; text-align:right; color:#E11D48;">5+ years older</td>
-                </tr>
-                <tr>
-                    <td style="padding:8px;">Average</td>
-                    <td style="padding:8px; text-align:center;">50th</td>
-                    <td style="padding:8px; text-align:center;">{chrono}</td>
-                    <td style="padding:8px; text-align:right;">Same as calendar</td>
-                </tr>
-                <tr style="background:#DBEAFE;">
-                    <td style="padding:8px;">Good</td>
-                    <td style="padding:8px; text-align:center;">75th</td>
-                    <td style="padding:8px; text-align:center; color:#3B82F6;">{max(20, chrono - 6)}</td>
-                    <td style="padding:8px; text-align:right; color:#3B82F6;">6 years younger</td>
-                </tr>
-                <tr style="background:#D1FAE5;">
-                    <td style="padding:8px;">Excellent</td>
-                    <td style="padding:8px; text-align:center;">90th</td>
-                    <td style="padding:8px; text-align:center; color:#10B981;">{max(20, chrono - 11)}</td>
-                    <td style="padding:8px; text-align:right; color:#10B981;">11 years younger</td>
-                </tr>
-                <tr style="background:#BBF7D0;">
-                    <td style="padding:8px; font-weight:600;">Elite Athlete</td>
-                    <td style="padding:8px; text-align:center;">95th+</td>
-                    <td style="padding:8px; text-align:center; color:#059669; font-weight:600;">{max(20, chrono - 16)}</td>
-                    <td style="padding:8px; text-align:right; color:#059669; font-weight:600;">16+ years younger</td>
-                </tr>
-            </tbody>
-        </table>
-
-        <p style="font-size:0.75em; color:#94A3B8; margin:10px 0 0 0; font-style:italic;">
-            💡 Tip: To improve your biological age, focus on Zone 2 cardio training (3-4x/week, 45-60 min) and strength training.
-            A VO2 max test will give you the most accurate measurement.
-        </p>
-    </div>
-</div>
-"""
+        return report_macro(TEMPLATE, 'biological_age')(
+            chrono, self.biological_age, status_color, arrow, age_message, potential_ages)
 
     def _generate_overview_summary(self):
-        dist = self._count_limitations()
-        return f"""
-<div class="card no-break">
-    <h2>📊 Overview Summary</h2>
-    <p class="subtitle" style="margin-bottom:20px">Distribution of metabolic limitations across core systems.</p>
-    <div class="summary-squares">
-        <div class="sq-box" style="background:#EF4444">{dist[0]}<div class="sq-label">Severe</div></div>
-        <div class="sq-box" style="background:#F97316">{dist[1]}<div class="sq-label">Poor</div></div>
-        <div class="sq-box" style="background:#F59E0B">{dist[2]}<div class="sq-label">Limited</div></div>
-        <div class="sq-box" style="background:#3B82F6">{dist[3]}<div class="sq-label">Good</div></div>
-        <div class="sq-box" style="background:#10B981">{dist[4]}<div class="sq-label">Excellent</div></div>
-    </div>
-</div>
-"""
+        return report_macro(TEMPLATE, 'overview_summary')(self._count_limitations())
 
     def _generate_core_metrics(self):
         labels = {
@@ -520,63 +392,19 @@ h3 { color: var(--secondary); font-size: 1.1em; margin: 0 0 10px 0; font-weight:
             'metabolic_rate': 'Metabolic Rate',
             'fat_burning': 'Fat Burning Efficiency'
         }
-        
-        html = """
-<div class="card no-break">
-    <h2>📈 Core Metrics Analysis</h2>
-    <div style="display:grid; grid-template-columns: 1fr 1fr; gap:30px;">
-        <div>
-"""
+
         # Split metrics into two columns
         items = list(self.core_scores.items())
         mid = (len(items) + 1) // 2
-        
-        for i, (key, score) in enumerate(items):
-            if i == mid:
-                html += "</div><div>"
-                
-            label = labels.get(key, key.replace('_', ' ').title())
-            color = self._get_score_status(score)[1]
-            
-            html += f"""
-            <div class="metric-item">
-                <div class="metric-top">
-                    <span>{label}</span>
-                    <span style="color:{color}">{score}%</span>
-                </div>
-                <div class="bar-bg">
-                    <div class="bar-fill" style="width:{score}%; background:{color}"></div>
-                </div>
-            </div>
-            """
-            
-        html += "</div></div></div>"
-        return html
+
+        metrics = [
+            (labels.get(key, key.replace('_', ' ').title()), score, self._get_score_status(score)[1], i == mid)
+            for i, (key, score) in enumerate(items)
+        ]
+        return report_macro(TEMPLATE, 'core_metrics')(metrics)
 
     def _generate_pillars_of_longevity(self):
-        return f"""
-<div class="card no-break">
-    <h2>🏛️ Pillars of Longevity</h2>
-    <div class="grid-2">
-        <div class="icon-card">
-            <div class="icon-header">🧠 Mental Status</div>
-            <div class="icon-body">Fundamental pillar of wellness; healthy mind drives healthy choices.</div>
-        </div>
-        <div class="icon-card">
-            <div class="icon-header">❤️ Heart Fitness</div>
-            <div class="icon-body">Critical for wellness; CV dysfunction is a major mortality risk.</div>
-        </div>
-        <div class="icon-card">
-            <div class="icon-header">🫁 Lung Fitness</div>
-            <div class="icon-body">High lung fitness is essential for oxygen delivery and longevity.</div>
-        </div>
-        <div class="icon-card">
-            <div class="icon-header">🦴 Posture</div>
-            <div class="icon-body">Spinal health drives quality of life and breathing mechanics.</div>
-        </div>
-    </div>
-</div>
-"""
+        return static_fragment(TEMPLATE, 'pillars_of_longevity')
 
     def _generate_training_zones(self):
         max_hr = 220 - self.chronological_age
@@ -588,170 +416,54 @@ h3 { color: var(--secondary); font-size: 1.1em; margin: 0 0 10px 0; font-weight:
             {'name': 'Zone 5', 'desc': 'VO2 Max', 'range': f"{int(max_hr*0.9)}-{max_hr}", 'class': ''}
         ]
         
-        html = f"""
-<div class="card no-break">
-    <h2>🏃 Training Zones</h2>
-    <div class="grid-3" style="grid-template-columns: repeat(5, 1fr);">
-"""
-        for z in zones:
-            html += f"""
-        <div class="zone-box {z['class']}">
-            <div class="zone-name" style="color:{'#10B981' if z['class'] else '#64748B'}">{z['name']}</div>
-            <div class="zone-bpm">{z['range']}</div>
-            <div style="font-size:0.7em; font-weight:600;">{z['desc']}</div>
-        </div>
-"""
-        html += "</div></div>"
-        return html
+        return report_macro(TEMPLATE, 'training_zones')(zones)
 
     def _generate_caloric_balance(self):
         # Scale for visual bars (max value)
         max_val = max(self.caloric_data['eat_workout'], 3000)
-        
+
         def get_h(val):
             return int((val / max_val) * 100)
-            
-        return f"""
-<div class="card no-break">
-    <h2>🔥 Metabolism & Fuel</h2>
-    <div class="grid-2">
-        <div>
-            <h3>Daily Energy Balance</h3>
-            <div class="caloric-visual">
-                <div class="c-bar-group">
-                    <div class="c-val" style="color:#F97316">{self.caloric_data['burn_rest']}</div>
-                    <div class="c-bar" style="height:{get_h(self.caloric_data['burn_rest'])}%; background:#F97316"></div>
-                    <div class="c-label">Burn<br>(Rest)</div>
-                </div>
-                <div class="c-bar-group">
-                    <div class="c-val" style="color:#F59E0B">{self.caloric_data['eat_rest']}</div>
-                    <div class="c-bar" style="height:{get_h(self.caloric_data['eat_rest'])}%; background:#F59E0B"></div>
-                    <div class="c-label">Eat<br>(Rest)</div>
-                </div>
-                <div class="c-bar-group">
-                    <div class="c-val" style="color:#10B981">{self.caloric_data['eat_workout']}</div>
-                    <div class="c-bar" style="height:{get_h(self.caloric_data['eat_workout'])}%; background:#10B981"></div>
-                    <div class="c-label">Eat<br>(Workout)</div>
-                </div>
-            </div>
-        </div>
-        <div>
-            <h3>Fuel Efficiency</h3>
-            <div class="fuel-donut" style="--fat:{self.caloric_data['fat_percent']}%;">
-                <div class="text-center">
-                    <div style="font-size:0.8em; color:#64748B">FAT BURN</div>
-                    <div style="font-size:1.5em; font-weight:800; color:#10B981">{self.caloric_data['fat_percent']}%</div>
-                </div>
-            </div>
-            <div class="fuel-legend">
-                <div><span class="dot" style="background:#10B981"></span>Fats</div>
-                <div><span class="dot" style="background:#3B82F6"></span>Carbs</div>
-            </div>
-        </div>
-    </div>
-</div>
-"""
+
+        heights = {key: get_h(self.caloric_data[key]) for key in ('burn_rest', 'eat_rest', 'eat_workout')}
+        return report_macro(TEMPLATE, 'caloric_balance')(self.caloric_data, heights)
 
     def _generate_interventions(self):
-        return f"""
-<div class="card no-break page-break">
-    <h2>💪 Recommended Interventions</h2>
-    <div class="grid-3">
-        <div class="int-card">
-            <img src="{self.TRAINING_IMAGE}" class="int-img" style="width:100%; height:120px; object-fit:cover; border-radius:8px; margin-bottom:10px;">
-            <div style="font-weight:700; color:#0F766E">Zone 2 Training</div>
-            <div style="font-size:0.85em">3-4 sessions/week</div>
-        </div>
-        <div class="int-card">
-            <img src="{self.COLD_PLUNGE_IMAGE}" class="int-img" style="width:100%; height:120px; object-fit:cover; border-radius:8px; margin-bottom:10px;">
-            <div style="font-weight:700; color:#0F766E">Cold Plunge</div>
-            <div style="font-size:0.85em">Metabolic activation</div>
-        </div>
-        <div class="int-card">
-            <img src="{self.NUTRITION_IMAGE}" class="int-img" style="width:100%; height:120px; object-fit:cover; border-radius:8px; margin-bottom:10px;">
-            <div style="font-weight:700; color:#0F766E">High Protein</div>
-            <div style="font-size:0.85em">1.6-2.2g/kg bodyweight</div>
-        </div>
-    </div>
-</div>
-"""
+        return static_fragment(TEMPLATE, 'interventions',
+                               self.TRAINING_IMAGE, self.COLD_PLUNGE_IMAGE, self.NUTRITION_IMAGE)
 
     def _generate_action_roadmap(self):
-        return """
-<div class="card no-break">
-    <h2>✅ 90-Day Action Roadmap</h2>
-    <div class="roadmap">
-        <div class="road-item">
-            <div class="road-dot"></div>
-            <div class="road-content">
-                <span class="tag high">High Priority</span>
-                <h3>Zone 2 Endurance Base</h3>
-                <p style="font-size:0.9em; color:#4B5563">Establish 3-4 weekly sessions of 45-60 mins. This is the primary driver for mitochondrial efficiency.</p>
-            </div>
-        </div>
-        <div class="road-item">
-            <div class="road-dot"></div>
-            <div class="road-content">
-                <span class="tag high">High Priority</span>
-                <h3>Strength Protocol</h3>
-                <p style="font-size:0.9em; color:#4B5563">Maintain 3x weekly resistance training to support metabolic rate and glucose disposal.</p>
-            </div>
-        </div>
-        <div class="road-item">
-            <div class="road-dot"></div>
-            <div class="road-content">
-                <span class="tag med">Medium Priority</span>
-                <h3>Recovery & Sleep</h3>
-                <p style="font-size:0.9em; color:#4B5563">Optimize circadian rhythm with morning sunlight and consistent sleep schedule to boost HRV.</p>
-            </div>
-        </div>
-    </div>
-</div>
-"""
+        return static_fragment(TEMPLATE, 'action_roadmap')
 
     def _generate_disclaimer(self):
-        return """
-<div style="font-size:0.8em; color:#94A3B8; text-align:center; padding:20px; border-top:1px solid #E2E8F0; margin-top:40px;">
-    <strong>MEDICAL DISCLAIMER:</strong> This report is for informational purposes only and does not constitute medical advice, diagnosis, or treatment. 
-    Always consult with a qualified healthcare provider before initiating any new exercise or nutrition program.
-    <br><br>
-    © 2025 Optimal Vitality. Powered by PNOE.
-</div>
-"""
+        return static_fragment(TEMPLATE, 'disclaimer')
 
-    def generate(self, output_path):
-        """Generate the complete compact report"""
+    def iter_html(self):
+        """The complete compact report, one section at a time"""
         if not self.longevity_score:
             self.longevity_score = self._calculate_longevity_score()
-            
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Metabolic Blueprint - {self.patient_info.get('name', 'Patient')}</title>
-    <style>
-{self._get_styles()}
-    </style>
-</head>
-<body>
-{self._generate_header()}
-{self._generate_patient_info()}
-{self._generate_executive_summary()}
-{self._generate_biological_age()}
-{self._generate_overview_summary()}
-{self._generate_core_metrics()}
-{self._generate_pillars_of_longevity()}
-<div class="page-break"></div>
-{self._generate_training_zones()}
-{self._generate_caloric_balance()}
-{self._generate_interventions()}
-{self._generate_action_roadmap()}
-{self.peptide_html if self.peptide_html else ''}
-{self._generate_disclaimer()}
-</body>
-</html>
-"""
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
+        yield report_macro(TEMPLATE, 'document_head')(self.patient_info.get('name', 'Patient'), self._get_stylesheet())
+        yield f"{self._generate_header()}\n"
+        yield f"{self._generate_patient_info()}\n"
+        yield f"{self._generate_executive_summary()}\n"
+        yield f"{self._generate_biological_age()}\n"
+        yield f"{self._generate_overview_summary()}\n"
+        yield f"{self._generate_core_metrics()}\n"
+        yield f"{self._generate_pillars_of_longevity()}\n"
+        yield '<div class="page-break"></div>\n'
+        yield f"{self._generate_training_zones()}\n"
+        yield f"{self._generate_caloric_balance()}\n"
+        yield f"{self._generate_interventions()}\n"
+        yield f"{self._generate_action_roadmap()}\n"
+        yield f"{self.peptide_html if self.peptide_html else ''}\n"
+        yield f"{self._generate_disclaimer()}\n"
+        yield "</body>\n</html>\n"
+
+    def generate(self, output_path=None):
+        """Generate the complete compact report; also written to output_path if given"""
+        html = self.render()
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+        return html
@@ -0,0 +1,88 @@
+"""
+Compiled Report Templates
+
+The report markup lives in Jinja2 files under utils/report_templates/, one
+file per report class with one macro per section. The Python classes keep
+the scoring logic and call the macros:
+
+    return report_macro('pnoe_professional', 'header')(test_date, report_id)
+
+Templates are compiled once per process (auto_reload is off - they only
+change on deploy) and the compiled bytecode is cached on disk, so a fresh
+gunicorn worker skips the parse/compile step too.
+
+Sections with no patient-specific content (disclaimers, pillars, roadmaps)
+are rendered once per process by static_fragment() and reused. Small
+fragments that take one of a few hundred values - a score bar depends only
+on the score and its label - go through the bounded cached_fragment().
+
+Autoescaping is off: the templates reproduce the f-string output exactly,
+including HTML passed in as values (peptide_html, score bars).
+"""
+
+import functools
+import os
+from typing import Callable
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_templates')
+TEMPLATE_SUFFIX = '.html.j2'
+
+# Where compiled bytecode is kept across processes (default: Jinja's per-user temp dir)
+BYTECODE_CACHE_ENV = 'REPORT_TEMPLATE_CACHE_DIR'
+
+# Entries kept by cached_fragment (7 score bars x 0-100%, with room to spare)
+FRAGMENT_CACHE_SIZE = 1024
+
+
+def _thousands(value) -> str:
+    """1234567 -> '1,234,567' (the f-string {value:,})"""
+    return f"{value:,}"
+
+
+def _create_environment() -> Environment:
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=FileSystemBytecodeCache(os.getenv(BYTECODE_CACHE_ENV) or None),
+        auto_reload=False,
+        autoescape=False,
+        keep_trailing_newline=True,
+        undefined=StrictUndefined,
+    )
+    env.filters['thousands'] = _thousands
+    return env
+
+
+_env = _create_environment()
+
+
+@functools.lru_cache(maxsize=None)
+def report_macro(template: str, name: str) -> Callable[..., str]:
+    """
+    A section macro, e.g. report_macro('ai_premium', 'cover_page').
+
+    Args:
+        template: template file name without TEMPLATE_SUFFIX
+        name: macro name within that file
+    """
+    return getattr(_env.get_template(template + TEMPLATE_SUFFIX).module, name)
+
+
+@functools.lru_cache(maxsize=None)
+def static_fragment(template: str, name: str, *args) -> str:
+    """
+    A section macro's output, rendered once per process for each distinct
+    args (which must be hashable - class constants such as image URLs, never
+    patient data).
+    """
+    return str(report_macro(template, name)(*args))
+
+
+@functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def cached_fragment(template: str, name: str, *args) -> str:
+    """
+    A section macro's output for args drawn from a small set of values,
+    kept in a bounded LRU (see FRAGMENT_CACHE_SIZE).
+    """
+    return str(report_macro(template, name)(*args))
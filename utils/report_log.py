@@ -0,0 +1,316 @@
+"""
+Report Pipeline Logging
+
+Leveled, lazily formatted logging for the report pipeline, replacing the
+`print(f"[TAG] ...")` narration. Records keep the familiar `[TAG] message`
+shape and go to stdout (gunicorn --capture-output picks them up as before):
+
+    log = get_logger('calculate_scores.bio_age', 'CALCULATE_BIO_AGE')
+    log.debug("Secondary factors", fat_burning=score, rmr_ratio=ratio)
+    -> [CALCULATE_BIO_AGE] Secondary factors fat_burning=58 rmr_ratio=1.08
+
+Nothing is formatted until a handler accepts the record: a suppressed call
+costs one cached level check. Pass %-style args and keyword fields instead
+of f-strings, and wrap anything expensive to compute in lazy().
+
+Configuration (environment, read on first use, or configure()):
+    REPORT_LOG_LEVEL   default level plus per-module overrides, e.g.
+                       "WARNING,calculate_scores=DEBUG,app.auth=INFO"
+                       (module names are the get_logger names; a prefix
+                       covers its children)
+    REPORT_LOG_SAMPLE  keep 1 in N records below WARNING per call site,
+                       e.g. "app.auth=100" (default: DEFAULT_SAMPLE_RATES)
+    REPORT_LOG_PHI     "1" disables PHI redaction (local debugging only)
+
+PHI: dict keys in PHI_FIELDS, keyword fields with those names, and values
+wrapped in phi() are printed as [REDACTED].
+"""
+
+import itertools
+import logging
+import os
+import sys
+import threading
+from typing import Callable, Dict, Optional
+
+ROOT_LOGGER = 'metabomax'
+DEFAULT_LEVEL = 'INFO'
+LEVEL_ENV = 'REPORT_LOG_LEVEL'
+SAMPLE_ENV = 'REPORT_LOG_SAMPLE'
+PHI_ENV = 'REPORT_LOG_PHI'
+
+# Per-request lines that would otherwise dominate the log (keep 1 in N)
+DEFAULT_SAMPLE_RATES = {'app.auth': 100}
+
+# Identifying fields (HIPAA Safe Harbor) that never reach the log as-is
+PHI_FIELDS = frozenset({
+    'name', 'patient_name', 'first_name', 'last_name', 'full_name', 'email',
+    'phone', 'address', 'date_of_birth', 'dob', 'birth_date', 'test_date',
+})
+REDACTED = '[REDACTED]'
+
+_configure_lock = threading.Lock()
+_root = logging.getLogger(ROOT_LOGGER)
+
+
+class LazyValue:
+    """A log argument computed only if the record is emitted (see lazy())"""
+
+    __slots__ = ('fn',)
+
+    def __init__(self, fn: Callable):
+        self.fn = fn
+
+    def __str__(self):
+        return str(self.fn())
+
+    __repr__ = __str__
+
+
+class PHIValue:
+    """A log argument that is PHI regardless of its field name (see phi())"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return REDACTED
+
+
+def lazy(fn: Callable) -> LazyValue:
+    """Defer fn() until the record is formatted, e.g. lazy(lambda: list(session.keys()))"""
+    return LazyValue(fn)
+
+
+def phi(value) -> PHIValue:
+    """Mark a value as PHI so it is redacted wherever it is logged"""
+    return PHIValue(value)
+
+
+_CONTAINERS = (dict, list, tuple, PHIValue)
+
+
+def redact(value):
+    """Copy of value with PHI dict keys and phi() values replaced by [REDACTED]"""
+    if not isinstance(value, _CONTAINERS):
+        return value
+    if isinstance(value, PHIValue):
+        return REDACTED
+    if isinstance(value, dict):
+        return {k: REDACTED if isinstance(k, str) and k.lower() in PHI_FIELDS else redact(v)
+                for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact(v) for v in value)
+    return value
+
+
+def _reveal(value):
+    """phi() values unwrapped, for REPORT_LOG_PHI=1"""
+    if not isinstance(value, _CONTAINERS):
+        return value
+    if isinstance(value, PHIValue):
+        return value.value
+    if isinstance(value, dict):
+        return {k: _reveal(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_reveal(v) for v in value)
+    return value
+
+
+def _format_field(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+class ReportFormatter(logging.Formatter):
+    """`[TAG] message key=value ...` with PHI redacted"""
+
+    def __init__(self, redact_phi: bool = True):
+        super().__init__()
+        self.redact_phi = redact_phi
+
+    def format(self, record: logging.LogRecord) -> str:
+        clean = redact if self.redact_phi else _reveal
+        if record.args:
+            record.args = clean(record.args)
+        parts = [f"[{getattr(record, 'tag', record.name)}] {record.getMessage()}"]
+        fields = getattr(record, 'fields', None)
+        if fields:
+            for key, value in clean(fields).items():
+                parts.append(f"{key}={_format_field(value)}")
+        sample_rate = getattr(record, 'sample_rate', None)
+        if sample_rate:
+            parts.append(f"(1/{sample_rate} sampled)")
+        text = ' '.join(parts)
+        if record.exc_info:
+            text += '\n' + self.formatException(record.exc_info)
+        return text
+
+
+class Sampler:
+    """
+    Keeps the 1st, (N+1)th, ... record of each call site (logger + message
+    template). Consulted before a record is built, so dropped records cost
+    a dict lookup and a counter increment.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        self.rates = {f"{ROOT_LOGGER}.{name}": int(n) for name, n in rates.items() if int(n) > 1}
+        self._resolved: Dict[str, int] = {}
+        self._counters: Dict[tuple, itertools.count] = {}
+
+    def rate(self, logger_name: str) -> int:
+        """N for this logger (inherited from the closest configured parent), 0 if unsampled"""
+        rate = self._resolved.get(logger_name)
+        if rate is None:
+            name, rate = logger_name, 0
+            while name:
+                if name in self.rates:
+                    rate = self.rates[name]
+                    break
+                name = name.rpartition('.')[0]
+            self._resolved[logger_name] = rate
+        return rate
+
+    def keep(self, logger_name: str, msg: str, rate: int) -> bool:
+        key = (logger_name, msg)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters.setdefault(key, itertools.count())
+        return next(counter) % rate == 0
+
+
+class StdoutHandler(logging.Handler):
+    """Writes to whatever sys.stdout is at emit time, like print()"""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            sys.stdout.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """"WARNING,calculate_scores=DEBUG" -> {'': 'WARNING', 'calculate_scores': 'DEBUG'}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.rpartition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _parse_rates(spec: str) -> Dict[str, int]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = int(rate)
+    return rates
+
+
+def configure(levels: Optional[str] = None, sample_rates: Optional[Dict[str, int]] = None,
+              redact_phi: Optional[bool] = None):
+    """
+    (Re)configure the pipeline loggers. Arguments left as None come from
+    the environment (see module docstring), then the defaults.
+
+    Args:
+        levels: level spec, e.g. "INFO" or "WARNING,calculate_scores=DEBUG"
+        sample_rates: {module: N} to keep 1 in N records below WARNING
+        redact_phi: False to log PHI unredacted
+    """
+    with _configure_lock:
+        if levels is None:
+            levels = os.getenv(LEVEL_ENV, DEFAULT_LEVEL)
+        if sample_rates is None:
+            sample_rates = _parse_rates(os.environ[SAMPLE_ENV]) if SAMPLE_ENV in os.environ else DEFAULT_SAMPLE_RATES
+        if redact_phi is None:
+            redact_phi = os.getenv(PHI_ENV) != '1'
+
+        root = _root
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for name in list(logging.root.manager.loggerDict):
+            if name.startswith(ROOT_LOGGER + '.'):
+                logging.getLogger(name).setLevel(logging.NOTSET)
+
+        handler = StdoutHandler()
+        handler.setFormatter(ReportFormatter(redact_phi=redact_phi))
+        root.addHandler(handler)
+        # Kept on the shared logger object, like the handler (see get_logger)
+        root.report_sampler = Sampler(sample_rates)
+        root.propagate = False
+
+        parsed = _parse_levels(levels)
+        root.setLevel(parsed.pop('', DEFAULT_LEVEL))
+        for name, level in parsed.items():
+            logging.getLogger(f"{ROOT_LOGGER}.{name}").setLevel(level)
+
+
+class ReportLogger:
+    """
+    A pipeline logger bound to a `[TAG]`. debug/info/warning/error take a
+    %-style message, its args, and keyword fields; all formatting is
+    deferred until the record is emitted.
+    """
+
+    __slots__ = ('logger', 'tag')
+
+    def __init__(self, name: str, tag: str):
+        self.logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+        self.tag = tag
+
+    def enabled(self, level: int = logging.DEBUG) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def _emit(self, level: int, msg: str, args: tuple, fields: Dict, exc_info=None):
+        logger = self.logger
+        extra = {'tag': self.tag, 'fields': fields}
+        if level < logging.WARNING:
+            sampler = _root.report_sampler
+            rate = sampler.rate(logger.name)
+            if rate:
+                if not sampler.keep(logger.name, msg, rate):
+                    return
+                extra['sample_rate'] = rate
+        if exc_info and not isinstance(exc_info, tuple):
+            exc_info = sys.exc_info()
+        # makeRecord + handle skips Logger.log's caller-frame lookup; the format has no file:line
+        logger.handle(logger.makeRecord(logger.name, level, '', 0, msg, args, exc_info, extra=extra))
+
+    def log(self, level: int, msg: str, *args, exc_info=None, **fields):
+        if self.logger.isEnabledFor(level):
+            self._emit(level, msg, args, fields, exc_info)
+
+    def debug(self, msg: str, *args, **fields):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._emit(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg: str, *args, **fields):
+        if self.logger.isEnabledFor(logging.INFO):
+            self._emit(logging.INFO, msg, args, fields)
+
+    def warning(self, msg: str, *args, **fields):
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._emit(logging.WARNING, msg, args, fields)
+
+    def error(self, msg: str, *args, exc_info=None, **fields):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._emit(logging.ERROR, msg, args, fields, exc_info)
+
+
+def get_logger(name: str, tag: Optional[str] = None) -> ReportLogger:
+    """
+    Logger for a pipeline module.
+
+    Args:
+        name: dotted module name used for per-module levels (e.g. 'calculate_scores.bio_age')
+        tag: prefix printed on every record (default: name upper-cased)
+    """
+    # Configured state lives on the logging tree, so utils.report_log and
+    # report_log (both import paths are in use) share it
+    if not _root.handlers:
+        configure()
+    return ReportLogger(name, tag or name.upper().replace('.', '_'))
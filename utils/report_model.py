@@ -0,0 +1,233 @@
+"""
+Report Model
+
+Everything a report template shows that has to be computed, rather than
+copied, from extracted_data: calculated core scores and fuel split, the
+caloric plan (Mifflin-St Jeor RMR -> TDEE), biological age and peptide
+recommendations. Each tier used to redo this work itself, and Super Premium
+ran the Basic and Premium generators (and threw their HTML away) just to get
+it. Now build_report_model() computes it once and every template reads the
+same model:
+
+    model = build_report_model(extracted_data, custom_data)
+    apply_report_model(extracted_data, model)   # what gets saved to JSON
+    report.core_scores = model['core_scores']
+
+Models are cached in-process on a hash of the normalized inputs, so
+regenerating a report or switching tiers for the same upload skips the
+computation. Entries are stored as JSON (the model is plain JSON data, like
+the extracted_data it is saved into), so every caller gets its own copy and
+may modify it.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(__file__))
+from calculate_scores import enhance_extracted_data_with_calculated_scores, calculate_biological_age
+from peptide_recommendations import calculate_peptide_recommendations, format_peptide_recommendations_html
+from report_log import get_logger
+
+log = get_logger('report_model', 'REPORT_MODEL')
+
+# The extracted_data sections and custom_data fields the model depends on;
+# nothing else goes into the cache key
+MODEL_SECTIONS = ('patient_info', 'core_scores', 'caloric_data', 'metabolic_data')
+MODEL_CUSTOM_FIELDS = ('chronological_age', 'biological_age')
+
+# Stand-ins for fields missing from the PDF (the PNOE professional template's defaults)
+DEFAULT_PROFILE = {'age': 35, 'gender': 'Male', 'weight_kg': 77, 'height_cm': 188}
+PROFILE_FIELDS = ('name', 'test_date', 'weight_kg', 'height_cm', 'gender', 'age')
+
+# Activity multipliers on RMR, and the default surplus eaten on top of TDEE
+TDEE_REST_MULTIPLIER = 1.375      # light activity
+TDEE_WORKOUT_MULTIPLIER = 1.55    # moderate activity
+EAT_REST_SURPLUS = 200
+EAT_WORKOUT_SURPLUS = 300
+
+REPORT_MODEL_CACHE_SIZE = 64
+
+
+def model_key(extracted_data: Dict, custom_data: Dict) -> str:
+    """
+    Hash of the inputs build_report_model reads. Unset custom fields ('' or
+    None) hash like absent ones, and dict key order does not matter.
+    """
+    inputs = {section: extracted_data.get(section) or {} for section in MODEL_SECTIONS}
+    inputs['custom'] = {field: custom_data[field] for field in MODEL_CUSTOM_FIELDS if custom_data.get(field)}
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def calculate_caloric_plan(profile: Dict) -> Dict:
+    """
+    Daily burn and intake targets from the Mifflin-St Jeor RMR. The RMR in
+    the PDF is not used - extraction picks up VO2 ml/min instead.
+    """
+    age = profile['age']
+    weight_kg = profile['weight_kg']
+    height_cm = profile['height_cm']
+    gender = profile['gender'].lower()
+
+    if 'male' in gender:
+        rmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + 5
+    else:
+        rmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) - 161
+    rmr = int(rmr)
+
+    tdee_rest = int(rmr * TDEE_REST_MULTIPLIER)
+    tdee_workout = int(rmr * TDEE_WORKOUT_MULTIPLIER)
+
+    log.debug("Calculated RMR %s kcal", rmr, age=age, weight_kg=weight_kg, height_cm=height_cm,
+              gender=gender, tdee_rest=tdee_rest, tdee_workout=tdee_workout)
+
+    return {
+        'burn_rest': tdee_rest,
+        'burn_workout': tdee_workout,
+        'eat_rest': tdee_rest + EAT_REST_SURPLUS,
+        'eat_workout': tdee_workout + EAT_WORKOUT_SURPLUS,
+    }
+
+
+def compute_report_model(extracted_data: Dict, custom_data: Dict) -> Dict:
+    """
+    Run enhancement, the caloric plan, biological age and peptide
+    recommendations once. extracted_data is not modified.
+
+    Returns:
+        dict with patient_info (as extracted), profile (patient_info with
+        defaults and the custom chronological age, as used for the
+        calculations), core_scores, caloric_data, metabolic_data,
+        chronological_age, biological_age, peptide_recommendations and
+        peptide_html
+    """
+    data = {section: copy.deepcopy(extracted_data.get(section) or {}) for section in MODEL_SECTIONS}
+    data = enhance_extracted_data_with_calculated_scores(data)
+
+    patient_info = data['patient_info']
+    profile = dict(DEFAULT_PROFILE)
+    profile.update({field: patient_info[field] for field in PROFILE_FIELDS if patient_info.get(field)})
+
+    caloric_data = data['caloric_data']
+    caloric_data.update(calculate_caloric_plan(profile))
+
+    chronological_age = custom_data.get('chronological_age') or patient_info.get('age') or None
+    if custom_data.get('chronological_age'):
+        profile['age'] = custom_data['chronological_age']
+
+    if custom_data.get('biological_age'):
+        biological_age = custom_data['biological_age']
+    else:
+        biological_age = calculate_biological_age(profile, data['core_scores'], data['metabolic_data'])
+
+    # NO DEFAULTS - all data-driven
+    peptide_recommendations = calculate_peptide_recommendations(
+        patient_info=profile,
+        core_scores=data['core_scores'],
+        metabolic_data=data['metabolic_data'],
+        biological_age=biological_age,
+        chronological_age=chronological_age or profile['age']
+    )
+
+    log.debug("Report model computed", chronological_age=chronological_age, biological_age=biological_age,
+              core_scores=len(data['core_scores']), peptides=len(peptide_recommendations))
+
+    return {
+        'patient_info': patient_info,
+        'profile': profile,
+        'core_scores': data['core_scores'],
+        'caloric_data': caloric_data,
+        'metabolic_data': data['metabolic_data'],
+        'chronological_age': chronological_age,
+        'biological_age': biological_age,
+        'peptide_recommendations': peptide_recommendations,
+        'peptide_html': format_peptide_recommendations_html(peptide_recommendations),
+    }
+
+
+class ReportModelCache:
+    """Thread-safe LRU of serialized report models with hit/miss counters"""
+
+    def __init__(self, maxsize: int = REPORT_MODEL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """A fresh copy of the cached model, or None"""
+        with self._lock:
+            payload = self._models.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._models.move_to_end(key)
+            self.hits += 1
+        # json.loads is about twice as fast as copy.deepcopy for these dicts
+        return json.loads(payload)
+
+    def put(self, key: str, model: Dict):
+        """Store model, evicting the least recently used entry when full"""
+        try:
+            payload = json.dumps(model)
+        except (TypeError, ValueError):
+            # Non-JSON values (e.g. numpy integers from a series) - just don't cache
+            log.debug("Report model not cacheable", key=key[:12])
+            return
+        with self._lock:
+            self._models[key] = payload
+            self._models.move_to_end(key)
+            while len(self._models) > self.maxsize:
+                self._models.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+_cache = ReportModelCache()
+
+
+def get_report_model_cache() -> ReportModelCache:
+    return _cache
+
+
+def build_report_model(extracted_data: Dict, custom_data: Optional[Dict] = None) -> Dict:
+    """
+    The report model for these inputs, computed at most once per distinct
+    input (see compute_report_model for the fields). The returned dict is
+    the caller's own copy.
+    """
+    custom_data = custom_data or {}
+    key = model_key(extracted_data, custom_data)
+    model = _cache.get(key)
+    if model is not None:
+        log.debug("Report model cache hit", key=key[:12])
+        return model
+
+    model = compute_report_model(extracted_data, custom_data)
+    _cache.put(key, model)
+    return model
+
+
+def apply_report_model(extracted_data: Dict, model: Dict) -> Dict:
+    """
+    Write the computed fields back into extracted_data, so the JSON saved
+    after generation has the calculated scores, caloric plan and peptides.
+    """
+    extracted_data['core_scores'] = model['core_scores']
+    extracted_data.setdefault('caloric_data', {}).update(model['caloric_data'])
+    extracted_data['peptide_recommendations'] = model['peptide_recommendations']
+    return extracted_data
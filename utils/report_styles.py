@@ -0,0 +1,189 @@
+"""
+Fingerprinted Report Stylesheets
+
+Every report used to inline its several hundred lines of CSS, so each row
+in reports.html_content and every /view response carried a copy. Templates
+rendered for the browser (inline_css = False) now link one shared,
+content-hashed file instead:
+
+    <link rel="stylesheet" href="/static/reports/pnoe_professional.1a2b3c4d5e6f.css">
+
+The hash changes whenever the CSS does, so the file can be served with
+far-future caching (CACHE_CONTROL). Self-contained output - WeasyPrint
+PDFs and HTML downloads - goes through inline_stylesheets(), which swaps
+the link back for the <style> block.
+
+The files under STYLES_DIR are committed: a stored report keeps linking
+the hash it was generated with, so every past stylesheet has to outlive
+the deploy that produced it. publish_all_stylesheets() writes the current
+ones (app startup; run `python utils/report_styles.py` and commit the new
+file after changing a template's CSS - tests/test_report_styles.py fails
+until you do). A link whose file is missing is inlined with the newest
+stylesheet of the same template, or dropped.
+"""
+
+import hashlib
+import os
+import glob
+import re
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+STYLES_URL = '/static/reports'
+STYLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'reports')
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+LINK_PATTERN = re.compile(r'<link rel="stylesheet" href="' + re.escape(STYLES_URL) + r'/([\w.-]+\.css)">')
+FILENAME_PATTERN = re.compile(r'^([\w-]+)\.[0-9a-f]{12}\.css$')
+
+_lock = threading.Lock()
+_published: Dict[str, 'ReportStylesheet'] = {}   # name -> current stylesheet
+_css_by_filename: Dict[str, str] = {}
+
+
+class ReportStylesheet:
+    """One template's CSS and its content-hashed filename"""
+
+    def __init__(self, name: str, css: str):
+        self.name = name
+        self.css = css
+        self.digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+        self.filename = f"{name}.{self.digest}.css"
+
+    @property
+    def url(self) -> str:
+        return f"{STYLES_URL}/{self.filename}"
+
+    def link_tag(self) -> str:
+        return f'<link rel="stylesheet" href="{self.url}">'
+
+    def write(self, directory: str = STYLES_DIR) -> str:
+        """Write the file unless it already exists (atomically - concurrent workers race safely)"""
+        path = os.path.join(directory, self.filename)
+        if os.path.exists(path):
+            return path
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.css)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+
+def publish_stylesheet(name: str, css: str) -> ReportStylesheet:
+    """
+    The fingerprinted stylesheet for this CSS, written to STYLES_DIR the
+    first time it is seen in this process.
+    """
+    stylesheet = _published.get(name)
+    if stylesheet is not None and stylesheet.css == css:
+        return stylesheet
+
+    stylesheet = ReportStylesheet(name, css)
+    with _lock:
+        stylesheet.write()
+        _published[name] = stylesheet
+        _css_by_filename[stylesheet.filename] = css
+    return stylesheet
+
+
+def stylesheet_css(filename: str) -> Optional[str]:
+    """CSS for a fingerprinted filename, from this process or STYLES_DIR; None if unknown"""
+    css = _css_by_filename.get(filename)
+    if css is None:
+        try:
+            with open(os.path.join(STYLES_DIR, os.path.basename(filename)), 'r', encoding='utf-8') as f:
+                css = f.read()
+        except OSError:
+            return None
+        # Content-hashed, so a file never changes once written
+        _css_by_filename[filename] = css
+    return css
+
+
+def latest_stylesheet_css(filename: str) -> Optional[str]:
+    """CSS of the newest file in STYLES_DIR for the same template as `filename`; None if none"""
+    match = FILENAME_PATTERN.match(os.path.basename(filename))
+    if not match:
+        return None
+    paths = glob.glob(os.path.join(STYLES_DIR, f"{match.group(1)}.*.css"))
+    if not paths:
+        return None
+    return stylesheet_css(os.path.basename(max(paths, key=os.path.getmtime)))
+
+
+def inline_stylesheets(html: str) -> str:
+    """
+    Replace fingerprinted stylesheet links with <style> blocks, for
+    WeasyPrint and downloads. Reports stored with inline CSS come back
+    unchanged. A link to a stylesheet no longer on disk gets the template's
+    newest stylesheet instead, or is removed - a standalone document must
+    not depend on a URL.
+    """
+    if STYLES_URL not in html:
+        return html
+
+    def inline(match):
+        css = stylesheet_css(match.group(1)) or latest_stylesheet_css(match.group(1))
+        return '' if css is None else f"<style>\n{css}\n</style>"
+
+    return LINK_PATTERN.sub(inline, html)
+
+
+def publish_all_stylesheets() -> List[ReportStylesheet]:
+    """Write the current stylesheet of every template that links one"""
+    from ai_premium_report import AIPremiumReportTemplate
+    from pnoe_professional_template import PNOEProfessionalReport
+    from sp_comprehensive_blueprint_template import SPComprehensiveBlueprintReport
+    from ultimate_report_template import MarkGentryReport
+
+    return [template().publish_stylesheet() for template in (
+        PNOEProfessionalReport, SPComprehensiveBlueprintReport, AIPremiumReportTemplate, MarkGentryReport)]
+
+
+# Print rules WeasyPrint applies on top of a report's own CSS for PDF
+# downloads (see pdf_render.PDF_VARIANTS)
+PRINT_CSS = '''
+    @page {
+        size: letter;
+        margin: 0.5in 0.5in;
+    }
+    body {
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
+        font-size: 10pt;
+        line-height: 1.4;
+        color: #1F2937;
+    }
+    /* Ensure all styles from HTML are preserved */
+    * {
+        -webkit-print-color-adjust: exact;
+        print-color-adjust: exact;
+    }
+    /* Page break control */
+    .page-break {
+        page-break-before: always;
+    }
+    .executive-summary,
+    .bio-age-section,
+    .patient-info,
+    .metrics-list,
+    .zones-list,
+    .action-list,
+    .protocol-list,
+    .interventions-grid {
+        page-break-inside: avoid;
+    }
+'''
+
+
+if __name__ == '__main__':
+    for stylesheet in publish_all_stylesheets():
+        print(os.path.relpath(os.path.join(STYLES_DIR, stylesheet.filename)))
@@ -0,0 +1,124 @@
+"""
+Streaming Report Views
+
+/view and /view-ai show a stored report with navigation buttons pinned to
+the top. They used to build a second full copy of the document with
+html.replace('<body>', ...) and return it as one string; now the document
+is streamed in chunks and the nav fragment is spliced in after <body>:
+
+    nav = nav_buttons(file_id, '/download')
+    return Response(iter_report_view(html, nav, offset), mimetype='text/html')
+    return Response(iter_report_file_view(path, nav), mimetype='text/html')
+
+The splice point is stored with each report (reports.body_offset, see
+body_offset()), so a report from the database is sent as slices of the
+string it arrived in. Reports streamed from disk are read chunk by chunk and
+the <body> tag is found in the first chunks, so time to first byte and
+memory per view do not grow with the report.
+"""
+
+from typing import Iterator, Optional
+
+BODY_TAG = '<body>'
+VIEW_CHUNK_SIZE = 64 * 1024   # characters per streamed chunk
+
+NAV_TEMPLATE = '''
+    <div style="position: fixed; top: 20px; right: 20px; z-index: 10000; display: flex; gap: 10px; flex-wrap: wrap;">
+        <a href="/dashboard"
+           style="display: inline-block; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
+                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
+                  transition: all 0.3s ease;">
+            ← Back to Dashboard
+        </a>
+        <a href="{download_url}/html"
+           style="display: inline-block; background: linear-gradient(135deg, #10b981 0%, #059669 100%);
+                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
+                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(16, 185, 129, 0.4);
+                  transition: all 0.3s ease;">
+            📥 Download HTML
+        </a>
+        <a href="{download_url}/pdf"
+           style="display: inline-block; background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%);
+                  color: white; padding: 15px 30px; border-radius: 12px; text-decoration: none;
+                  font-weight: bold; font-size: 1.1rem; box-shadow: 0 4px 15px rgba(239, 68, 68, 0.4);
+                  transition: all 0.3s ease;">
+            📄 Download PDF
+        </a>
+    </div>
+    '''
+
+
+def nav_buttons(file_id: str, download_route: str = '/download') -> str:
+    """Back / Download HTML / Download PDF buttons for a report view"""
+    return NAV_TEMPLATE.format(download_url=f"{download_route}/{file_id}")
+
+
+def body_offset(html: str) -> Optional[int]:
+    """Character offset just past the first <body> tag (where the nav goes), or None"""
+    index = html.find(BODY_TAG)
+    return None if index < 0 else index + len(BODY_TAG)
+
+
+def iter_report_view(html: str, nav: str, offset: Optional[int] = None,
+                     chunk_size: int = VIEW_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Stream a report held in memory with nav spliced in after <body>.
+
+    Args:
+        html: the stored report
+        nav: fragment to insert (nav_buttons())
+        offset: the report's stored body_offset; looked up when missing or
+            stale (reports saved before offsets were stored)
+    """
+    if offset is None or html[offset - len(BODY_TAG):offset] != BODY_TAG:
+        offset = body_offset(html)
+
+    if offset is None:
+        # No <body> tag: the report as stored
+        start = 0
+    else:
+        yield html[:offset]
+        yield nav
+        start = offset
+
+    for i in range(start, len(html), chunk_size):
+        yield html[i:i + chunk_size]
+
+
+def iter_report_file_view(path: str, nav: str, chunk_size: int = VIEW_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Stream a report file with nav spliced in after <body>, reading
+    chunk_size characters at a time. The file is closed when the response
+    finishes or the client disconnects.
+    """
+    keep = len(BODY_TAG) - 1   # a tag split across two reads
+    with open(path, 'r', encoding='utf-8') as f:
+        pending = ''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                # No <body> tag: the report as stored
+                if pending:
+                    yield pending
+                return
+
+            pending += chunk
+            index = pending.find(BODY_TAG)
+            if index >= 0:
+                offset = index + len(BODY_TAG)
+                yield pending[:offset]
+                yield nav
+                if offset < len(pending):
+                    yield pending[offset:]
+                break
+
+            if len(pending) > keep:
+                yield pending[:-keep]
+                pending = pending[-keep:]
+
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
@@ -3,11 +3,32 @@ SP Comprehensive Metabolic Blueprint Template
 Matches the format from SP_PNOE Comprehensive Metabolic Blueprint 2025.pdf
 Single-page comprehensive report with all details
 """
+import os
+import sys
 from datetime import datetime
 
-class SPComprehensiveBlueprintReport:
+sys.path.insert(0, os.path.dirname(__file__))
+from html_render import StreamingReport
+from report_jinja import report_macro, static_fragment
+
+TEMPLATE = 'sp_comprehensive_blueprint'   # utils/report_templates/sp_comprehensive_blueprint.html.j2
+
+# Display names for the core scores
+METRIC_NAMES = {
+    'symp_parasym': 'Sympathetic/Parasympathetic',
+    'ventilation_eff': 'Ventilation Efficiency',
+    'breathing_coord': 'Breathing Coordination',
+    'lung_util': 'Lung Utilization',
+    'hrv': 'Heart Rate Variability (HRV)',
+    'metabolic_rate': 'Metabolic Rate',
+    'fat_burning': 'Fat-Burning Efficiency'
+}
+
+class SPComprehensiveBlueprintReport(StreamingReport):
     """Generate SP-style comprehensive metabolic blueprint reports"""
 
+    stylesheet_name = 'sp_comprehensive_blueprint'
+
     def __init__(self):
         """Initialize with default data"""
         self.patient_info = {
@@ -51,6 +72,14 @@ class SPComprehensiveBlueprintReport:
         neutral = sum(1 for score in self.core_scores.values() if score < 60)
         return excellent, good, neutral
 
+    def _get_stylesheet(self):
+        """Inline <style> block, or a link to the fingerprinted stylesheet when inline_css is off"""
+        if not self.inline_css:
+            return self.publish_stylesheet().link_tag()
+        return f"""<style>
+{self._get_styles()}
+    </style>"""
+
     def _get_styles(self):
         """Return SP Comprehensive Blueprint CSS"""
         return """
@@ -542,8 +571,8 @@ h3 {
 .mb-20 { margin-bottom: 20px; }
 """
 
-    def generate(self):
-        """Generate the complete SP Comprehensive Blueprint HTML"""
+    def iter_html(self):
+        """The complete SP Comprehensive Blueprint HTML, one section at a time"""
 
         overall_score = self._calculate_overall_score()
         excellent, good, neutral = self._count_excellent_good_neutral()
@@ -553,111 +582,26 @@ h3 {
         age_direction = "younger" if age_diff > 0 else ("older" if age_diff < 0 else "same as")
         age_abs_diff = abs(age_diff)
 
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Comprehensive Metabolic Blueprint 2025</title>
-    <style>
-{self._get_styles()}
-    </style>
-</head>
-<body>
-
-<div class="header">
-    <div class="brand">Optimal Vitality ⚡</div>
-    <h1>COMPREHENSIVE METABOLIC BLUEPRINT 2025</h1>
-    <p class="subtitle">Complete Performance & Longevity Analysis powered by PNOE technology</p>
-</div>
-
-<div class="patient-info">
-    <h2>📋 Patient Information</h2>
-    <div class="info-grid">
-        <div class="info-item">
-            <span class="info-label">Name</span>
-            <span class="info-value">{self.patient_info.get('name', 'N/A')}</span>
-        </div>
-        <div class="info-item">
-            <span class="info-label">Age</span>
-            <span class="info-value">{self.patient_info.get('age', 'N/A')} years</span>
-        </div>
-        <div class="info-item">
-            <span class="info-label">Gender</span>
-            <span class="info-value">{self.patient_info.get('gender', 'N/A')}</span>
-        </div>
-        <div class="info-item">
-            <span class="info-label">Facility</span>
-            <span class="info-value">{self.patient_info.get('facility', 'Optimal Vitality')}</span>
-        </div>
-        <div class="info-item">
-            <span class="info-label">{self.report_type} Test</span>
-            <span class="info-value">{self.patient_info.get('test_date', 'N/A')}</span>
-        </div>
-    </div>
-</div>
-
-<h2>📊 Executive Summary</h2>
-<div class="executive-summary">
-    <div class="summary-card">
-        <div class="score-circle" style="background: conic-gradient(#3b82f6 0deg, #3b82f6 {overall_score * 3.6}deg, #e2e8f0 {overall_score * 3.6}deg);">
-            <div style="position: absolute; width: 70px; height: 70px; background: white; border-radius: 50%;"></div>
-            <span style="position: relative; z-index: 1;">{overall_score}</span>
-        </div>
-        <div class="score-label">Overall Health Score</div>
-    </div>
-    <div class="summary-card">
-        <div class="score-circle" style="font-size: 2em; color: #16a34a;">✓</div>
-        <div class="score-label"><strong>{excellent}</strong> Excellent Metrics</div>
-    </div>
-    <div class="summary-card">
-        <div class="score-circle" style="font-size: 2em; color: #3b82f6;">●</div>
-        <div class="score-label"><strong>{good}</strong> Good Metrics</div>
-    </div>
-</div>
-"""
+        yield report_macro(TEMPLATE, 'document_head')(self._get_stylesheet())
+        yield static_fragment(TEMPLATE, 'header')
+        yield report_macro(TEMPLATE, 'patient_summary')(
+            self.patient_info, self.report_type, overall_score, excellent, good)
 
         # Biological Age Section
         if self.chronological_age and self.biological_age:
-            html += f"""
-<div class="bio-age-section">
-    <h2 style="color: #166534; border: none;">🧬 Biological Age Analysis</h2>
-    <div class="age-display">{self.chronological_age} → {self.biological_age}</div>
-    <div class="age-message">{"Outstanding!" if age_diff > 0 else "Good progress!"} {age_abs_diff} years {age_direction} chronological age!</div>
-    <p style="color: #166534; margin-top: 15px;">Your {"excellent" if age_diff > 2 else "good"} performance metrics indicate {"superior" if age_diff > 2 else "healthy"} metabolic health and cellular function.</p>
-</div>
-"""
+            yield report_macro(TEMPLATE, 'biological_age')(
+                self.chronological_age, self.biological_age, age_diff, age_abs_diff, age_direction)
 
         # Core Metrics Section
         if self.core_scores:
-            html += """
-<h2>🔵 Performance Test Results</h2>
-<div class="metrics-list">
-"""
+            metrics = []
             for metric_key, score in self.core_scores.items():
                 status, color = self._get_score_status(score)
                 badge_class = f"badge-{status.lower()}"
+                metric_name = METRIC_NAMES.get(metric_key, metric_key.replace('_', ' ').title())
+                metrics.append((metric_name, score, color, status, badge_class))
 
-                # Format metric name
-                metric_names = {
-                    'symp_parasym': 'Sympathetic/Parasympathetic',
-                    'ventilation_eff': 'Ventilation Efficiency',
-                    'breathing_coord': 'Breathing Coordination',
-                    'lung_util': 'Lung Utilization',
-                    'hrv': 'Heart Rate Variability (HRV)',
-                    'metabolic_rate': 'Metabolic Rate',
-                    'fat_burning': 'Fat-Burning Efficiency'
-                }
-                metric_name = metric_names.get(metric_key, metric_key.replace('_', ' ').title())
-
-                html += f"""
-    <div class="metric-item">
-        <div class="metric-name">{metric_name}</div>
-        <div class="metric-score" style="color: {color};">{score}%</div>
-        <div class="metric-badge {badge_class}">{status}</div>
-    </div>
-"""
-            html += "</div>\n"
+            yield report_macro(TEMPLATE, 'core_metrics')(metrics)
 
         # Caloric Recommendations
         if self.caloric_data:
@@ -668,187 +612,28 @@ h3 {
             fat_percent = self.caloric_data.get('fat_percent', 0)
             cho_percent = self.caloric_data.get('cho_percent', 0)
 
-            html += f"""
-<h2>🔥 Caloric Recommendations</h2>
-<div class="caloric-grid">
-    <div class="caloric-card burn">
-        <div class="caloric-icon">🔥</div>
-        <h3>YOU BURN</h3>
-        <div class="caloric-value">{burn_rest:,}</div>
-        <div class="caloric-label">kcal/day (Rest)</div>
-        <div class="caloric-value" style="font-size: 1.5em; margin-top: 10px;">{burn_workout:,}</div>
-        <div class="caloric-label">kcal/day (Workout)</div>
-    </div>
-    <div class="caloric-card eat">
-        <div class="caloric-icon">🍽️</div>
-        <h3>YOU SHOULD EAT</h3>
-        <div class="caloric-value">{eat_rest:,}</div>
-        <div class="caloric-label">kcal/day (Rest)</div>
-        <div class="caloric-value" style="font-size: 1.5em; margin-top: 10px;">{eat_workout:,}</div>
-        <div class="caloric-label">kcal/day (Workout)</div>
-    </div>
-</div>
-
-<h3>⛽ Fuel Sources</h3>
-<div class="fuel-bar">
-    <div class="fuel-segment fuel-fat" style="width: {fat_percent}%;">Fats {fat_percent}%</div>
-    <div class="fuel-segment fuel-carb" style="width: {cho_percent}%;">Carbs {cho_percent}%</div>
-</div>
-"""
+            yield report_macro(TEMPLATE, 'caloric_recommendations')(
+                burn_rest, burn_workout, eat_rest, eat_workout, fat_percent, cho_percent)
 
         # Training Zones
         age = self.patient_info.get('age', 35)
         max_hr = 220 - age
+        hr = [int(max_hr * 0.50), int(max_hr * 0.60), int(max_hr * 0.70), int(max_hr * 0.80), int(max_hr * 0.90), max_hr]
 
-        html += f"""
-<h2>💓 Training Zones</h2>
-<div class="zone-card">
-    <div class="zone-icon">💤</div>
-    <div class="zone-info">
-        <div class="zone-name">Zone 1: Recovery</div>
-        <div class="zone-hr">{int(max_hr * 0.50)}-{int(max_hr * 0.60)} bpm</div>
-        <div class="zone-description">Active recovery, warm-up, cool-down. Very easy conversational pace.</div>
-    </div>
-</div>
-
-<div class="zone-card" style="border: 3px solid #3b82f6;">
-    <div class="zone-icon">🏃</div>
-    <div class="zone-info">
-        <div class="zone-name">Zone 2: Endurance Base <span class="primary-badge">⭐ PRIMARY ZONE</span></div>
-        <div class="zone-hr">{int(max_hr * 0.60)}-{int(max_hr * 0.70)} bpm</div>
-        <div class="zone-description">YOUR PRIMARY ZONE for improving metabolic rate & fat-burning. 3-4 sessions weekly, 45-60 minutes.</div>
-    </div>
-</div>
-
-<div class="zone-card">
-    <div class="zone-icon">🚴</div>
-    <div class="zone-info">
-        <div class="zone-name">Zone 3: Tempo</div>
-        <div class="zone-hr">{int(max_hr * 0.70)}-{int(max_hr * 0.80)} bpm</div>
-        <div class="zone-description">Moderate-hard pace, improves lactate threshold. Use sparingly.</div>
-    </div>
-</div>
-
-<div class="zone-card">
-    <div class="zone-icon">🏋</div>
-    <div class="zone-info">
-        <div class="zone-name">Zone 4: Lactate Threshold</div>
-        <div class="zone-hr">{int(max_hr * 0.80)}-{int(max_hr * 0.90)} bpm</div>
-        <div class="zone-description">Hard pace, 1-2 sessions weekly for strength development.</div>
-    </div>
-</div>
-
-<div class="zone-card">
-    <div class="zone-icon">⚡</div>
-    <div class="zone-info">
-        <div class="zone-name">Zone 5: VO2 Max</div>
-        <div class="zone-hr">{int(max_hr * 0.90)}-{max_hr} bpm</div>
-        <div class="zone-description">Maximum effort intervals only. Short bursts (30sec - 5min).</div>
-    </div>
-</div>
-
-<h2>🎯 Recommended Interventions</h2>
-<div class="interventions-grid">
-    <div class="intervention-card">
-        <div style="font-size: 3em;">🏃</div>
-        <div class="intervention-title">Zone 2 Training</div>
-        <p>Primary intervention for metabolic rate & fat-burning</p>
-        <span class="evidence-badge">Evidence-Based</span>
-    </div>
-    <div class="intervention-card">
-        <div style="font-size: 3em;">🏋️</div>
-        <div class="intervention-title">ARX Omni</div>
-        <p>Efficient resistance training for strength goals</p>
-        <span class="evidence-badge">Evidence-Based</span>
-    </div>
-    <div class="intervention-card">
-        <div style="font-size: 3em;">🧊</div>
-        <div class="intervention-title">Cold Plunge</div>
-        <p>Boost fat-burning 15-37%, accelerate recovery</p>
-        <span class="evidence-badge">Evidence-Based</span>
-    </div>
-    <div class="intervention-card">
-        <div style="font-size: 3em;">🥗</div>
-        <div class="intervention-title">Nutrition Protocol</div>
-        <p>High protein (1.6-2.2g/kg) for muscle & metabolism</p>
-        <span class="evidence-badge">Evidence-Based</span>
-    </div>
-</div>
-
-<h2>✅ Action Plan - Prioritized Roadmap</h2>
-<div class="action-plan">
-    <div class="action-item">
-        <div class="action-number"></div>
-        <div class="action-content">
-            <div class="action-title">Zone 2 Endurance Training <span class="priority-badge priority-high">HIGH</span></div>
-            <p>3-4 weekly sessions, 45-60 min at {int(max_hr * 0.60)}-{int(max_hr * 0.70)} bpm. THE most powerful intervention for improving metabolic rate and fat-burning.</p>
-        </div>
-    </div>
-    <div class="action-item">
-        <div class="action-number"></div>
-        <div class="action-content">
-            <div class="action-title">Strength Training <span class="priority-badge priority-high">HIGH</span></div>
-            <p>Continue 3x weekly resistance work for strength development. Add compound movements to support metabolic rate increase.</p>
-        </div>
-    </div>
-    <div class="action-item">
-        <div class="action-number"></div>
-        <div class="action-content">
-            <div class="action-title">Performance Nutrition <span class="priority-badge priority-medium">MEDIUM</span></div>
-            <p>High protein (1.6-2.2g/kg), omega-3 rich fish 3x/week. Time carbs around workouts for performance.</p>
-        </div>
-    </div>
-    <div class="action-item">
-        <div class="action-number"></div>
-        <div class="action-content">
-            <div class="action-title">Recovery Optimization <span class="priority-badge priority-medium">MEDIUM</span></div>
-            <p>7-9 hours nightly sleep. Consistent schedule. Maintain excellent HRV through proper recovery.</p>
-        </div>
-    </div>
-    <div class="action-item">
-        <div class="action-number"></div>
-        <div class="action-content">
-            <div class="action-title">Cold Exposure <span class="priority-badge priority-low">LOW</span></div>
-            <p>Cold plunges 3-5 min, 2-3x weekly. Can boost fat-burning by 15-37%.</p>
-        </div>
-    </div>
-</div>
-
-<h2>📅 90-Day Performance Protocol</h2>
-<div class="protocol-timeline">
-    <div class="protocol-phase">
-        <div class="phase-title">WEEKS 1-4: Base Building Phase</div>
-        <p>Add 2-3 Zone 2 sessions (45 min) alongside strength training. Monitor heart rate compliance. Focus on easy conversational pace. Track recovery and energy levels.</p>
-    </div>
-    <div class="protocol-phase">
-        <div class="phase-title">WEEKS 5-8: Development Phase</div>
-        <p>Increase to 3-4 Zone 2 sessions (60 min). Continue strength training 3x/week. Add cold plunges 2x/week. Implement performance nutrition timing around workouts.</p>
-    </div>
-    <div class="protocol-phase">
-        <div class="phase-title">WEEKS 9-12: Integration Phase</div>
-        <p>Maintain 4x Zone 2 sessions. Add 1x Zone 4 threshold session. Continue all protocols. Monitor performance gains in strength training. Prepare for retest.</p>
-    </div>
-    <div class="protocol-phase phase-retest">
-        <div class="phase-title" style="color: #16a34a;">WEEK 13: Retest & Reassess</div>
-        <p><strong>Expected Results:</strong> Improved metabolic rate, enhanced fat-burning efficiency, increased overall health score, strength gains with improved endurance capacity.</p>
-    </div>
-</div>
-"""
+        yield report_macro(TEMPLATE, 'training_zones')(hr)
+        yield static_fragment(TEMPLATE, 'interventions')
+        yield report_macro(TEMPLATE, 'action_plan')(hr[1], hr[2])
+        yield static_fragment(TEMPLATE, 'performance_protocol')
 
         # Peptide Section
         if self.peptide_html:
-            html += f"""
-<div class="peptide-section">
-    <h2 style="color: #92400e; border: none;">🤖 AI-Powered Personalized Recommendations</h2>
-    <div class="disclaimer">
-        <strong>Important Disclaimer:</strong> AI recommendations should be reviewed with a healthcare professional. Think of these as homework to bring to your doctor, not medical advice to follow blindly.
-    </div>
-    {self.peptide_html}
-</div>
-"""
+            yield report_macro(TEMPLATE, 'peptide_section')(self.peptide_html)
 
-        html += """
+        yield """
 </body>
 </html>
 """
-        return html
+
+    def generate(self):
+        """Generate the complete SP Comprehensive Blueprint HTML"""
+        return self.render()
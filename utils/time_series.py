@@ -0,0 +1,151 @@
+"""
+Columnar Ergometry Time Series
+
+Each measured channel (VO2, VCO2, HR, RER, VE/VO2, VE/VCO2) is a
+SeriesColumn: a growable array('d') of float64 samples plus running
+statistics. Compared with a Python list of floats this stores 8 bytes per
+sample instead of ~32, and the NumPy view (`values`) shares the buffer
+rather than copying it.
+
+Mean, standard deviation, min and max are maintained online as samples
+arrive (Welford for single values, Chan's pairwise merge for batches), so
+summary statistics never rescan the data. The trimmed mean uses
+np.partition (linear-time selection) instead of a full sort.
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# Channels extracted from PNOE ergometry exports
+CHANNELS = ('vo2', 'vco2', 'hr', 'rer', 've_vo2', 've_vco2')
+
+
+class SeriesColumn:
+    """One channel's samples with online mean/std/min/max"""
+
+    __slots__ = ('_data', '_mean', '_m2', '_min', '_max')
+
+    def __init__(self, values: Optional[Iterable[float]] = None):
+        self._data = array('d')
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+        self._min = math.inf
+        self._max = -math.inf
+        if values is not None:
+            self.extend(values)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __bool__(self) -> bool:
+        return len(self._data) > 0
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __getitem__(self, index):
+        return self._data[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return self.values if dtype is None else self.values.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"SeriesColumn(n={len(self)}, mean={self.mean})"
+
+    @property
+    def values(self) -> np.ndarray:
+        """Zero-copy float64 view of the samples (do not append while holding it)"""
+        return np.frombuffer(self._data, dtype=np.float64) if self._data else np.empty(0)
+
+    def append(self, value: float):
+        """Add one sample (Welford update)"""
+        value = float(value)
+        self._data.append(value)
+        n = len(self._data)
+        delta = value - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (value - self._mean)
+        if value < self._min:
+            self._min = value
+        if value > self._max:
+            self._max = value
+
+    def extend(self, values: Iterable[float]):
+        """Add a batch of samples, merging its statistics in one step (Chan et al.)"""
+        batch = np.asarray(values, dtype=np.float64).ravel()
+        if not batch.size:
+            return
+        n_a = len(self._data)
+        n_b = batch.size
+        mean_b = float(batch.mean())
+        m2_b = float(((batch - mean_b) ** 2).sum())
+
+        self._data.frombytes(batch.tobytes())
+        n = n_a + n_b
+        delta = mean_b - self._mean
+        self._mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * n_a * n_b / n
+        self._min = min(self._min, float(batch.min()))
+        self._max = max(self._max, float(batch.max()))
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._mean if self._data else None
+
+    @property
+    def std(self) -> Optional[float]:
+        """Population standard deviation (same as np.std)"""
+        return math.sqrt(self._m2 / len(self._data)) if self._data else None
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min if self._data else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max if self._data else None
+
+    def trimmed_mean(self, proportion: float = 0.1) -> Optional[float]:
+        """
+        Mean after dropping `proportion` of samples from each end.
+
+        Selects the cut points with np.partition instead of sorting; returns
+        None when nothing would be trimmed.
+        """
+        n = len(self._data)
+        trim_n = int(n * proportion + 1e-9)  # guard against 0.1 * n rounding down
+        if trim_n == 0:
+            return None
+        arr = np.partition(self.values, (trim_n, n - trim_n - 1))
+        return float(arr[trim_n:n - trim_n].mean())
+
+    def tolist(self):
+        return self._data.tolist()
+
+
+def new_time_series() -> Dict[str, SeriesColumn]:
+    """Empty column per ergometry channel (the `time_series` section of extracted data)"""
+    return {channel: SeriesColumn() for channel in CHANNELS}
+
+
+def summarize(series: Dict[str, SeriesColumn], stats: Optional[Dict] = None) -> Dict:
+    """
+    Fill `<channel>_mean/_std/_min/_max` (and `_trimmed_mean`, the middle 80%,
+    for more than 5 samples) from each non-empty column's running statistics.
+    """
+    stats = {} if stats is None else stats
+    for key, column in series.items():
+        if column:
+            stats[f'{key}_mean'] = column.mean
+            stats[f'{key}_std'] = column.std
+            stats[f'{key}_min'] = column.min
+            stats[f'{key}_max'] = column.max
+            # Use middle 80% for more stable average (exclude outliers)
+            if len(column) > 5:
+                trimmed_mean = column.trimmed_mean(0.1)
+                if trimmed_mean is not None:
+                    stats[f'{key}_trimmed_mean'] = trimmed_mean
+    return stats
@@ -3,10 +3,17 @@ Mark Gentry's Ultimate Metabolic Report
 Using HIS actual data from Performance RMR report + Ergometry data
 """
 import json
+import os
+import sys
 
-class MarkGentryReport:
+sys.path.insert(0, os.path.dirname(__file__))
+from html_render import StreamingReport
+
+class MarkGentryReport(StreamingReport):
     """Generate report specifically for Mark Gentry with his data"""
 
+    stylesheet_name = 'mark_gentry'
+
     # Image URLs - OptimalVitality.health and professional stock images
     LOGO_URL = "https://assets.optimalvitality.health/Images/Sites/O/OptimalVitality/Masterpage/header_logo.png"
     HERO_IMAGE = "https://assets.optimalvitality.health/Images/Sites/O/OptimalVitality/Splash.png"
@@ -81,9 +88,15 @@ class MarkGentryReport:
         print(f"[TEMPLATE DEBUG] self.biological_age = {self.biological_age}")
         print(f"[TEMPLATE DEBUG] Difference: {self.chronological_age - self.biological_age}")
 
+        self.write_file(output_path)
+
+        print(f"✅ Mark Gentry's report generated: {output_path}")
+
+    def iter_html(self):
+        """Mark's complete report, one section at a time"""
         avg_score = sum(self.core_scores.values()) / len(self.core_scores)
 
-        html = f"""<!DOCTYPE html>
+        yield f"""<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
@@ -91,22 +104,20 @@ class MarkGentryReport:
 <title>Performance Blueprint - Mark Gentry</title>
 <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&family=Space+Grotesk:wght@400;500;600;700&display=swap" rel="stylesheet">
 <script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js"></script>
-<style>
-{self._get_styles()}
-</style>
+{self._get_stylesheet()}
 </head>
 <body>
-
-{self._generate_hero()}
-{self._generate_executive_summary(avg_score)}
-{self._generate_bio_age_section()}
-{self._generate_core_metrics(avg_score)}
-{self._generate_caloric_section()}
-{self._generate_training_zones()}
-{self._generate_interventions()}
-{self._generate_action_plan()}
-{self._generate_progress_tracker()}
-
+"""
+        yield f"\n{self._generate_hero()}\n"
+        yield f"{self._generate_executive_summary(avg_score)}\n"
+        yield f"{self._generate_bio_age_section()}\n"
+        yield f"{self._generate_core_metrics(avg_score)}\n"
+        yield f"{self._generate_caloric_section()}\n"
+        yield f"{self._generate_training_zones()}\n"
+        yield f"{self._generate_interventions()}\n"
+        yield f"{self._generate_action_plan()}\n"
+        yield f"{self._generate_progress_tracker()}\n"
+        yield f"""
 <script>
 {self._get_charts_js()}
 </script>
@@ -114,10 +125,13 @@ class MarkGentryReport:
 </body>
 </html>"""
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
-
-        print(f"✅ Mark Gentry's report generated: {output_path}")
+    def _get_stylesheet(self):
+        """Inline <style> block, or a link to the fingerprinted stylesheet when inline_css is off"""
+        if not self.inline_css:
+            return self.publish_stylesheet().link_tag()
+        return f"""<style>
+{self._get_styles()}
+</style>"""
 
     def _get_styles(self):
         """CSS styles"""
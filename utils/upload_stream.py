@@ -0,0 +1,98 @@
+"""
+Streaming PDF Uploads
+
+By default Werkzeug spools each uploaded file into a SpooledTemporaryFile
+(memory, then temp disk) and the view copies it to its final location
+afterwards. For /upload the multipart parser instead writes each chunk
+straight to uploads/<id>_<name>.pdf through PDFUploadStream, which
+
+- hashes the bytes as they arrive (SHA-256 for the extraction cache),
+- rejects the body as soon as the first bytes are not `%PDF`,
+- rejects it as soon as it grows past the configured size limit.
+
+Memory per upload is one parser chunk regardless of file size, and a
+rejected upload stops reading the request body at the failing chunk.
+"""
+
+import hashlib
+import os
+import secrets
+from typing import Optional
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.utils import secure_filename
+
+PDF_MAGIC = b'%PDF'
+
+
+class PDFUploadStream:
+    """Writable file object handed to Werkzeug's multipart parser for one file part"""
+
+    def __init__(self, upload_dir: str, filename: Optional[str], max_bytes: Optional[int] = None):
+        self.unique_id = secrets.token_hex(8)
+        self.filename = secure_filename(filename or '')
+        self.path = os.path.join(upload_dir, f"{self.unique_id}_{self.filename}")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.is_pdf = False
+        self._head = b''
+        self._digest = hashlib.sha256()
+        self._file = None
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def write(self, chunk: bytes) -> int:
+        if not self.is_pdf:
+            # The magic may straddle the first two chunks; buffer only that much
+            self._head += chunk[:len(PDF_MAGIC)]
+            if len(self._head) >= len(PDF_MAGIC):
+                if not self._head.startswith(PDF_MAGIC):
+                    self.discard()
+                    raise UnsupportedMediaType('Only PDF files allowed')
+                self.is_pdf = True
+
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge(f'PDF exceeds {self.max_bytes // (1024 * 1024)} MB')
+
+        if self._file is None:
+            self._file = open(self.path, 'w+b')
+        self._digest.update(chunk)
+        return self._file.write(chunk)
+
+    # Werkzeug rewinds the stream when the part ends and FileStorage may read it
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence) if self._file else 0
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size) if self._file else b''
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._file.readline(size) if self._file else b''
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def discard(self):
+        """Close and delete whatever was written"""
+        self.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class PDFUploadRequest(Request):
+    """Flask request class that streams file parts for `streaming_endpoints` to disk"""
+
+    streaming_endpoints = frozenset({'upload_file'})
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in self.streaming_endpoints:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        config = current_app.config
+        return PDFUploadStream(config['UPLOAD_FOLDER'], filename, config.get('MAX_PDF_UPLOAD_BYTES'))